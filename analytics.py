@@ -0,0 +1,229 @@
+# analytics.py
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+ROLLING_WINDOW = 3
+TREND_MAX_LINES = 12    # groups drawn in a trend chart; the rest are dropped
+TREND_MAX_POINTS = 40   # points per line; longer spans are binned into year ranges
+
+
+# ---------------------------------------------------
+# DATA VERSION
+# ---------------------------------------------------
+def data_version(tables):
+    # content fingerprint of the loaded tables; computed once per load_all
+    # and used as the cache key for everything derived from them
+    h = 0
+    for name in sorted(tables):
+        df = tables[name]
+        if not isinstance(df, pd.DataFrame):
+            continue
+        try:
+            digest = int(pd.util.hash_pandas_object(df, index=False).sum())
+        except TypeError:
+            digest = hash((len(df), tuple(df.columns)))
+        h = hash((h, name, len(df), digest))
+    return f"{h & 0xFFFFFFFFFFFFFFFF:016x}"
+
+
+# ---------------------------------------------------
+# VECTORIZED METRICS
+# ---------------------------------------------------
+def _as_float(values):
+    return pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype="float64")
+
+
+def percentile_rank(rank, total_teams):
+    # 100 * (1 - (rank - 1) / total_teams); NaN where total_teams is missing or 0
+    rank = _as_float(rank)
+    total = _as_float(total_teams)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = 100.0 * (1.0 - (rank - 1.0) / total)
+    pct[~np.isfinite(pct)] = np.nan
+    return pct
+
+
+def group_zscore(values, groups):
+    # (x - mean_g) / std_g per group, population std, NaNs ignored
+    x = _as_float(values)
+    codes, _ = pd.factorize(pd.Series(groups))
+    n_groups = codes.max() + 1 if len(codes) else 0
+    valid = np.isfinite(x) & (codes >= 0)
+    c = np.where(valid, codes, 0)
+    xv = np.where(valid, x, 0.0)
+    counts = np.bincount(c, weights=valid.astype("float64"), minlength=n_groups)
+    sums = np.bincount(c, weights=xv, minlength=n_groups)
+    sq = np.bincount(c, weights=xv * xv, minlength=n_groups)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = sums / counts
+        std = np.sqrt(np.maximum(sq / counts - mean * mean, 0.0))
+        z = (x - mean[c]) / std[c]
+    z[~valid | ~np.isfinite(z)] = np.nan
+    return z
+
+
+def group_rolling_mean(values, groups, window=ROLLING_WINDOW):
+    # trailing mean over the previous `window` rows of the same group; rows
+    # must already be sorted by (group, order column)
+    x = _as_float(values)
+    codes, _ = pd.factorize(pd.Series(groups))
+    n = len(x)
+    if n == 0:
+        return x
+    valid = np.isfinite(x)
+    cs = np.concatenate([[0.0], np.cumsum(np.where(valid, x, 0.0))])
+    cn = np.concatenate([[0], np.cumsum(valid)])
+    idx = np.arange(n)
+    new_group = np.ones(n, dtype=bool)
+    new_group[1:] = codes[1:] != codes[:-1]
+    group_start = np.maximum.accumulate(np.where(new_group, idx, 0))
+    start = np.maximum(group_start, idx - window + 1)
+    total = cs[idx + 1] - cs[start]
+    count = cn[idx + 1] - cn[start]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = total / count
+    out[count == 0] = np.nan
+    return out
+
+
+# ---------------------------------------------------
+# FACT TABLES
+# ---------------------------------------------------
+def build_core(tables):
+    meats, years, events, team = tables["meats"], tables["years"], tables["events"], tables["team"]
+    if meats.empty or years.empty or events.empty:
+        return pd.DataFrame()
+    core = (
+        meats
+        .merge(years, left_on="competition_year_id", right_on="id", suffixes=("", "_year"))
+        .merge(events, left_on="event_id", right_on="id", suffixes=("", "_event"))
+    )
+    if not team.empty:
+        core = core.merge(
+            team,
+            left_on="competition_year_id",
+            right_on="competition_year_id",
+            how="left",
+            suffixes=("", "_team"),
+        )
+    core["Percentile Rank"] = percentile_rank(core["rank"], core["total_teams"])
+    core["Score Z"] = group_zscore(core["score"], core["competition_year_id"])
+    return core
+
+
+def build_ancillary(tables):
+    anc, anc_cat, years, events, anc_team = (
+        tables["anc"], tables["anc_cat"], tables["years"], tables["events"], tables["anc_team"]
+    )
+    if anc.empty or anc_cat.empty or years.empty or events.empty:
+        return pd.DataFrame()
+    anc_df = (
+        anc.merge(anc_cat, left_on="category_id", right_on="id", suffixes=("", "_cat"))
+        .merge(years, left_on="competition_year_id", right_on="id", suffixes=("", "_year"))
+        .merge(events, left_on="event_id", right_on="id", suffixes=("", "_event"))
+    )
+    if not anc_team.empty:
+        anc_df = anc_df.merge(
+            anc_team,
+            left_on="competition_year_id",
+            right_on="competition_year_id",
+            how="left",
+            suffixes=("", "_team")
+        )
+    anc_df["Percentile Rank"] = percentile_rank(anc_df["rank"], anc_df["total_teams"])
+    anc_df["Score Z"] = group_zscore(anc_df["score"], anc_df["competition_year_id"])
+    return anc_df
+
+
+def rolling_by_year(df, group_col, window=ROLLING_WINDOW):
+    # yearly mean score / percentile per group plus a trailing average across years
+    if df.empty:
+        return pd.DataFrame()
+    yearly = (
+        df.groupby([group_col, "year"], as_index=False)
+        .agg({"score": "mean", "Percentile Rank": "mean"})
+        .sort_values([group_col, "year"], kind="mergesort")
+        .reset_index(drop=True)
+    )
+    yearly["Rolling Score"] = group_rolling_mean(yearly["score"], yearly[group_col], window)
+    yearly["Rolling Percentile"] = group_rolling_mean(yearly["Percentile Rank"], yearly[group_col], window)
+    return yearly
+
+
+def trend_series(df, group_col, value_col="Percentile Rank",
+                 max_lines=TREND_MAX_LINES, max_points=TREND_MAX_POINTS):
+    # mean of value_col per (group, year), reduced for plotting: only the
+    # max_lines groups with most entries are kept, and when the year span
+    # exceeds max_points the years are binned (weighted mean per bin, keyed
+    # by the bin's first year). Returns (frame, note) where note describes
+    # what was reduced, or "" when nothing was.
+    if df.empty:
+        return pd.DataFrame(columns=["year", group_col, value_col]), ""
+    notes = []
+    counts = df[group_col].value_counts()
+    if len(counts) > max_lines:
+        keep = counts.index[:max_lines]
+        df = df[df[group_col].isin(keep)]
+        notes.append(f"top {max_lines} of {len(counts)} by entries")
+
+    years = df["year"].to_numpy()
+    lo, hi = int(years.min()), int(years.max())
+    step = -(-(hi - lo + 1) // max_points)
+    bucket = lo + (years - lo) // step * step if step > 1 else years
+    if step > 1:
+        notes.append(f"{step}-year bins")
+
+    agg = (
+        pd.DataFrame({"year": bucket, group_col: df[group_col].to_numpy(), "v": _as_float(df[value_col])})
+        .groupby(["year", group_col], as_index=False)["v"]
+        .mean()
+        .rename(columns={"v": value_col})
+    )
+    return agg, ", ".join(notes)
+
+
+def participant_finishes(df):
+    # best / worst finish per participant (by rank, ties broken by percentile)
+    if df.empty or "participant" not in df.columns:
+        return pd.DataFrame()
+    d = df[df["participant"].notna() & df["rank"].notna()]
+    if d.empty:
+        return pd.DataFrame()
+    ordered = d.sort_values(["participant", "rank", "Percentile Rank"], ascending=[True, True, False], kind="mergesort")
+    best = ordered.drop_duplicates("participant", keep="first").set_index("participant")
+    worst = ordered.drop_duplicates("participant", keep="last").set_index("participant")
+    out = pd.DataFrame({
+        "Entries": d.groupby("participant").size(),
+        "Best Rank": best["rank"],
+        "Best Event": best["event_name"],
+        "Best Year": best["year"],
+        "Worst Rank": worst["rank"],
+        "Worst Event": worst["event_name"],
+        "Worst Year": worst["year"],
+        "Mean Percentile": d.groupby("participant")["Percentile Rank"].mean(),
+    })
+    return out.reset_index().sort_values("Best Rank", kind="mergesort")
+
+
+# ---------------------------------------------------
+# CACHED ENTRY POINT
+# ---------------------------------------------------
+@st.cache_data(max_entries=4)
+def compute_metrics(version, _tables):
+    # `_tables` is not hashed by streamlit; `version` is the cache key
+    core = build_core(_tables)
+    anc = build_ancillary(_tables)
+    return {
+        "core": core,
+        "anc": anc,
+        "core_rolling": rolling_by_year(core, "meat"),
+        "anc_rolling": rolling_by_year(anc, "category_name"),
+        "core_participants": participant_finishes(core),
+        "anc_participants": participant_finishes(anc),
+    }
+
+
+def get_metrics(tables):
+    version = tables.get("version") or data_version(tables)
+    return compute_metrics(version, tables)
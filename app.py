@@ -1,21 +1,31 @@
+import importlib
+
 import streamlit as st
 from utils import sidebar_logo, app_navigation
-
-import Home
-import bbq_intake
-import bbq_results_app
-import migration_tool
+from metrics import REGISTRY, render_debug_panel
+from profiling import profile_page, render_profile_panel
 
 st.set_page_config(page_title="BBQ Tracker", layout="wide")
+REGISTRY.start_rerun()
 
 sidebar_logo()
 page = app_navigation()
 
-if page == "Home":
-    Home.render()
-elif page == "Migration Tool":
-    migration_tool.render()
-elif page == "Intake Form":
-    bbq_intake.render()
-elif page == "Results Dashboard":
-    bbq_results_app.render()
+# page -> module; imported on first navigation so a cold start only pays
+# for the page actually opened (python caches the module after that)
+PAGES = {
+    "Home": "Home",
+    "Migration Tool": "migration_tool",
+    "Intake Form": "bbq_intake",
+    "Results Dashboard": "bbq_results_app",
+    "Leaderboard": "leaderboard",
+}
+
+try:
+    # per-phase timings when BBQ_PROFILE=1
+    profile_page(page, importlib.import_module(PAGES[page]).render)
+finally:
+    # also shown when a page ends early with st.stop()
+    render_profile_panel(page)
+    # slowest Supabase calls of this rerun (BBQ_DEBUG_METRICS=1)
+    render_debug_panel()
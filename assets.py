@@ -0,0 +1,91 @@
+# assets.py
+# Images loaded and encoded once per process instead of on every rerun.
+from base64 import b64encode
+from io import BytesIO
+from pathlib import Path
+
+import streamlit as st
+
+ROOT = Path(__file__).resolve().parent
+# served at app/static/<name> when server.enableStaticServing is on
+STATIC_DIR = ROOT / "static"
+
+MIME = {".png": "image/png", ".jpg": "image/jpeg", ".jpeg": "image/jpeg",
+        ".gif": "image/gif", ".svg": "image/svg+xml", ".webp": "image/webp"}
+
+
+def _mime(data, name):
+    # sniffed, since a requested variant falls back to the original file
+    # when Pillow is unavailable
+    if data.startswith(b"\x89PNG"):
+        return "image/png"
+    if data.startswith(b"\xff\xd8"):
+        return "image/jpeg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return MIME.get(Path(name).suffix.lower(), "application/octet-stream")
+
+
+def _suffix(name, fmt):
+    return f".{fmt.lower()}" if fmt else Path(name).suffix.lower()
+
+
+def _variant_name(name, width, fmt):
+    p = Path(name)
+    if width is None and fmt is None:
+        return p.name
+    return f"{p.stem}@{width or 'full'}w{_suffix(name, fmt)}"
+
+
+@st.cache_resource(show_spinner=False)
+def asset_bytes(name, width=None, fmt=None):
+    # bytes of an asset next to the app, optionally downscaled to `width`
+    # pixels and re-encoded as `fmt` (e.g. "WEBP"); None when the file is
+    # missing. Without Pillow the original bytes are returned unchanged.
+    path = ROOT / name
+    if not path.exists():
+        return None
+    data = path.read_bytes()
+    if (width is None and fmt is None) or path.suffix.lower() == ".svg":
+        return data
+    try:
+        from PIL import Image
+    except ImportError:
+        return data
+    with Image.open(BytesIO(data)) as im:
+        if width is not None and im.width > width:
+            im = im.resize((width, round(im.height * width / im.width)), Image.LANCZOS)
+        elif fmt is None or fmt.upper() == im.format:
+            return data
+        out = BytesIO()
+        im.save(out, format=fmt or im.format, optimize=True)
+    return out.getvalue()
+
+
+@st.cache_resource(show_spinner=False)
+def data_uri(name, width=None, fmt=None):
+    data = asset_bytes(name, width, fmt)
+    if data is None:
+        return None
+    return f"data:{_mime(data, name)};base64,{b64encode(data).decode()}"
+
+
+@st.cache_resource(show_spinner=False)
+def _static_file(name, width=None, fmt=None):
+    data = asset_bytes(name, width, fmt)
+    if data is None:
+        return None
+    STATIC_DIR.mkdir(exist_ok=True)
+    target = STATIC_DIR / _variant_name(name, width, fmt)
+    if not target.exists() or target.read_bytes() != data:
+        target.write_bytes(data)
+    return target.name
+
+
+def asset_src(name, width=None, fmt=None):
+    # value for an <img src=...>: a static URL when Streamlit serves ./static,
+    # otherwise the memoized data URI; None when the asset is missing
+    if st.get_option("server.enableStaticServing"):
+        filename = _static_file(name, width, fmt)
+        return None if filename is None else f"app/static/{filename}"
+    return data_uri(name, width, fmt)
@@ -4,330 +4,409 @@ from datetime import date
 import uuid
 import requests
 import os
-from supabase_client import supabase_insert, supabase_get, supabase_upsert, supabase_delete
+from supabase_client import supabase_insert, supabase_get, supabase_upsert, supabase_delete, supabase_rpc, Query
 from utils import MEATS
-
-# st.set_page_config(page_title="BBQ Competition Intake Form", layout="centered")
-def render():
-    st.title("🍴 Intake Form — Competitions & Results")
-    # -------------------------
-    # Helper: safe load table into DataFrame
-    # -------------------------
-    def load_table(table_name):
-        resp = supabase_get(table_name)
-        if resp.status_code == 200:
-            data = resp.json()
-            return pd.DataFrame(data) if data else pd.DataFrame()
+from profiling import phase
+import table_cache
+import change_feed
+import season_grid
+import event_index
+
+# -------------------------
+# Helper: safe load table into DataFrame (shared snapshot, see table_cache)
+# -------------------------
+def load_table(table_name):
+    return table_cache.load_table(table_name)
+
+
+MASTER_TABLES = ["competition_events", "competition_years"]
+# rows of one competition year; fetched filtered (year_rows), not as whole tables
+YEAR_TABLES = ["meat_results", "ancillary_categories", "ancillary_results",
+               "team_results", "ancillary_team_results"]
+
+
+def load_master_data():
+    # (frames, snapshot tokens) of MASTER_TABLES, in that order
+    change_feed.refresh()
+    frames, tokens = zip(*(table_cache.snapshot(t) for t in MASTER_TABLES))
+    return frames, tokens
+
+
+def load_event_index():
+    # (index, events_df, years_df) for the pickers. Catalogs above
+    # event_index.TRIGRAM_MAX events aren't loaded whole: the frames are
+    # None and a ServerIndex looks names and years up with filtered queries
+    change_feed.refresh()
+    if event_index.catalog_is_large():
+        return event_index.ServerIndex(), None, None
+    (events_df, years_df), tokens = load_master_data()
+    return event_index.get_index(events_df, years_df, tokens), events_df, years_df
+
+
+def year_rows(competition_year_id):
+    # frames of YEAR_TABLES holding only the competition year's rows: the
+    # filter runs on the server, results are cached until the table changes
+    if competition_year_id is None:
+        return [pd.DataFrame() for _ in YEAR_TABLES]
+    return [table_cache.query_snapshot(Query(t).eq("competition_year_id", competition_year_id).order("id"))[0]
+            for t in YEAR_TABLES]
+
+
+# -------------------------
+# SAVE / UPSERT logic (Save All)
+# -------------------------
+SAVE_RPC = "save_competition_year"      # migrations/002_save_competition_year.sql
+SAVE_TABLES = ("meat_results", "team_results", "ancillary_categories",
+               "ancillary_results", "ancillary_team_results")
+
+
+def save_payload(competition_year_id, core_inputs, core_team_points, core_team_rank,
+                 anc_inputs, anc_team_points, anc_team_rank):
+    # the JSON argument of the save_competition_year function
+    return {
+        "competition_year_id": int(competition_year_id),
+        "meats": [{"meat": meat, **vals} for meat, vals in core_inputs.items()],
+        "team": {"total_score": float(core_team_points), "rank": int(core_team_rank)},
+        "ancillary": [{"category_name": cat, **vals} for cat, vals in anc_inputs.items()],
+        "ancillary_team": {"total_score": float(anc_team_points), "rank": int(anc_team_rank)},
+    }
+
+
+def save_all(competition_year_id, core_inputs, core_team_points, core_team_rank,
+             anc_inputs, anc_team_points, anc_team_rank):
+    # returns a list of error messages; empty when everything saved. One
+    # round trip, all or nothing, through the save_competition_year function;
+    # projects without the 002 migration get the per-table REST calls.
+    payload = save_payload(competition_year_id, core_inputs, core_team_points, core_team_rank,
+                           anc_inputs, anc_team_points, anc_team_rank)
+    resp = supabase_rpc(SAVE_RPC, {"payload": payload}, writes=SAVE_TABLES)
+    if resp.status_code == 404:
+        return _save_all_rest(competition_year_id, core_inputs, core_team_points, core_team_rank,
+                              anc_inputs, anc_team_points, anc_team_rank)
+    if resp.status_code != 200:
+        return [f"Error saving competition year (nothing was saved): {resp.text}"]
+    return []
+
+
+def _save_all_rest(competition_year_id, core_inputs, core_team_points, core_team_rank,
+                   anc_inputs, anc_team_points, anc_team_rank):
+    errors = []
+
+    # 7a: Upsert core meats (use on_conflict on competition_year_id,meat)
+    for meat, vals in core_inputs.items():
+        payload = {
+            "competition_year_id": competition_year_id,
+            "meat": meat,
+            "participant": vals["participant"],
+            "score": vals["score"],
+            "rank": vals["rank"],
+        }
+        # upsert on competition_year_id + meat (unique logical key)
+        resp = supabase_upsert("meat_results", payload, on_conflict="competition_year_id,meat")
+        if resp.status_code not in (200,201):
+            errors.append(f"Error upserting meat {meat}: {resp.text}")
+
+    # 7b: Upsert core team totals (unique competition_year_id)
+    core_payload = {
+        "competition_year_id": competition_year_id,
+        "total_score": float(core_team_points),
+        "rank": int(core_team_rank)
+    }
+    resp_core_team = supabase_upsert("team_results", core_payload, on_conflict="competition_year_id")
+    if resp_core_team.status_code not in (200,201):
+        errors.append(f"Error saving core team totals: {resp_core_team.text}")
+
+    # 7c: Ensure ancillary categories exist, then upsert ancillary results
+    # first refresh ancillary categories for this competition_year
+    resp = Query("ancillary_categories").eq("competition_year_id", competition_year_id).get()
+    anc_cat_df = pd.DataFrame(resp.json()) if resp.status_code == 200 else pd.DataFrame()
+
+    for cat_name, vals in anc_inputs.items():
+        # find category id
+        cat_row = anc_cat_df[anc_cat_df["category_name"] == cat_name] if not anc_cat_df.empty else pd.DataFrame()
+        if cat_row.empty:
+            # create category
+            r = supabase_insert("ancillary_categories", {"competition_year_id": competition_year_id, "category_name": cat_name})
+            if r.status_code in (200,201):
+                cat_id = r.json()[0]["id"]
+                # update local anc_cat_df
+                anc_cat_df = pd.concat([anc_cat_df, pd.DataFrame([{"id": cat_id, "competition_year_id": competition_year_id, "category_name": cat_name}])], ignore_index=True)
+            else:
+                errors.append(f"Failed to create ancillary category {cat_name}: {r.text}")
+                continue
         else:
-            return pd.DataFrame()
+            cat_id = int(cat_row.iloc[0]["id"])
 
-    # -------------------------
-    # Load master data
-    # -------------------------
-    events_df = load_table("competition_events")
-    years_df = load_table("competition_years")
-    meat_df_all = load_table("meat_results")
-    anc_cat_all = load_table("ancillary_categories")
-    anc_res_all = load_table("ancillary_results")
-    team_results_all = load_table("team_results")
-    anc_team_all = load_table("ancillary_team_results")
+        payload = {
+            "competition_year_id": competition_year_id,
+            "category_id": cat_id,
+            "participant": vals["participant"],
+            "score": vals["score"],
+            "rank": vals["rank"]
+        }
+        # upsert on competition_year_id + category_id (assumes one row per category per team)
+        resp = supabase_upsert("ancillary_results", payload, on_conflict="competition_year_id,category_id")
+        if resp.status_code not in (200,201):
+            errors.append(f"Error saving ancillary {cat_name}: {resp.text}")
+
+    # 7d: Upsert ancillary team totals
+    anc_team_payload = {
+        "competition_year_id": competition_year_id,
+        "total_score": float(anc_team_points),
+        "rank": int(anc_team_rank)
+    }
+    resp_anc_team = supabase_upsert("ancillary_team_results", anc_team_payload, on_conflict="competition_year_id")
+    if resp_anc_team.status_code not in (200,201):
+        errors.append(f"Error saving ancillary team totals: {resp_anc_team.text}")
+    return errors
+
+
+# -------------------------
+# Page sections. Each is a fragment: a widget inside it reruns only that
+# section, from the frames it was last called with, so typing a score does
+# no network I/O. Entered values live in session state under
+# "{competition_year_id}_{name}_{field}" keys, where Save All reads them.
+# Changing the event / year selection reruns the whole page.
+# -------------------------
+NEW_EVENT = "-- New Event --"
+NEW_YEAR = "-- New Year --"
+
+
+def _init_choice(key, options):
+    # preset a selectbox's state so it always holds one of `options`
+    if st.session_state.get(key) not in options:
+        st.session_state[key] = options[0]
+
+
+def _rerun_if_changed(key):
+    # selections feed every section below: rerun the page when a picker
+    # fragment changed its selectbox (render records the value it used)
+    if st.session_state[key] != st.session_state.get(f"_{key}_shown"):
+        st.rerun()
 
-    # -------------------------
-    # Event (stable) Create / Select
-    # -------------------------
+
+def _first(df, col, cast, default):
+    if df.empty or col not in df.columns or pd.isna(df[col].iloc[0]):
+        return default
+    return cast(df[col].iloc[0])
+
+
+def _result_inputs(cy_id, name, existing):
+    # participant / score / rank inputs of one meat or category
+    col1, col2, col3 = st.columns([4, 2, 2])
+    with col1:
+        st.text_input(f"{name} Participant", value=_first(existing, "participant", str, ""),
+                      key=f"{cy_id}_{name}_participant")
+    with col2:
+        st.number_input(f"{name} Score", min_value=0.0, step=0.0001, format="%.4f",
+                        value=_first(existing, "score", float, 0.0), key=f"{cy_id}_{name}_score")
+    with col3:
+        st.number_input(f"{name} Rank", min_value=0, step=1,
+                        value=_first(existing, "rank", int, 0), key=f"{cy_id}_{name}_rank")
+
+
+def _read_inputs(cy_id, names):
+    state = st.session_state
+    return {
+        name: {
+            "participant": state.get(f"{cy_id}_{name}_participant") or None,
+            "score": float(state.get(f"{cy_id}_{name}_score", 0.0)),
+            "rank": int(state.get(f"{cy_id}_{name}_rank", 0)),
+        }
+        for name in names
+    }
+
+
+@st.fragment
+def event_picker(index):
     st.subheader("1) Competition Event (stable)")
-    event_options = ["-- New Event --"] + (events_df["event_name"].tolist() if not events_df.empty else [])
-    selected_event = st.selectbox("Event (name)", event_options)
-
-    if selected_event == "-- New Event --":
-        new_event_name = st.text_input("Event Name")
-        new_event_location = st.text_input("Location")
-        if st.button("Create Event"):
-            if not new_event_name or not new_event_location:
-                st.error("Name and location required")
-            else:
-                resp = supabase_insert("competition_events", {"event_name": new_event_name.strip(), "location": new_event_location.strip()})
-                if resp.status_code in (200, 201):
-                    st.success("Event created")
-                    st.experimental_rerun()
+    # type-ahead: only the matches go to the browser, never the whole catalog
+    query = st.text_input("Search events", key="intake_event_query", placeholder="Type part of an event name")
+    matches = event_index.search(index, query)
+    current = st.session_state["intake_event"]
+    keep = [current] if current != NEW_EVENT and current not in matches else []
+    selected_event = st.selectbox("Event (name)", [NEW_EVENT] + keep + matches, key="intake_event")
+    if index.local_search:
+        st.caption(f"{len(matches)} of {len(index)} events shown" if len(matches) < len(index) else f"{len(index)} events")
+    else:
+        st.caption(f"{len(matches)} matching events shown")
+    _rerun_if_changed("intake_event")
+
+    if selected_event == NEW_EVENT:
+        with st.form("intake_new_event", clear_on_submit=True):
+            new_event_name = st.text_input("Event Name")
+            new_event_location = st.text_input("Location")
+            if st.form_submit_button("Create Event"):
+                if not new_event_name or not new_event_location:
+                    st.error("Name and location required")
                 else:
-                    st.error(resp.text)
+                    resp = supabase_insert("competition_events", {"event_name": new_event_name.strip(), "location": new_event_location.strip()})
+                    if resp.status_code in (200, 201):
+                        st.toast("Event created")
+                        st.rerun()
+                    else:
+                        st.error(resp.text)
     else:
-        ev_row = events_df[events_df["event_name"] == selected_event].iloc[0]
-        st.markdown(f"**Selected:** {ev_row['event_name']} — {ev_row['location']}")
+        st.markdown(f"**Selected:** {selected_event} — {index.location(index.event_id(selected_event))}")
 
-    # -------------------------
-    # Competition Year (occurrence) Create / Select
-    # -------------------------
+
+@st.fragment
+def year_picker(ev_id, years_for_event):
     st.subheader("2) Competition Year / Occurrence")
-    years_for_event = ["-- New Year --"]
-    if not events_df.empty and selected_event != "-- New Event --":
-        ev_id = events_df[events_df["event_name"] == selected_event]["id"].values[0]
-        years_for_event += years_df[years_df["event_id"] == ev_id]["year"].astype(str).tolist()
-
-    selected_year_option = st.selectbox("Select Year/Occurrence", years_for_event)
-
-    if selected_year_option == "-- New Year --":
-        occ_year = st.number_input("Year", min_value=2000, max_value=2100, value=date.today().year)
-        start_date = st.date_input("Start Date")
-        end_date = st.date_input("End Date", value=start_date)
-        total_teams = st.number_input("Total Teams (optional)", min_value=0, value=0)
-        if st.button("Create Competition Year"):
-            if selected_event == "-- New Event --":
-                st.error("Select or create an Event first")
-            else:
-                ev_id = events_df[events_df["event_name"] == selected_event]["id"].values[0]
-                payload = {
-                    "event_id": ev_id,
-                    "year": int(occ_year),
-                    "start_date": start_date.isoformat(),
-                    "end_date": end_date.isoformat(),
-                }
-                if total_teams > 0:
-                    payload["total_teams"] = int(total_teams)
-                resp = supabase_insert("competition_years", payload)
-                if resp.status_code in (200,201):
-                    st.success("Competition year created")
-                    st.experimental_rerun()
+    selected_year_option = st.selectbox("Select Year/Occurrence", years_for_event, key="intake_year")
+    _rerun_if_changed("intake_year")
+
+    if selected_year_option == NEW_YEAR:
+        with st.form("intake_new_year"):
+            occ_year = st.number_input("Year", min_value=2000, max_value=2100, value=date.today().year)
+            start_date = st.date_input("Start Date")
+            end_date = st.date_input("End Date (empty = start date)", value=None)
+            total_teams = st.number_input("Total Teams (optional)", min_value=0, value=0)
+            if st.form_submit_button("Create Competition Year"):
+                if ev_id is None:
+                    st.error("Select or create an Event first")
                 else:
-                    st.error(resp.text)
+                    payload = {
+                        "event_id": int(ev_id),
+                        "year": int(occ_year),
+                        "start_date": start_date.isoformat(),
+                        "end_date": (end_date or start_date).isoformat(),
+                    }
+                    if total_teams > 0:
+                        payload["total_teams"] = int(total_teams)
+                    resp = supabase_insert("competition_years", payload)
+                    if resp.status_code in (200,201):
+                        st.toast("Competition year created")
+                        st.rerun()
+                    else:
+                        st.error(resp.text)
     else:
         st.markdown(f"**Selected Year:** {selected_year_option}")
 
-    # -------------------------
-    # Determine selected competition_year_id
-    # -------------------------
-    competition_year_id = None
-    if selected_year_option != "-- New Year --" and selected_event != "-- New Event --":
-        ev_id = events_df[events_df["event_name"] == selected_event]["id"].values[0]
-        matched = years_df[(years_df["event_id"] == ev_id) & (years_df["year"].astype(str) == selected_year_option)]
-        if not matched.empty:
-            competition_year_id = matched.iloc[0]["id"]
-
-    # -------------------------
-    # Load existing rows for the selected competition_year_id
-    # -------------------------
-    def df_filter_by_cy(df, cy_id):
-        if df.empty or cy_id is None:
-            return pd.DataFrame()
-        if "competition_year_id" in df.columns:
-            return df[df["competition_year_id"] == cy_id].copy()
-        # backwards compat: if earlier schema used competition_id + year, try filtering
-        return df
-
-    meat_df = df_filter_by_cy(meat_df_all, competition_year_id)
-    anc_cat_df = df_filter_by_cy(anc_cat_all, competition_year_id)
-    anc_res_df = df_filter_by_cy(anc_res_all, competition_year_id)
-    team_df = df_filter_by_cy(team_results_all, competition_year_id)
-    anc_team_df = df_filter_by_cy(anc_team_all, competition_year_id)
 
-    # -------------------------
-    # 3) Core Meats section (inputs)
-    # -------------------------
+@st.fragment
+def core_meats_section(cy_id, meat_df):
     st.subheader("3) Core Meats Results (KCBS)")
-    core_inputs = {}
-
     for meat in MEATS:
         existing = meat_df[meat_df["meat"] == meat] if not meat_df.empty else pd.DataFrame()
-        col1, col2, col3 = st.columns([4, 2, 2])
-
-        with col1:
-            participant = st.text_input(
-                f"{meat} Participant",
-                value=(existing["participant"].iloc[0] if not existing.empty else ""),
-                key=f"{competition_year_id}_{meat}_participant",
-            )
-        with col2:
-            score = st.number_input(
-                f"{meat} Score",
-                min_value=0.0,
-                step=0.0001,
-                format="%.4f",
-                value=(float(existing["score"].iloc[0]) if not existing.empty and pd.notna(existing["score"].iloc[0]) else 0.0),
-                key=f"{competition_year_id}_{meat}_score",
-            )
-        with col3:
-            rank = st.number_input(
-                f"{meat} Rank",
-                min_value=0,
-                step=1,
-                value=(int(existing["rank"].iloc[0]) if not existing.empty and pd.notna(existing["rank"].iloc[0]) else 0),
-                key=f"{competition_year_id}_{meat}_rank",
-            )
-
-        core_inputs[meat] = {"participant": participant or None, "score": float(score), "rank": int(rank)}
-
-    # -------------------------
-    # Core Team Totals (separated and displayed after core meats)
-    # -------------------------
-    st.subheader("4) Team Totals (Core Meats Only)")
+        _result_inputs(cy_id, meat, existing)
 
-    core_team_points = None
-    core_team_rank = None
-    if not team_df.empty:
-        # expect one row per competition_year_id
-        core_team_points = team_df["total_score"].iloc[0] if "total_score" in team_df.columns else None
-        core_team_rank = team_df["rank"].iloc[0] if "rank" in team_df.columns else None
 
+@st.fragment
+def team_totals_section(cy_id, totals_df, kind, title, score_label, rank_label):
+    # one row per competition_year_id in team_results / ancillary_team_results
+    st.subheader(title)
     colA, colB = st.columns(2)
     with colA:
-        core_team_points = st.number_input(
-            "Total Core Score",
-            min_value=0.0,
-            step=0.0001,
-            format="%.4f",
-            value=float(core_team_points) if core_team_points is not None else 0.0,
-            key=f"{competition_year_id}_core_team_points",
-        )
+        st.number_input(score_label, min_value=0.0, step=0.0001, format="%.4f",
+                        value=_first(totals_df, "total_score", float, 0.0), key=f"{cy_id}_{kind}_team_points")
     with colB:
-        core_team_rank = st.number_input(
-            "Team Rank (Core Meats)",
-            min_value=0,
-            step=1,
-            value=int(core_team_rank) if core_team_rank is not None else 0,
-            key=f"{competition_year_id}_core_team_rank",
-        )
+        st.number_input(rank_label, min_value=0, step=1,
+                        value=_first(totals_df, "rank", int, 0), key=f"{cy_id}_{kind}_team_rank")
 
-    # -------------------------
-    # 5) Ancillary Categories & Results (competition-year-specific)
-    # -------------------------
+
+@st.fragment
+def ancillary_section(cy_id, anc_cat_df, anc_res_df):
     st.subheader("5) Ancillary / Sides / Misc Categories")
 
-    # Build list of categories for this competition_year (allow adding new)
+    # categories of this competition_year plus the ones added on the page
+    added_key = f"{cy_id}_added_categories"
     existing_categories = anc_cat_df["category_name"].tolist() if not anc_cat_df.empty else []
-    new_cat = st.text_input("Add a new ancillary category (optional)")
-    if new_cat:
-        if new_cat.strip() not in existing_categories:
-            existing_categories.append(new_cat.strip())
-
-    anc_inputs = {}
-    for cat in existing_categories:
-        # find existing result for this category if any (usually one per team)
+    with st.form(f"{cy_id}_add_category", clear_on_submit=True, border=False):
+        c1, c2 = st.columns([6, 2], vertical_alignment="bottom")
+        new_cat = c1.text_input("Add a new ancillary category (optional)")
+        if c2.form_submit_button("Add") and new_cat.strip():
+            added = st.session_state.setdefault(added_key, [])
+            if new_cat.strip() not in existing_categories + added:
+                added.append(new_cat.strip())
+    categories = existing_categories + st.session_state.get(added_key, [])
+    st.session_state[f"{cy_id}_categories"] = categories
+
+    cat_ids = dict(zip(anc_cat_df["category_name"], anc_cat_df["id"])) if not anc_cat_df.empty else {}
+    for cat in categories:
+        # existing result for this category if any (usually one per team)
         existing_row = pd.DataFrame()
-        if not anc_res_df.empty and "category_id" in anc_res_df.columns:
-            # we need category id mapping: find category id for this name in anc_cat_df
-            if not anc_cat_df.empty and "category_name" in anc_cat_df.columns:
-                cat_rows = anc_cat_df[anc_cat_df["category_name"] == cat]
-                if not cat_rows.empty:
-                    cat_id = cat_rows.iloc[0]["id"]
-                    existing_row = anc_res_df[anc_res_df["category_id"] == cat_id]
-
-        c1, c2, c3 = st.columns([4, 2, 2])
-        with c1:
-            participant = st.text_input(f"{cat} Participant", value=(existing_row["participant"].iloc[0] if not existing_row.empty else ""), key=f"{competition_year_id}_{cat}_participant")
-        with c2:
-            score = st.number_input(f"{cat} Score", min_value=0.0, step=0.0001, format="%.4f", value=(float(existing_row["score"].iloc[0]) if not existing_row.empty and pd.notna(existing_row["score"].iloc[0]) else 0.0), key=f"{competition_year_id}_{cat}_score")
-        with c3:
-            rank = st.number_input(f"{cat} Rank", min_value=0, step=1, value=(int(existing_row["rank"].iloc[0]) if not existing_row.empty and pd.notna(existing_row["rank"].iloc[0]) else 0), key=f"{competition_year_id}_{cat}_rank")
-        anc_inputs[cat] = {"participant": participant or None, "score": float(score), "rank": int(rank)}
+        if cat in cat_ids and not anc_res_df.empty and "category_id" in anc_res_df.columns:
+            existing_row = anc_res_df[anc_res_df["category_id"] == cat_ids[cat]]
+        _result_inputs(cy_id, cat, existing_row)
+
+
+@st.fragment
+def save_section(cy_id):
+    if st.button("💾 Save All"):
+        if not cy_id:
+            st.error("Select or create a competition year first.")
+            return
+        state = st.session_state
+        with phase("save"):
+            errors = save_all(cy_id, _read_inputs(cy_id, MEATS),
+                              state.get(f"{cy_id}_core_team_points", 0.0), state.get(f"{cy_id}_core_team_rank", 0),
+                              _read_inputs(cy_id, state.get(f"{cy_id}_categories", [])),
+                              state.get(f"{cy_id}_anc_team_points", 0.0), state.get(f"{cy_id}_anc_team_rank", 0))
+        for msg in errors:
+            st.error(msg)
+        if not errors:
+            state.pop(f"{cy_id}_added_categories", None)
+            st.toast("Saved all entries.")
+            st.rerun()
+
+
+# st.set_page_config(page_title="BBQ Competition Intake Form", layout="centered")
+def render():
+    st.title("🍴 Intake Form — Competitions & Results")
 
     # -------------------------
-    # Ancillary Team Totals (separated and displayed after ancillary)
+    # Load master data (full page runs only; fragment reruns reuse it)
     # -------------------------
-    st.subheader("6) Team Totals (Ancillary Only)")
-
-    anc_team_points = None
-    anc_team_rank = None
-    if not anc_team_df.empty:
-        anc_team_points = anc_team_df["total_score"].iloc[0] if "total_score" in anc_team_df.columns else None
-        anc_team_rank = anc_team_df["rank"].iloc[0] if "rank" in anc_team_df.columns else None
-
-    cA, cB = st.columns(2)
-    with cA:
-        anc_team_points = st.number_input(
-            "Total Ancillary Score",
-            min_value=0.0,
-            step=0.0001,
-            format="%.4f",
-            value=float(anc_team_points) if anc_team_points is not None else 0.0,
-            key=f"{competition_year_id}_anc_team_points",
-        )
-    with cB:
-        anc_team_rank = st.number_input(
-            "Team Rank (Ancillaries)",
-            min_value=0,
-            step=1,
-            value=int(anc_team_rank) if anc_team_rank is not None else 0,
-            key=f"{competition_year_id}_anc_team_rank",
-        )
+    with phase("load"):
+        index, events_df, years_df = load_event_index()
+
+    mode = st.radio("Mode", ["Single year", "Season grid"], horizontal=True, key="intake_mode")
+    if mode == "Season grid":
+        season_grid.render(events_df, years_df)
+        return
 
     # -------------------------
-    # 7) SAVE / UPSERT logic
+    # 1) Event and 2) Competition Year pickers (O(1) lookups in the index)
     # -------------------------
-    if st.button("💾 Save All"):
-        if not competition_year_id:
-            st.error("Select or create a competition year first.")
-            st.stop()
-
-        # 7a: Upsert core meats (use on_conflict on competition_year_id,meat)
-        for meat, vals in core_inputs.items():
-            payload = {
-                "competition_year_id": competition_year_id,
-                "meat": meat,
-                "participant": vals["participant"],
-                "score": vals["score"],
-                "rank": vals["rank"],
-            }
-            # upsert on competition_year_id + meat (unique logical key)
-            resp = supabase_upsert("meat_results", payload, on_conflict="competition_year_id,meat")
-            if resp.status_code not in (200,201):
-                st.error(f"Error upserting meat {meat}: {resp.text}")
-
-        # 7b: Upsert core team totals (unique competition_year_id)
-        core_payload = {
-            "competition_year_id": competition_year_id,
-            "total_score": float(core_team_points),
-            "rank": int(core_team_rank)
-        }
-        resp_core_team = supabase_upsert("team_results", core_payload, on_conflict="competition_year_id")
-        if resp_core_team.status_code not in (200,201):
-            st.error(f"Error saving core team totals: {resp_core_team.text}")
-
-        # 7c: Ensure ancillary categories exist, then upsert ancillary results
-        # first refresh ancillary categories for this competition_year
-        anc_cat_df = load_table("ancillary_categories")
-        anc_cat_df = anc_cat_df[anc_cat_df["competition_year_id"] == competition_year_id] if not anc_cat_df.empty else pd.DataFrame()
-
-        for cat_name, vals in anc_inputs.items():
-            # find category id
-            cat_row = anc_cat_df[anc_cat_df["category_name"] == cat_name] if not anc_cat_df.empty else pd.DataFrame()
-            if cat_row.empty:
-                # create category
-                r = supabase_insert("ancillary_categories", {"competition_year_id": competition_year_id, "category_name": cat_name})
-                if r.status_code in (200,201):
-                    cat_id = r.json()[0]["id"]
-                    # update local anc_cat_df
-                    anc_cat_df = pd.concat([anc_cat_df, pd.DataFrame([{"id": cat_id, "competition_year_id": competition_year_id, "category_name": cat_name}])], ignore_index=True)
-                else:
-                    st.error(f"Failed to create ancillary category {cat_name}: {r.text}")
-                    continue
-            else:
-                cat_id = cat_row.iloc[0]["id"]
-
-            payload = {
-                "competition_year_id": competition_year_id,
-                "category_id": cat_id,
-                "participant": vals["participant"],
-                "score": vals["score"],
-                "rank": vals["rank"]
-            }
-            # upsert on competition_year_id + category_id (assumes one row per category per team)
-            resp = supabase_upsert("ancillary_results", payload, on_conflict="competition_year_id,category_id")
-            if resp.status_code not in (200,201):
-                st.error(f"Error saving ancillary {cat_name}: {resp.text}")
-
-        # 7d: Upsert ancillary team totals
-        anc_team_payload = {
-            "competition_year_id": competition_year_id,
-            "total_score": float(anc_team_points),
-            "rank": int(anc_team_rank)
-        }
-        resp_anc_team = supabase_upsert("ancillary_team_results", anc_team_payload, on_conflict="competition_year_id")
-        if resp_anc_team.status_code not in (200,201):
-            st.error(f"Error saving ancillary team totals: {resp_anc_team.text}")
+    if index.event_id(st.session_state.get("intake_event")) is None:
+        st.session_state["intake_event"] = NEW_EVENT
+    selected_event = st.session_state["_intake_event_shown"] = st.session_state["intake_event"]
+    event_picker(index)
 
-        st.success("Saved all entries.")
-        st.rerun()
+    ev_id = index.event_id(selected_event)
+    years_for_event = [NEW_YEAR] + (index.years_of(ev_id) if ev_id is not None else [])
+    _init_choice("intake_year", years_for_event)
+    selected_year_option = st.session_state["_intake_year_shown"] = st.session_state["intake_year"]
+    year_picker(ev_id, years_for_event)
+
+    # -------------------------
+    # Determine selected competition_year_id
+    # -------------------------
+    competition_year_id = None
+    if selected_year_option != NEW_YEAR and ev_id is not None:
+        competition_year_id = index.year_id(ev_id, selected_year_option)
+
+    # -------------------------
+    # Load existing rows for the selected competition_year_id
+    # -------------------------
+    with phase("load_year"):
+        meat_df, anc_cat_df, anc_res_df, team_df, anc_team_df = year_rows(competition_year_id)
+
+    # -------------------------
+    # 3) Core meats, 4) core team totals, 5) ancillary, 6) ancillary totals
+    # -------------------------
+    core_meats_section(competition_year_id, meat_df)
+    team_totals_section(competition_year_id, team_df, "core", "4) Team Totals (Core Meats Only)",
+                        "Total Core Score", "Team Rank (Core Meats)")
+    ancillary_section(competition_year_id, anc_cat_df, anc_res_df)
+    team_totals_section(competition_year_id, anc_team_df, "anc", "6) Team Totals (Ancillary Only)",
+                        "Total Ancillary Score", "Team Rank (Ancillaries)")
+
+    # -------------------------
+    # 7) SAVE / UPSERT logic
+    # -------------------------
+    save_section(competition_year_id)
     # # -----------------------------
     # # Load Competitions
     # # -----------------------------
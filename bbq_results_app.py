@@ -1,9 +1,14 @@
+import json
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 import requests
-from supabase_client import supabase_get
+from table_cache import snapshot
+import change_feed
 from utils import sidebar_logo, app_navigation
+import analytics
+from profiling import phase
+from grid import paged_dataframe
+from cube import PivotCube, MEASURES
 
 # def render():
 #     st.title("🔥 BBQ Results Dashboard")
@@ -14,26 +19,84 @@ from utils import sidebar_logo, app_navigation
 # ---------------------------------------------------
 # LOAD ALL TABLES SAFELY
 # ---------------------------------------------------
-@st.cache_data
+TABLES = {
+    "events": "competition_events",
+    "years": "competition_years",
+    "meats": "meat_results",
+    "team": "team_results",
+    "anc_cat": "ancillary_categories",
+    "anc": "ancillary_results",
+    "anc_team": "ancillary_team_results",
+}
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def _data_version(tokens, _tables):
+    # content fingerprint, hashed once per combination of table snapshots
+    return analytics.data_version(_tables)
+
+
 def load_all():
-    def get_df(table):
-        resp = supabase_get(table)
-        if resp is None or resp.status_code != 200:
-            return pd.DataFrame()
-        data = resp.json()
-        if isinstance(data, dict):
-            return pd.DataFrame([data])
-        return pd.DataFrame(data)
-
-    return {
-        "events": get_df("competition_events"),
-        "years": get_df("competition_years"),
-        "meats": get_df("meat_results"),
-        "team": get_df("team_results"),
-        "anc_cat": get_df("ancillary_categories"),
-        "anc": get_df("ancillary_results"),
-        "anc_team": get_df("ancillary_team_results"),
-    }
+    # tables come from the process-wide snapshot cache (shared by every
+    # session, kept current by the change feed or dropped on writes)
+    change_feed.refresh()
+    tables, tokens = {}, []
+    for key, table in TABLES.items():
+        tables[key], token = snapshot(table)
+        tokens.append(token)
+    tables["version"] = _data_version(tuple(tokens), tables)
+    return tables
+
+
+def filter_results(df, year, event, group_col, groups):
+    # "All" means no filter for year / event; empty groups means all groups
+    filtered = df.copy()
+    if year != "All":
+        filtered = filtered[filtered["year"].astype(str) == year]
+    if event != "All":
+        filtered = filtered[filtered["event_name"] == event]
+    if groups:
+        filtered = filtered[filtered[group_col].isin(groups)]
+    return filtered
+
+
+# one pair of cubes per process; refreshed incrementally when the data
+# version behind load_all changes
+@st.cache_resource
+def get_cubes():
+    return {"core": PivotCube("meat"), "anc": PivotCube("category_name")}
+
+
+# ---------------------------------------------------
+# TREND CHARTS (memoized per filter set + data version)
+# ---------------------------------------------------
+@st.cache_data(max_entries=64, show_spinner=False)
+def trend_figure(version, group_col, year, event, groups, title, _filtered):
+    # plotly figure JSON for the percentile trend of an already filtered
+    # frame; the arguments other than _filtered are the cache key and fully
+    # determine it. None when there is nothing to plot.
+    # plotly.express is the slowest import in the app; only pay for it here
+    import plotly.express as px
+
+    trend, note = analytics.trend_series(_filtered, group_col)
+    if trend.empty:
+        return None
+    fig = px.line(
+        trend,
+        x="year",
+        y="Percentile Rank",
+        color=group_col,
+        markers=True,
+        title=f"{title} ({note})" if note else title,
+    )
+    fig.update_yaxes(range=[0, 100])
+    return fig.to_json()
+
+
+def plot_trend(version, group_col, year, event, groups, title, filtered):
+    spec = trend_figure(version, group_col, year, event, tuple(groups), title, filtered)
+    if spec is not None:
+        st.plotly_chart(json.loads(spec), use_container_width=True)
 
 
 # ---------------------------------------------------
@@ -44,15 +107,11 @@ def render():
     st.caption("Analyze results across competitions, meats, and ancillary categories")
 
     # Load DB
-    tables = load_all()
+    with phase("load"):
+        tables = load_all()
 
     events = tables["events"]
     years = tables["years"]
-    meats = tables["meats"]
-    team = tables["team"]
-    anc_cat = tables["anc_cat"]
-    anc = tables["anc"]
-    anc_team = tables["anc_team"]
 
     # -------------------------------------
     # BASIC VALIDATION
@@ -66,57 +125,17 @@ def render():
         st.stop()
 
     # -------------------------------------
-    # MERGE CORE MEATS
-    # -------------------------------------
-    if not meats.empty:
-        core = (
-            meats
-            .merge(years, left_on="competition_year_id", right_on="id", suffixes=("", "_year"))
-            .merge(events, left_on="event_id", right_on="id", suffixes=("", "_event"))
-        )
-
-        # Add team results
-        if not team.empty:
-            core = core.merge(
-                team,
-                left_on="competition_year_id",
-                right_on="competition_year_id",
-                how="left",
-                suffixes=("", "_team"),
-            )
-
-        # Compute percentile rank
-        core["Percentile Rank"] = 100 * (1 - ((core["rank"] - 1) / core["total_teams"]))
-    else:
-        core = pd.DataFrame()
-
-    # -------------------------------------
-    # MERGE ANCILLARY
+    # MERGE + DERIVED METRICS (cached per data version)
     # -------------------------------------
-    if not anc.empty:
-        anc_df = (
-            anc.merge(anc_cat, left_on="category_id", right_on="id", suffixes=("", "_cat"))
-            .merge(years, left_on="competition_year_id", right_on="id", suffixes=("", "_year"))
-            .merge(events, left_on="event_id", right_on="id", suffixes=("", "_event"))
-        )
-
-        if not anc_team.empty:
-            anc_df = anc_df.merge(
-                anc_team,
-                left_on="competition_year_id",
-                right_on="competition_year_id",
-                how="left",
-                suffixes=("", "_team")
-            )
-
-        anc_df["Percentile Rank"] = 100 * (1 - ((anc_df["rank"] - 1) / anc_df["total_teams"]))
-    else:
-        anc_df = pd.DataFrame()
+    with phase("merge"):
+        metrics = analytics.get_metrics(tables)
+    core = metrics["core"]
+    anc_df = metrics["anc"]
 
     # -------------------------------------
     # UI TABS (Core Meats / Ancillary)
     # -------------------------------------
-    tab1, tab2 = st.tabs(["🍖 Core Meats", "🍰 Ancillary Categories"])
+    tab1, tab2, tab3 = st.tabs(["🍖 Core Meats", "🍰 Ancillary Categories", "🆚 Compare Events"])
 
     # ====================================================
     # ---------------- CORE MEATS TAB --------------------
@@ -135,17 +154,14 @@ def render():
             c_event = st.selectbox("Competition", ["All"] + events_filter)
             c_meats = st.multiselect("Meat", meats_filter, default=meats_filter)
 
-            filtered = core.copy()
-            if c_year != "All":
-                filtered = filtered[filtered["year"].astype(str) == c_year]
-            if c_event != "All":
-                filtered = filtered[filtered["event_name"] == c_event]
-            if c_meats:
-                filtered = filtered[filtered["meat"].isin(c_meats)]
-
-            st.dataframe(
-                filtered[
-                    [
+            with phase("filter"):
+                filtered = filter_results(core, c_year, c_event, "meat", c_meats)
+
+            with phase("widgets"):
+                paged_dataframe(
+                    filtered,
+                    key="core_grid",
+                    columns=[
                         "year",
                         "event_name",
                         "location",
@@ -156,31 +172,23 @@ def render():
                         "score",
                         "rank",
                         "Percentile Rank",
+                        "Score Z",
                         "total_score",
                         "rank_team",
                         "total_teams",
-                    ]
-                ],
-                use_container_width=True,
-            )
+                    ],
+                    reset_on=(c_year, c_event, tuple(c_meats)),
+                )
 
             # Trend line
-            trend = (
-                filtered.groupby(["year", "meat"], as_index=False)
-                .agg({"Percentile Rank": "mean"})
-            )
-
-            if not trend.empty:
-                fig = px.line(
-                    trend,
-                    x="year",
-                    y="Percentile Rank",
-                    color="meat",
-                    markers=True,
-                    title="Year-over-Year Percentile Trend (Core Meats)",
-                )
-                fig.update_yaxes(range=[0, 100])
-                st.plotly_chart(fig, use_container_width=True)
+            with phase("chart"):
+                plot_trend(tables["version"], "meat", c_year, c_event, c_meats,
+                           "Year-over-Year Percentile Trend (Core Meats)", filtered)
+
+            with st.expander(f"Rolling {analytics.ROLLING_WINDOW}-year averages by meat"):
+                st.dataframe(metrics["core_rolling"], use_container_width=True)
+            with st.expander("Best / worst finishes by participant"):
+                st.dataframe(metrics["core_participants"], use_container_width=True)
 
     # ====================================================
     # ---------------- ANCILLARY TAB ---------------------
@@ -199,17 +207,14 @@ def render():
             a_event = st.selectbox("Competition", ["All"] + events_filter, key="aevent")
             a_cat = st.multiselect("Category", cats_filter, default=cats_filter, key="acat")
 
-            filtered = anc_df.copy()
-            if a_year != "All":
-                filtered = filtered[filtered["year"].astype(str) == a_year]
-            if a_event != "All":
-                filtered = filtered[filtered["event_name"] == a_event]
-            if a_cat:
-                filtered = filtered[filtered["category_name"].isin(a_cat)]
-
-            st.dataframe(
-                filtered[
-                    [
+            with phase("filter"):
+                filtered = filter_results(anc_df, a_year, a_event, "category_name", a_cat)
+
+            with phase("widgets"):
+                paged_dataframe(
+                    filtered,
+                    key="anc_grid",
+                    columns=[
                         "year",
                         "event_name",
                         "location",
@@ -220,28 +225,66 @@ def render():
                         "score",
                         "rank",
                         "Percentile Rank",
+                        "Score Z",
                         "total_score",
                         "rank_team",
                         "total_teams",
-                    ]
-                ],
-                use_container_width=True,
-            )
+                    ],
+                    reset_on=(a_year, a_event, tuple(a_cat)),
+                )
 
             # Trend line
-            trend = (
-                filtered.groupby(["year", "category_name"], as_index=False)
-                .agg({"Percentile Rank": "mean"})
-            )
-
-            if not trend.empty:
-                fig = px.line(
-                    trend,
-                    x="year",
-                    y="Percentile Rank",
-                    color="category_name",
-                    markers=True,
-                    title="Year-over-Year Percentile Trend (Ancillary)",
-                )
-                fig.update_yaxes(range=[0, 100])
-                st.plotly_chart(fig, use_container_width=True)
+            with phase("chart"):
+                plot_trend(tables["version"], "category_name", a_year, a_event, a_cat,
+                           "Year-over-Year Percentile Trend (Ancillary)", filtered)
+
+            with st.expander(f"Rolling {analytics.ROLLING_WINDOW}-year averages by category"):
+                st.dataframe(metrics["anc_rolling"], use_container_width=True)
+            with st.expander("Best / worst finishes by participant"):
+                st.dataframe(metrics["anc_participants"], use_container_width=True)
+
+    # ====================================================
+    # ---------------- COMPARE EVENTS TAB ----------------
+    # ====================================================
+    with tab3:
+        st.subheader("🆚 Compare Events")
+
+        with phase("merge"):
+            cubes = get_cubes()
+            cubes["core"].update(core, version=tables["version"])
+            cubes["anc"].update(anc_df, version=tables["version"])
+
+        kind = st.radio("Results", ["Core Meats", "Ancillary"], horizontal=True, key="cmp_kind")
+        cube = cubes["core"] if kind == "Core Meats" else cubes["anc"]
+        label = "Meat" if kind == "Core Meats" else "Category"
+
+        if not len(cube.dims["event"]):
+            st.info("No results available.")
+        else:
+            events_all = sorted(cube.dims["event"].labels)
+            groups_all = sorted(cube.dims["group"].labels)
+            years_all = sorted(cube.dims["year"].labels)
+
+            cmp_events = st.multiselect("Competitions", events_all, default=events_all[:2], key="cmp_events")
+            c1, c2 = st.columns([1, 2])
+            with c1:
+                measure = st.selectbox("Measure", list(MEASURES), key="cmp_measure")
+            with c2:
+                cmp_groups = st.multiselect(label, groups_all, default=groups_all, key=f"cmp_groups_{kind}")
+            if years_all[0] < years_all[-1]:
+                lo, hi = st.slider("Years", years_all[0], years_all[-1], (years_all[0], years_all[-1]), key="cmp_years")
+            else:
+                lo = hi = years_all[0]
+
+            if not cmp_events:
+                st.info("Pick at least one competition to compare.")
+            else:
+                cmp_years = [y for y in years_all if lo <= y <= hi]
+                with phase("filter"):
+                    summary = cube.summary(measure, cmp_events, cmp_years, cmp_groups or None)
+                    by_year = cube.compare(measure, cmp_events, cmp_years, cmp_groups or None)
+                with phase("widgets"):
+                    st.caption(f"Mean {measure.lower()} over {lo}–{hi}")
+                    st.dataframe(summary.rename_axis(label), use_container_width=True)
+                    st.caption("By year")
+                    st.dataframe(by_year.rename_axis(["Year", label]), use_container_width=True)
@@ -0,0 +1,52 @@
+# benchmarks/bench_cli_import.py
+# Throughput of the parallel CLI importer (migrate_excel_to_supabase) against
+# the PostgREST stub with a simulated round trip, per worker count.
+#
+#   python -m benchmarks.bench_cli_import [--rows 50000] [--latency-ms 20] [--workers 1,2,4,8]
+import argparse
+import json
+import os
+import tempfile
+from pathlib import Path
+
+from benchmarks.stub_server import StubStore, serve
+from benchmarks.synthetic import generate, legacy_export
+
+
+def main(args):
+    tables = generate(n_events=max(50, args.rows // 130), seed=args.seed)
+    legacy = legacy_export(tables, n_years=len(tables["years"])).head(args.rows)
+
+    store = StubStore(latency_ms=args.latency_ms)
+    server, url = serve(store)
+    os.environ["SUPABASE_URL"], os.environ["SUPABASE_KEY"] = url, "bench"
+    import supabase_client
+    import migrate_excel_to_supabase
+    supabase_client.SUPABASE_URL, supabase_client.SUPABASE_KEY = url, "bench"
+
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / ("legacy.xlsx" if args.xlsx else "legacy.csv")
+        legacy.to_excel(path, index=False) if args.xlsx else legacy.to_csv(path, index=False)
+        plan = [(int(w), "thread") for w in args.workers.split(",")]
+        if args.process:
+            plan.append((max(w for w, _ in plan), "process"))
+        for workers, mode in plan:
+            store.tables.clear()
+            store.next_id.clear()
+            s = migrate_excel_to_supabase.import_excel(path, workers=workers, mode=mode, progress=False)
+            written = len(store.rows("meat_results")) + len(store.rows("ancillary_results"))
+            runs.append({**s, "written": written, "consistent": written == s["imported"]})
+    server.shutdown()
+    return {"rows": len(legacy), "latency_ms": args.latency_ms, "runs": runs}
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=50_000)
+    ap.add_argument("--latency-ms", type=float, default=20)
+    ap.add_argument("--workers", default="1,2,4,8")
+    ap.add_argument("--process", action="store_true", help="also run process workers at the largest count")
+    ap.add_argument("--xlsx", action="store_true", help="write the export as .xlsx instead of .csv")
+    ap.add_argument("--seed", type=int, default=7)
+    print(json.dumps(main(ap.parse_args()), indent=2))
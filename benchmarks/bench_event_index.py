@@ -0,0 +1,101 @@
+# benchmarks/bench_event_index.py
+# Event picker lookups: event_index.EventIndex against the DataFrame scans
+# the intake page used, and the server-side ilike search on the stub
+# (uncached, and repeated as the picker's reruns do).
+#
+#   python -m benchmarks.bench_event_index [--events 20000]
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.stub_server import StubStore, serve
+
+
+def _frames(n_events, seed):
+    rng = np.random.default_rng(seed)
+    words = ["Smoke", "Q", "Pit", "Ribfest", "BBQ", "Blues", "Hog", "Fire", "Cook-Off", "Classic", "Jam", "Roast"]
+    names = [f"{' '.join(rng.choice(words, 2))} {i}" for i in range(n_events)]
+    events = pd.DataFrame({"id": np.arange(1, n_events + 1), "event_name": names,
+                           "location": [f"Town {i}" for i in range(n_events)]})
+    years = pd.DataFrame({"id": np.arange(1, 5 * n_events + 1),
+                          "event_id": np.repeat(events["id"].to_numpy(), 5),
+                          "year": np.tile(np.arange(2020, 2025), n_events)})
+    return events, years
+
+
+def _best(fn, repeat=5):
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - t0)
+    return min(runs)
+
+
+def main(args):
+    from event_index import EventIndex, search_server
+    from table_cache import CACHE
+    import supabase_client
+
+    events, years = _frames(args.events, args.seed)
+    t0 = time.perf_counter()
+    index = EventIndex(events, years)
+    build_s = time.perf_counter() - t0
+
+    rng = np.random.default_rng(args.seed)
+    picks = events["event_name"].sample(200, random_state=args.seed).tolist()
+    queries = [n.split()[0][:3].lower() for n in picks[:50]] + [n[-6:] for n in picks[:50]]
+
+    def scan_pick():
+        for name in picks:
+            ev_id = events[events["event_name"] == name]["id"].values[0]
+            years[(years["event_id"] == ev_id) & (years["year"].astype(str) == "2022")]
+
+    def index_pick():
+        for name in picks:
+            index.year_id(index.event_id(name), "2022")
+
+    def scan_search():
+        for q in queries:
+            events[events["event_name"].str.contains(q, case=False, regex=False)]["event_name"].head(50).tolist()
+
+    def index_search():
+        for q in queries:
+            index.search(q)
+
+    store = StubStore()
+    store.load_frames({"competition_events": events})
+    server, url = serve(store)
+    supabase_client.SUPABASE_URL, supabase_client.SUPABASE_KEY = url, "bench"
+    def server_search():
+        CACHE.clear()
+        for q in queries[:20]:
+            search_server(q)
+
+    server_s = _best(server_search, repeat=2) / 20
+    cached_s = _best(lambda: [search_server(q) for q in queries[:20]]) / 20
+    server.shutdown()
+
+    assert all(set(index.search(q, 10**6)) == set(events.loc[events["event_name"].str.contains(q.strip(), case=False, regex=False), "event_name"])
+               for q in queries if len(q.strip()) >= 3)
+    per = lambda s, n: round(s / n * 1e6, 1)
+    return {
+        "events": args.events,
+        "index_build_ms": round(build_s * 1000, 1),
+        "pick_us": {"scan": per(_best(scan_pick, 2), len(picks)), "index": per(_best(index_pick), len(picks))},
+        "search_us": {"scan": per(_best(scan_search, 2), len(queries)), "index": per(_best(index_search), len(queries))},
+        "server_search_ms_stub": round(server_s * 1000, 2),
+        "server_search_cached_us": per(cached_s, 1),
+    }
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--events", type=int, default=20_000)
+    ap.add_argument("--seed", type=int, default=5)
+    os.environ.setdefault("SUPABASE_KEY", "bench")
+    print(json.dumps(main(ap.parse_args()), indent=2))
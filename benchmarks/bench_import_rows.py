@@ -0,0 +1,140 @@
+# benchmarks/bench_import_rows.py
+# Memory and throughput of the migration import representation.
+#
+#   python -m benchmarks.bench_import_rows [--rows 100000] [--no-import]
+#
+# 1. validated rows held as 16-key dicts (the previous representation) vs
+#    import_records.ImportRow with interned strings: traced bytes, build time
+# 2. result payloads serialized with the stdlib encoder from dicts vs
+#    supabase_client.dumps (orjson when installed) from the payload records
+# 3. end to end: migration_tool.import_rows into the PostgREST stub
+import argparse
+import gc
+import json
+import os
+import time
+import tracemalloc
+
+from benchmarks.stub_server import StubStore, serve
+from benchmarks.synthetic import generate, legacy_export
+
+
+def _legacy_frame(n_rows, seed):
+    # ~6 submissions per competition year; generate enough events to cover n_rows
+    tables = generate(n_events=max(50, n_rows // 130), seed=seed)
+    legacy = legacy_export(tables, n_years=len(tables["years"]))
+    return legacy.head(n_rows).reset_index(drop=True)
+
+
+def _dict_rows(rows):
+    # the previous representation: one dict per row, strings not shared
+    # between rows (pandas hands out a new str per cell)
+    copy = lambda s: None if s is None else "".join(list(s))
+    return [{
+        "year": r.year, "event": copy(r.event), "location": copy(r.location),
+        "start_date": r.start_date, "end_date": r.end_date, "total_teams": r.total_teams,
+        "meat": copy(r.meat), "ancillary_category": copy(r.ancillary_category),
+        "participant": copy(r.participant), "score": r.score, "rank": r.rank,
+        "team_total_score": r.team_total_score, "team_rank": r.team_rank,
+        "ancillary_team_total": r.ancillary_team_total, "ancillary_team_rank": r.ancillary_team_rank,
+    } for r in rows]
+
+
+def _traced(fn):
+    # (result, seconds, bytes still allocated by fn's result)
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    out = fn()
+    secs = time.perf_counter() - t0
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return out, secs, size
+
+
+def bench_rows(df):
+    import migration_tool
+
+    col_map = migration_tool.detect_columns(df)
+    t0 = time.perf_counter()
+    rows, errors = migration_tool.validate_rows(df, col_map)
+    validate_s = time.perf_counter() - t0
+
+    # rebuild both representations under tracemalloc from the same parse so
+    # only the row containers and their strings are counted
+    _, _, dict_bytes = _traced(lambda: _dict_rows(rows))
+    compact, _, compact_bytes = _traced(lambda: [type(r)(*(getattr(r, f) for f in r.__slots__)) for r in rows])
+    return rows, {
+        "rows": len(rows),
+        "validation_errors": len(errors),
+        "validate_s": round(validate_s, 3),
+        "validate_rows_per_s": int(len(df) / validate_s) if validate_s else None,
+        "dict_rows_mb": round(dict_bytes / 2**20, 1),
+        "compact_rows_mb": round(compact_bytes / 2**20, 1),
+        "bytes_per_row": {"dict": dict_bytes // max(len(rows), 1), "compact": compact_bytes // max(len(rows), 1)},
+    }
+
+
+def bench_serialize(rows):
+    from import_records import MeatResult
+    from supabase_client import dumps, orjson
+
+    records = [MeatResult(i % 5000, r.meat or "", r.participant, r.score, r.rank) for i, r in enumerate(rows)]
+    dicts = [{"competition_year_id": p.competition_year_id, "meat": p.meat, "participant": p.participant,
+              "score": p.score, "rank": p.rank} for p in records]
+
+    def best(fn, repeat=3):
+        runs = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            out = fn()
+            runs.append(time.perf_counter() - t0)
+        return out, min(runs)
+
+    std_body, std_s = best(lambda: json.dumps(dicts).encode())
+    fast_body, fast_s = best(lambda: dumps(records))
+    assert json.loads(std_body) == json.loads(fast_body)
+    return {
+        "encoder": "orjson" if orjson is not None else "json (orjson not installed)",
+        "stdlib_dicts_ms": round(std_s * 1000, 1),
+        "dumps_records_ms": round(fast_s * 1000, 1),
+        "stdlib_rows_per_s": int(len(records) / std_s),
+        "dumps_rows_per_s": int(len(records) / fast_s),
+        "body_kb": {"stdlib": len(std_body) // 1024, "dumps": len(fast_body) // 1024},
+    }
+
+
+def bench_import(rows):
+    store = StubStore()
+    server, url = serve(store)
+    os.environ["SUPABASE_URL"], os.environ["SUPABASE_KEY"] = url, "bench"
+    import supabase_client
+    import migration_tool
+    supabase_client.SUPABASE_URL, supabase_client.SUPABASE_KEY = url, "bench"
+
+    errors = []
+    t0 = time.perf_counter()
+    imported = migration_tool.import_rows(rows, on_error=errors.append)
+    secs = time.perf_counter() - t0
+    server.shutdown()
+    return {
+        "imported": imported,
+        "errors": len(errors),
+        "import_s": round(secs, 2),
+        "import_rows_per_s": int(imported / secs) if secs else None,
+    }
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--no-import", action="store_true", help="skip the end-to-end stub import")
+    args = ap.parse_args()
+
+    df = _legacy_frame(args.rows, args.seed)
+    rows, rows_report = bench_rows(df)
+    report = {"rows": rows_report, "serialize": bench_serialize(rows)}
+    if not args.no_import:
+        report["import"] = bench_import(rows)
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,111 @@
+# benchmarks/bench_importtime.py
+# Cold-start import cost of the app shell and of each page module, measured
+# with `python -X importtime` in fresh interpreters.
+#
+#   python -m benchmarks.bench_importtime --repeat 5 --out importtime.json
+#   python -m benchmarks.compare importtime_base.json importtime_head.json
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks.run import _commit
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# what app.py imports before the first page is drawn
+SHELL = ["streamlit", "utils", "metrics", "profiling"]
+
+# page modules, as registered in app.PAGES
+PAGES = ["Home", "migration_tool", "bbq_intake", "bbq_results_app", "leaderboard"]
+
+
+def importtime(modules):
+    # one fresh interpreter; returns [(self_us, cumulative_us, depth, name)]
+    env = dict(os.environ, SUPABASE_URL=os.environ.get("SUPABASE_URL", "http://localhost"),
+               SUPABASE_KEY=os.environ.get("SUPABASE_KEY", "bench"))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + ", ".join(modules)],
+        capture_output=True, text=True, cwd=ROOT, env=env, timeout=300,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import of {modules} failed:\n{proc.stderr[-2000:]}")
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((int(self_us), int(cum_us), depth, name.strip()))
+    return entries
+
+
+def split(entries, targets):
+    # cumulative seconds of the listed top-level imports, and the heaviest
+    # packages pulled in underneath them. importtime prints children before
+    # their parent, so a top-level module's subtree is the block of lines
+    # since the previous top-level entry.
+    total, heavy, block = 0, [], []
+    for _, cum, depth, name in entries:
+        if depth > 0:
+            if depth == 1:
+                block.append((cum, name))
+            continue
+        if name in targets:
+            total += cum
+            heavy.extend(block)
+        block = []
+    heavy.sort(reverse=True)
+    return total / 1e6, [(n, c / 1e6) for c, n in heavy[:8]]
+
+
+def run(repeat):
+    shell_runs = []
+    page_runs = {p: [] for p in PAGES}
+    heaviest = {}
+    for _ in range(repeat):
+        shell_runs.append(split(importtime(SHELL), SHELL)[0])
+        for page in PAGES:
+            # shell first, so the page entry is its marginal cost on navigation
+            page_s, heavy = split(importtime(SHELL + [page]), [page])
+            page_runs[page].append(page_s)
+            heaviest[page] = heavy
+
+    def stats(runs):
+        return {"min_s": round(min(runs), 6), "median_s": round(statistics.median(runs), 6), "runs": len(runs)}
+
+    timings = {"import.shell": stats(shell_runs)}
+    print(f"  {'import.shell':<40} {min(shell_runs) * 1000:10.1f} ms", file=sys.stderr)
+    for page, runs in page_runs.items():
+        timings[f"import.page.{page}"] = stats(runs)
+        print(f"  {'import.page.' + page:<40} {min(runs) * 1000:10.1f} ms", file=sys.stderr)
+        for name, s in heaviest[page][:3]:
+            print(f"      {name:<36} {s * 1000:10.1f} ms", file=sys.stderr)
+
+    return {
+        "meta": {
+            "commit": _commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "shell": SHELL,
+            "heaviest": {p: [{"module": n, "cumulative_s": round(s, 6)} for n, s in h]
+                         for p, h in heaviest.items()},
+        },
+        "timings": timings,
+    }
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--out", default="bench_report_importtime.json")
+    args = ap.parse_args()
+
+    report = run(args.repeat)
+    Path(args.out).write_text(json.dumps(report, indent=2))
+    print(json.dumps(report["timings"], indent=2))
@@ -0,0 +1,80 @@
+# benchmarks/bench_leaderboard.py
+# Leaderboard page: grouping the fact frame on every rerun against the
+# participant x group x year cells built once per data version
+# (rollups.cells, cached by leaderboard.get_cells) and rolled up per rerun.
+#
+# python -m benchmarks.bench_leaderboard [--events N] [--first-year Y] [--last-year Y]
+import argparse
+import json
+import time
+
+import numpy as np
+
+import analytics
+import rollups
+from benchmarks.synthetic import generate
+
+
+def _timeit(fn, repeat=5):
+    best = float("inf")
+    out = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def adhoc_leaderboard(core):
+    # what the page would do without the cells: group the fact frame each rerun
+    g = core.groupby(["participant", "meat"]).agg(
+        Entries=("id", "size"),
+        mean_score=("score", "mean"),
+        mean_pct=("Percentile Rank", "mean"),
+        best_rank=("rank", "min"),
+    )
+    return g.sort_values("mean_pct", ascending=False)
+
+
+def run(n_events, first_year, last_year, repeat):
+    tables = generate(n_events=n_events, first_year=first_year, last_year=last_year)
+    core = analytics.build_core(tables)
+
+    t_adhoc, adhoc = _timeit(lambda: adhoc_leaderboard(core), repeat)
+    t_cells, cells = _timeit(lambda: rollups.cells(core, "meat"), repeat)
+    t_query, board = _timeit(lambda: rollups.leaderboard(cells), repeat)
+    t_filtered, filtered = _timeit(lambda: rollups.leaderboard(cells, groups=["Brisket"]), repeat)
+
+    # same numbers as grouping the fact rows directly
+    a = adhoc.sort_index()
+    b = board.set_index(["participant", "group"]).sort_index()
+    same = a.index.equals(b.index) and all(
+        np.allclose(a[x].to_numpy(dtype="float64"), b[y].to_numpy(dtype="float64"), equal_nan=True)
+        for x, y in (("Entries", "Entries"), ("mean_score", "Mean Score"),
+                     ("mean_pct", "Mean Percentile"), ("best_rank", "Best Rank"))
+    )
+
+    return {
+        "events": n_events,
+        "seasons": f"{first_year}-{last_year}",
+        "fact_rows": int(len(core)),
+        "cells": int(len(cells)),
+        "adhoc_groupby_per_rerun_s": round(t_adhoc, 6),
+        "cells_per_version_s": round(t_cells, 6),
+        "leaderboard_from_cells_per_rerun_s": round(t_query, 6),
+        "leaderboard_one_group_s": round(t_filtered, 6),
+        "leaderboard_rows": int(len(filtered)),
+        "cells_match_adhoc": bool(same),
+    }
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--events", type=int, default=1000)
+    ap.add_argument("--first-year", type=int, default=1990)
+    ap.add_argument("--last-year", type=int, default=2024)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+    report = run(args.events, args.first_year, args.last_year, args.repeat)
+    print(json.dumps(report, indent=2))
+    raise SystemExit(0 if report["cells_match_adhoc"] else 1)
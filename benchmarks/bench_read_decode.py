@@ -0,0 +1,171 @@
+# benchmarks/bench_read_decode.py
+# Decode time and peak RSS of the snapshot read path (table_cache._fetch,
+# behind load_all / load_table) on the responses of the PostgREST stub:
+#
+#   records   resp.json() + DataFrame(records), the previous path
+#   json      supabase_client.loads (orjson when installed) + one list per
+#             column (table_cache._frame_json, BBQ_READ_FORMAT=json)
+#   csv       Accept: text/csv through pyarrow's CSV reader
+#             (table_cache._frame_csv, the default)
+#
+# The responses are captured once and written to disk; each variant decodes
+# them in a fresh interpreter, so the server's own cost is left out and
+# peak_mb - base_mb is what decoding added on top of the response bytes.
+#
+#   python -m benchmarks.bench_read_decode [--events 2000] [--page-rows 0]
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.stub_server import StubStore, TABLE_NAMES, serve
+from benchmarks.synthetic import generate
+
+VARIANTS = ("records", "json", "csv")
+
+
+class _Page:
+    # the part of a requests.Response the decoders use
+    def __init__(self, content):
+        self.content = content
+
+    def json(self):
+        return json.loads(self.content)
+
+
+def capture(tables, out_dir, page_rows=None):
+    # writes every table's response pages, JSON and CSV, under out_dir;
+    # returns {format: bytes on the wire}
+    store = StubStore(max_rows=page_rows or None)
+    store.load_frames(tables)
+    server, url = serve(store)
+    import supabase_client
+    from supabase_client import Query
+    supabase_client.SUPABASE_URL, supabase_client.SUPABASE_KEY = url, "bench"
+    sizes = {"json": 0, "csv": 0}
+    for table in TABLE_NAMES.values():
+        for fmt, headers in (("json", None), ("csv", {"Accept": "text/csv"})):
+            for i, resp in enumerate(Query(table).order("id").pages(headers)):
+                with open(os.path.join(out_dir, f"{table}.{fmt}.{i:05d}"), "wb") as f:
+                    f.write(resp.content)
+                sizes[fmt] += len(resp.content)
+    server.shutdown()
+    return sizes
+
+
+def _pages(out_dir, table, fmt):
+    names = sorted(n for n in os.listdir(out_dir) if n.startswith(f"{table}.{fmt}."))
+    pages = []
+    for name in names:
+        with open(os.path.join(out_dir, name), "rb") as f:
+            pages.append(_Page(f.read()))
+    return pages
+
+
+def decode(variant, pages):
+    import pandas as pd
+    import table_cache
+    if variant == "records":
+        rows = []
+        for p in pages:
+            rows += p.json()
+        return pd.DataFrame(rows) if rows else pd.DataFrame()
+    if variant == "json":
+        return table_cache._frame_json(pages)
+    return table_cache._frame_csv(pages)
+
+
+def _status_mb(field):
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    raise KeyError(field)
+
+
+def _reset_peak():
+    # current RSS, after restarting the peak (VmHWM) from it where Linux
+    # allows; else the process's peak so far (ru_maxrss)
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return _status_mb("VmRSS")
+    except (OSError, KeyError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _peak_mb():
+    try:
+        return _status_mb("VmHWM")
+    except (OSError, KeyError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _child(variant, out_dir):
+    # runs in its own interpreter; prints {"peak_mb", "base_mb", "seconds", ...}
+    import pandas  # noqa: F401
+    import pyarrow.csv  # noqa: F401
+    import supabase_client  # noqa: F401
+    import table_cache  # noqa: F401
+    fmt = "json" if variant in ("records", "json") else "csv"
+    responses = {t: _pages(out_dir, t, fmt) for t in TABLE_NAMES.values()}
+    base = _reset_peak()
+    t0 = time.perf_counter()
+    frames = {t: decode(variant, pages) for t, pages in responses.items()}
+    seconds = time.perf_counter() - t0
+    print(json.dumps({"peak_mb": round(_peak_mb(), 1), "base_mb": round(base, 1), "seconds": round(seconds, 3),
+                      "rows": sum(len(f) for f in frames.values())}))
+
+
+def measure(out_dir, variants=VARIANTS):
+    out = {}
+    for variant in variants:
+        proc = subprocess.run([sys.executable, "-m", "benchmarks.bench_read_decode", "--child", variant, out_dir],
+                              capture_output=True, text=True, check=True)
+        out[variant] = json.loads(proc.stdout.strip().splitlines()[-1])
+    return out
+
+
+def same_frames(out_dir):
+    # every variant decodes every table to the same frame
+    import pandas as pd
+    for table in TABLE_NAMES.values():
+        ref = decode("records", _pages(out_dir, table, "json"))
+        for variant in VARIANTS[1:]:
+            df = decode(variant, _pages(out_dir, table, "json" if variant == "json" else "csv"))
+            try:
+                pd.testing.assert_frame_equal(ref, df, check_dtype=False)
+            except AssertionError:
+                return False
+    return True
+
+
+def main(args):
+    tables = generate(n_events=args.events, seed=args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        sizes = capture(tables, tmp, args.page_rows)
+        report = {
+            "events": args.events,
+            "rows": sum(len(df) for df in tables.values()),
+            "wire_mb": {fmt: round(n / 1e6, 1) for fmt, n in sizes.items()},
+            **measure(tmp),
+            "same_frames": same_frames(tmp),
+        }
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--events", type=int, default=2000)
+    ap.add_argument("--page-rows", type=int, default=0, help="cap rows per response like db-max-rows (0: no cap)")
+    ap.add_argument("--seed", type=int, default=17)
+    ap.add_argument("--child", nargs=2, metavar=("VARIANT", "DIR"), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.child:
+        _child(*args.child)
+    else:
+        print(json.dumps(main(args), indent=2))
@@ -0,0 +1,168 @@
+# benchmarks/bench_upload_memory.py
+# Peak RSS of the Migration Tool upload path on a large workbook: the old
+# in-memory path (ExcelFile over the upload's bytes, every sheet frame, the
+# concatenated frame, the preview and the rows alive together) against
+# spooling to disk (migration_tool.spool_upload / read_preview /
+# parse_upload, streaming the file a block at a time). Each variant runs in a
+# fresh interpreter; peak_mb - base_mb is what the upload path added.
+#
+#   python -m benchmarks.bench_upload_memory [--mb 50] [--sheets 4] [--workbook path.xlsx]
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from io import BytesIO
+from xml.sax.saxutils import escape
+
+from openpyxl.utils import get_column_letter
+
+from benchmarks.synthetic import generate, legacy_export
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '{sheets}</Types>'
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_NS = 'xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+_REL_NS = 'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"'
+
+
+def _cell(value):
+    if value is None or value != value:
+        return "<c/>"
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f"<c><v>{value}</v></c>"
+    return f'<c t="inlineStr"><is><t>{escape(str(value))}</t></is></c>'
+
+
+def write_xlsx(frames, path):
+    # minimal .xlsx writer (inline strings, no styles): orders of magnitude
+    # faster than DataFrame.to_excel for the sizes this benchmark needs
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as z:
+        n = len(frames)
+        z.writestr("[Content_Types].xml", _CONTENT_TYPES.format(sheets="".join(
+            f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            for i in range(1, n + 1))))
+        z.writestr("_rels/.rels", _ROOT_RELS)
+        z.writestr("xl/workbook.xml", f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><workbook {_NS} {_REL_NS}><sheets>'
+                   + "".join(f'<sheet name="Sheet{i}" sheetId="{i}" r:id="rId{i}"/>' for i in range(1, n + 1))
+                   + "</sheets></workbook>")
+        z.writestr("xl/_rels/workbook.xml.rels",
+                   '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                   '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                   + "".join(f'<Relationship Id="rId{i}" Type="http://schemas.openxmlformats.org/officeDocument/2006/'
+                             f'relationships/worksheet" Target="worksheets/sheet{i}.xml"/>' for i in range(1, n + 1))
+                   + "</Relationships>")
+        for i, df in enumerate(frames, 1):
+            with z.open(f"xl/worksheets/sheet{i}.xml", "w") as f:
+                # without <dimension> openpyxl scans the whole sheet to size it
+                ref = f"A1:{get_column_letter(len(df.columns))}{len(df) + 1}"
+                f.write(f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><worksheet {_NS}>'
+                        f'<dimension ref="{ref}"/><sheetData>'.encode())
+                f.write(("<row>" + "".join(_cell(c) for c in df.columns) + "</row>").encode())
+                for row in df.itertuples(index=False):
+                    f.write(("<row>" + "".join(_cell(v) for v in row) + "</row>").encode())
+                f.write(b"</sheetData></worksheet>")
+
+
+def make_workbook(path, mb, sheets, seed):
+    # a legacy export of about `mb` megabytes, split over `sheets` sheets
+    tables = generate(n_events=400, seed=seed)
+    legacy = legacy_export(tables, n_years=len(tables["years"]))
+    write_xlsx([legacy], path)
+    copies = max(1, round(mb * 1e6 / os.path.getsize(path)))
+    per_sheet = max(1, copies // sheets)
+    import pandas as pd
+    big = pd.concat([legacy] * per_sheet, ignore_index=True)
+    write_xlsx([big] * sheets, path)
+    return len(big) * sheets
+
+
+def _rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _child(variant, path):
+    # runs in its own interpreter; prints {"peak_mb", "base_mb", "rows", ...}
+    import pandas as pd
+    import migration_tool
+    base = _rss_mb()
+    extra = {}
+    t0 = time.perf_counter()
+    with open(path, "rb") as f:
+        # Streamlit's UploadedFile: the whole upload as an in-memory buffer
+        uploaded = BytesIO(f.read())
+    uploaded.name = os.path.basename(path)
+
+    if variant == "in_memory":
+        xls = pd.ExcelFile(uploaded)
+        frames = [pd.read_excel(xls, sheet_name=sh) for sh in xls.sheet_names]
+        df = pd.concat(frames, ignore_index=True, sort=False)
+        preview = df.head(200)
+        df.columns = [c.strip() for c in df.columns]
+        rows, errors = migration_tool.validate_rows(df, migration_tool.detect_columns(df))
+    else:
+        # the page reads the preview only when asked for; timed on its own
+        spooled = migration_tool.spool_upload(uploaded)
+        col_map, rows, errors = migration_tool.parse_upload(spooled)
+        t1 = time.perf_counter()
+        preview = migration_tool.read_preview(spooled)
+        extra["preview_s"] = round(time.perf_counter() - t1, 2)
+        os.remove(spooled)
+    print(json.dumps({"peak_mb": round(_rss_mb(), 1), "base_mb": round(base, 1), "rows": len(rows),
+                      "errors": len(errors), "preview_rows": len(preview),
+                      "seconds": round(time.perf_counter() - t0, 1), **extra}))
+
+
+def measure(path, variants=("in_memory", "spooled")):
+    out = {}
+    for variant in variants:
+        proc = subprocess.run([sys.executable, "-m", "benchmarks.bench_upload_memory", "--child", variant, path],
+                              capture_output=True, text=True, check=True)
+        out[variant] = json.loads(proc.stdout.strip().splitlines()[-1])
+    return out
+
+
+def main(args):
+    tmp = None
+    path = args.workbook
+    if not path or not os.path.exists(path):
+        if not path:
+            tmp = tempfile.TemporaryDirectory()
+            path = os.path.join(tmp.name, "legacy.xlsx")
+        t0 = time.perf_counter()
+        make_workbook(path, args.mb, args.sheets, args.seed)
+        print(f"wrote {path} in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+    report = {"workbook_mb": round(os.path.getsize(path) / 1e6, 1), **measure(path)}
+    if tmp:
+        tmp.cleanup()
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--mb", type=float, default=50)
+    ap.add_argument("--sheets", type=int, default=4)
+    ap.add_argument("--workbook", help="reuse (or create) this workbook instead of a temporary one")
+    ap.add_argument("--seed", type=int, default=13)
+    ap.add_argument("--child", nargs=2, metavar=("VARIANT", "PATH"), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.child:
+        _child(*args.child)
+    else:
+        print(json.dumps(main(args), indent=2))
@@ -0,0 +1,275 @@
+# benchmarks/check_change_feed.py
+# Correctness + cost check for change-feed patching of the snapshot cache.
+#
+#   python -m benchmarks.check_change_feed [--events N] [--ops N] [--sizes 10000,1000000]
+#
+# 1. cases: insert-only, update-only, delete-only and mixed deltas, an
+#    update the column's dtype can't hold, an empty snapshot, and a cached
+#    frame without an id column, each through the refresher and a FakeFeed;
+#    the cached frame must stay indexed by id and equal a full reload, row
+#    order included, and views handed out before a patch must not change.
+# 2. FakeFeed: random inserts / updates / deletes, same comparison.
+# 3. PostgREST stub with the change log on: the same through supabase_client
+#    writes, timing a patch refresh against reloading the tables.
+# 4. cost: a 3-row update / insert / delete / mix patched into frames of
+#    --sizes rows, which should stay flat for updates.
+# Exits non-zero on any mismatch.
+import argparse
+import gc
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.stub_server import StubStore, TABLE_NAMES, serve
+from benchmarks.synthetic import generate
+
+
+def _mismatch(cached, reload):
+    # None when the cached frame is indexed by id and equals the reload,
+    # else what differs
+    if "id" in cached.columns and not (cached.index.to_numpy() == cached["id"].to_numpy()).all():
+        return "index is not the id column"
+    try:
+        pd.testing.assert_frame_equal(cached.reset_index(drop=True), reload.reset_index(drop=True),
+                                      check_dtype=False)
+    except AssertionError as e:
+        return str(e).splitlines()[0]
+    return None
+
+
+def _fake_cache(feed, loader=None):
+    from change_feed import ChangeFeedRefresher
+    from table_cache import TableCache, index_by_id
+
+    loader = loader or (lambda t: index_by_id(feed.frame(t)))
+    cache = TableCache()
+    refresher = ChangeFeedRefresher(feed, cache, interval=0)
+    refresher.refresh()
+    return cache, refresher, loader
+
+
+def _cached(cache, table, loader):
+    # the stored frame itself, not a view
+    cache.get(table, loader)
+    return cache._entries[table].frame
+
+
+def check_cases(frames):
+    from change_feed import FakeFeed
+
+    table = "meat_results"
+    base = frames[table].head(500)
+    ids = base["id"].tolist()
+    template = {k: v for k, v in base.iloc[0].to_dict().items() if k != "id"}
+
+    def insert(feed, n=3):
+        for _ in range(n):
+            feed.insert(table, template)
+
+    def update(feed):
+        for i in ids[10:13]:
+            feed.update(table, i, score=feed.rows[table][i]["score"] + 1.25)
+
+    def delete(feed):
+        for i in (ids[0], ids[250], ids[-1]):
+            feed.delete(table, i)
+
+    def mixed(feed):
+        update(feed)
+        delete(feed)
+        insert(feed)
+        feed.update(table, ids[20], meat="Chicken", rank=99)
+
+    def dtype_change(feed):
+        feed.update(table, ids[30], rank=None)
+        feed.update(table, ids[31], rank=2.5)
+
+    failures = {}
+    for name, ops in (("insert_only", insert), ("update_only", update), ("delete_only", delete),
+                      ("mixed", mixed), ("dtype_change", dtype_change)):
+        feed = FakeFeed({table: base})
+        cache, refresher, loader = _fake_cache(feed)
+        before = cache.get(table, loader)[0]
+        kept = before.copy()
+        ops(feed)
+        refresher.refresh()
+        bad = _mismatch(_cached(cache, table, loader), feed.frame(table))
+        if bad is None and not before.equals(kept):
+            bad = "a view handed out before the patch changed"
+        if bad is None and cache.stats()["patches"] != 1:
+            bad = "not patched"
+        failures[name] = bad
+
+    # a new id lower than the last one lands in id order (deleted, then
+    # inserted again by a later poll)
+    feed = FakeFeed({table: base})
+    cache, refresher, loader = _fake_cache(feed)
+    _cached(cache, table, loader)
+    feed.delete(table, ids[40])
+    refresher.refresh()
+    feed.insert(table, dict(template, id=ids[40]))
+    refresher.refresh()
+    failures["reinsert_low_id"] = _mismatch(_cached(cache, table, loader), feed.frame(table))
+
+    # an empty snapshot (what a table with no rows reads as) takes inserts
+    feed = FakeFeed({table: base.iloc[:0]})
+    cache, refresher, loader = _fake_cache(feed, lambda t: pd.DataFrame())
+    _cached(cache, table, loader)
+    feed.insert(table, dict(template, id=1))
+    feed.insert(table, dict(template, id=2))
+    refresher.refresh()
+    failures["empty_snapshot"] = _mismatch(_cached(cache, table, loader), feed.frame(table))
+
+    # a frame without an id column can't be patched: it is dropped and the
+    # next read reloads it
+    feed = FakeFeed({table: base})
+    no_id = lambda t: feed.frame(t).drop(columns="id")
+    cache, refresher, _ = _fake_cache(feed, no_id)
+    _cached(cache, table, no_id)
+    update(feed)
+    refresher.refresh()
+    bad = None if table not in cache.cached_tables() else "kept a frame it couldn't patch"
+    failures["no_id_column"] = bad or _mismatch(cache.get(table, no_id)[0], no_id(table))
+    return {name: bad for name, bad in failures.items() if bad}
+
+
+def _random_ops(rng, tables, n_ops, insert, update, delete):
+    # mix of 50% updates, 30% inserts, 20% deletes over the result tables
+    names = ["meat_results", "ancillary_results", "team_results"]
+    for _ in range(n_ops):
+        table = names[rng.integers(len(names))]
+        ids = tables[table]
+        roll = rng.random()
+        if roll < 0.5 and ids:
+            update(table, ids[rng.integers(len(ids))], score=float(np.round(rng.uniform(120, 180), 4))) \
+                if table != "team_results" else update(table, ids[rng.integers(len(ids))], rank=int(rng.integers(1, 50)))
+        elif roll < 0.8:
+            ids.append(insert(table))
+        elif ids:
+            delete(table, ids.pop(rng.integers(len(ids))))
+
+
+def check_fake(frames, n_ops, seed):
+    from change_feed import FakeFeed
+
+    feed = FakeFeed(frames)
+    cache, refresher, loader = _fake_cache(feed)
+    for t in frames:
+        cache.get(t, loader)
+
+    rng = np.random.default_rng(seed)
+    ids = {t: sorted(feed.rows[t]) for t in frames}
+    templates = {t: dict(next(iter(feed.rows[t].values()))) for t in frames}
+
+    def insert(table):
+        row = dict(templates[table], id=None)
+        return feed.insert(table, row)["id"]
+
+    _random_ops(rng, ids, n_ops, insert, feed.update, feed.delete)
+    t0 = time.perf_counter()
+    applied = refresher.refresh()
+    patch_s = time.perf_counter() - t0
+    mismatches = {t: bad for t in frames if (bad := _mismatch(_cached(cache, t, loader), feed.frame(t)))}
+    return {"changes": applied, "patch_ms": round(patch_s * 1000, 2), "mismatches": mismatches}
+
+
+def check_stub(frames, n_ops, seed):
+    store = StubStore(change_log=True)
+    store.load_frames(frames)
+    server, url = serve(store)
+    os.environ["SUPABASE_URL"], os.environ["SUPABASE_KEY"] = url, "check"
+    import supabase_client
+    supabase_client.SUPABASE_URL, supabase_client.SUPABASE_KEY = url, "check"
+    import change_feed
+    from bbq_results_app import TABLES, load_all
+    from table_cache import CACHE, _fetch, _fetch_snapshot
+
+    refresher = change_feed.get_refresher()
+    refresher.interval = 0
+    refresher.refresh()
+    load_all()
+
+    rng = np.random.default_rng(seed)
+    ids = {t: [r["id"] for r in store.rows(t)] for t in ("meat_results", "ancillary_results", "team_results")}
+    templates = {t: {k: v for k, v in store.rows(t)[0].items() if k != "id"} for t in ids}
+
+    def insert(table):
+        return supabase_client.supabase_insert(table, templates[table]).json()[0]["id"]
+
+    def update(table, row_id, **values):
+        supabase_client.supabase_upsert(table, [{"id": row_id, **values}], on_conflict="id")
+
+    def delete(table, row_id):
+        supabase_client.supabase_delete(table, f"id=eq.{row_id}")
+
+    _random_ops(rng, ids, n_ops, insert, update, delete)
+
+    t0 = time.perf_counter()
+    applied = refresher.refresh()
+    patch_s = time.perf_counter() - t0
+    mismatches = {t: bad for t in TABLES.values()
+                  if (bad := _mismatch(_cached(CACHE, t, _fetch_snapshot), _fetch(t)))}
+
+    t0 = time.perf_counter()
+    CACHE.clear()
+    for t in TABLES.values():
+        CACHE.get(t, _fetch_snapshot)
+    reload_s = time.perf_counter() - t0
+    server.shutdown()
+    return {
+        "changes": applied,
+        "patch_ms": round(patch_s * 1000, 2),
+        "full_reload_ms": round(reload_s * 1000, 2),
+        "mismatches": mismatches,
+        "refresher": refresher.stats(),
+    }
+
+
+def patch_cost(sizes):
+    # ms to patch 3 rows into an n-row snapshot held by the cache
+    from change_feed import apply_changes
+    from table_cache import TableCache, index_by_id
+
+    out = {}
+    for n in sizes:
+        cache = TableCache(budget_bytes=2**40)
+        cache.get("t", lambda t: index_by_id(pd.DataFrame({
+            "id": np.arange(1, n + 1), "competition_year_id": np.arange(n) // 50,
+            "meat": pd.array(np.tile(["Brisket", "Ribs"], -(-n // 2))[:n], dtype="str"),
+            "score": np.random.default_rng(0).uniform(120, 180, n), "rank": np.arange(n) % 30,
+        })))
+        gc.collect()
+        rows = lambda ids: pd.DataFrame({"id": ids, "competition_year_id": 0, "meat": "Brisket",
+                                         "score": [150.5, 151.5, 152.5], "rank": 1})
+        timings = {}
+        for name, upserts, deleted in (("warmup", rows([1, 3, 5]), ()), ("update", rows([1, 3, 5]).assign(rank=2), ()),
+                                       ("insert", rows([n + 1, n + 2, n + 3]), ()), ("delete", pd.DataFrame(), {7, 9, 11}),
+                                       ("mixed", rows([13, 15, n + 4]).assign(rank=3), {17})):
+            t0 = time.perf_counter()
+            cache.patch("t", lambda f: apply_changes(f, upserts, deleted))
+            timings[name] = round((time.perf_counter() - t0) * 1000, 2)
+        del timings["warmup"]
+        out[n] = timings
+    return out
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--events", type=int, default=500)
+    ap.add_argument("--ops", type=int, default=200)
+    ap.add_argument("--seed", type=int, default=3)
+    ap.add_argument("--sizes", default="10000,1000000", help="snapshot rows for the patch cost (comma separated)")
+    args = ap.parse_args()
+
+    frames = {TABLE_NAMES[k]: v for k, v in generate(n_events=args.events).items()}
+    cases = check_cases(frames)
+    print("cases:", cases or "all match")
+    fake = check_fake(frames, args.ops, args.seed)
+    print("fake feed:", fake)
+    stub = check_stub(frames, args.ops, args.seed)
+    print("stub feed:", stub)
+    print("patch ms by snapshot rows:", patch_cost([int(n) for n in args.sizes.split(",") if n]))
+    sys.exit(1 if cases or fake["mismatches"] or stub["mismatches"] else 0)
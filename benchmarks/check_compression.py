@@ -0,0 +1,129 @@
+# benchmarks/check_compression.py
+# Compressed transport end to end against the PostgREST stub:
+#
+#   python -m benchmarks.check_compression [--events 300] [--import-years 1500] [--link-mbps 2]
+#
+# 1. responses: every snapshot table, read as JSON and as CSV, decodes to
+#    the same frame with identity, gzip and br encoding; the metrics
+#    counters show decoded against wire bytes;
+# 2. requests: an import with BBQ_GZIP_REQUESTS_KB set writes the same rows
+#    as a plain one and sends fewer bytes;
+# 3. a server that refuses gzipped bodies (stock PostgREST) gets them again
+#    uncompressed: the import still completes, later bodies go out plain.
+# Transfer times are estimated for a --link-mbps link (a tethered phone).
+import argparse
+import json
+import os
+
+import pandas as pd
+
+from benchmarks.stub_server import StubStore, TABLE_NAMES, brotli, serve
+from benchmarks.synthetic import generate, legacy_export
+
+ENCODINGS = ("identity", "gzip", "br")
+
+
+def _moved(fn):
+    from metrics import REGISTRY
+    before = REGISTRY.byte_totals()
+    out = fn()
+    return out, {k: v - before[k] for k, v in REGISTRY.byte_totals().items()}
+
+
+def _import(supabase_client, migration_tool, rows, store, gzip_kb):
+    server, url = serve(store)
+    supabase_client.SUPABASE_URL = url
+    supabase_client._gzip_refused = False
+    os.environ[supabase_client.GZIP_REQUESTS_ENV] = str(gzip_kb)
+    errors = []
+    try:
+        imported, moved = _moved(lambda: migration_tool.import_rows(rows, on_error=errors.append))
+    finally:
+        del os.environ[supabase_client.GZIP_REQUESTS_ENV]
+        server.shutdown()
+    return imported, moved, errors
+
+
+def main(args):
+    tables = generate(n_events=args.events, seed=args.seed)
+    store = StubStore(compress=True)
+    store.load_frames(tables)
+    server, url = serve(store)
+    os.environ["SUPABASE_URL"], os.environ["SUPABASE_KEY"] = url, "bench"
+    import supabase_client
+    import migration_tool
+    import table_cache
+    supabase_client.SUPABASE_URL, supabase_client.SUPABASE_KEY = url, "bench"
+    session = supabase_client._session
+    default_accept = session.headers["Accept-Encoding"]
+    seconds = lambda n: round(n * 8 / (args.link_mbps * 1e6), 1)
+    checks, reads = {}, {}
+
+    # 1. responses
+    checks["client_accepts_br"] = "br" in default_accept or brotli is None
+    reference = {}
+    for encoding in ENCODINGS:
+        if encoding == "br" and brotli is None:
+            continue
+        session.headers["Accept-Encoding"] = encoding
+        sample = supabase_client.supabase_get(TABLE_NAMES["meats"], "limit=500")
+        checks[f"{encoding}_negotiated"] = sample.headers.get("Content-Encoding", "identity") == encoding
+        for fmt in ("json", "csv"):
+            os.environ[table_cache.READ_FORMAT_ENV] = fmt
+            frames, moved = _moved(lambda: {t: table_cache._fetch(t) for t in TABLE_NAMES.values()})
+            ref = reference.setdefault(fmt, frames)
+            same = True
+            for t, df in frames.items():
+                try:
+                    pd.testing.assert_frame_equal(ref[t], df)
+                except AssertionError:
+                    same = False
+            checks[f"{encoding}_{fmt}_same_frames"] = same
+            reads[f"{fmt}.{encoding}"] = {"decoded_mb": round(moved["received"] / 1e6, 2),
+                                         "wire_mb": round(moved["received_wire"] / 1e6, 2),
+                                         f"s_at_{args.link_mbps:g}mbps": seconds(moved["received_wire"])}
+    session.headers["Accept-Encoding"] = default_accept
+    os.environ.pop(table_cache.READ_FORMAT_ENV, None)
+    checks["wire_counters_differ"] = reads["json.gzip"]["wire_mb"] < reads["json.identity"]["wire_mb"]
+    server.shutdown()
+
+    # 2. / 3. compressed bulk inserts
+    legacy = legacy_export(tables, n_years=args.import_years)
+    rows, _ = migration_tool.validate_rows(legacy, migration_tool.detect_columns(legacy))
+    writes, results = {}, {}
+    for name, gzip_kb, accepts in (("plain", 0, True), ("gzip", args.gzip_kb, True), ("gzip_refused", args.gzip_kb, False)):
+        target = StubStore(gzip_requests=accepts)
+        imported, moved, errors = _import(supabase_client, migration_tool, rows, target, gzip_kb)
+        results[name] = target.tables
+        writes[name] = {"imported": imported, "errors": len(errors),
+                        "sent_mb": round(moved["sent"] / 1e6, 2), "sent_wire_mb": round(moved["sent_wire"] / 1e6, 2),
+                        f"s_at_{args.link_mbps:g}mbps": seconds(moved["sent_wire"])}
+        if name == "gzip_refused":
+            checks["refusal_remembered"] = supabase_client._gzip_refused
+    checks["gzip_import_same_rows"] = results["gzip"] == results["plain"] and writes["gzip"]["errors"] == 0
+    checks["gzip_import_smaller"] = writes["gzip"]["sent_wire_mb"] < writes["plain"]["sent_wire_mb"]
+    checks["refused_falls_back"] = results["gzip_refused"] == results["plain"] and writes["gzip_refused"]["errors"] == 0
+    supabase_client._gzip_refused = False
+
+    return {
+        "events": args.events,
+        "import_rows": len(rows),
+        "link_mbps": args.link_mbps,
+        "brotli": brotli is not None,
+        "reads": reads,
+        "writes": writes,
+        "checks": checks,
+        "ok": all(checks.values()),
+    }
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--events", type=int, default=300)
+    ap.add_argument("--import-years", type=int, default=1500)
+    ap.add_argument("--gzip-kb", type=float, default=16, help="gzip request bodies of at least this many KiB")
+    ap.add_argument("--link-mbps", type=float, default=2.0, help="link speed for the transfer estimates")
+    ap.add_argument("--seed", type=int, default=23)
+    report = main(ap.parse_args())
+    print(json.dumps(report, indent=2))
+    raise SystemExit(0 if report["ok"] else 1)
@@ -0,0 +1,97 @@
+# benchmarks/check_import_jobs.py
+# Background import jobs (jobs.JobRunner via migration_tool.submit_import)
+# against the PostgREST stub with a simulated round trip:
+#
+#   python -m benchmarks.check_import_jobs [--rows 6000] [--latency-ms 5]
+#
+# 1. two imports of the same competition years run one after the other,
+#    an import of other years runs alongside them;
+# 2. a cancelled import stops between partitions;
+# 3. status is persisted, and a new runner reports unfinished jobs of a
+#    previous process as interrupted.
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.stub_server import StubStore, serve
+from benchmarks.synthetic import generate, legacy_export
+
+
+def _wait(runner, ids, timeout=300):
+    t0 = time.monotonic()
+    while any(runner.get(i)["state"] in ("queued", "waiting", "running") for i in ids):
+        if time.monotonic() - t0 > timeout:
+            raise TimeoutError(ids)
+        time.sleep(0.02)
+    return [runner.get(i) for i in ids]
+
+
+def main(args):
+    tables = generate(n_events=max(50, args.rows // 130), seed=args.seed)
+    legacy = legacy_export(tables, n_years=len(tables["years"])).head(args.rows)
+
+    store = StubStore(latency_ms=args.latency_ms)
+    server, url = serve(store)
+    os.environ["SUPABASE_URL"], os.environ["SUPABASE_KEY"] = url, "bench"
+    import supabase_client
+    import jobs
+    import migration_tool
+    supabase_client.SUPABASE_URL, supabase_client.SUPABASE_KEY = url, "bench"
+
+    rows, _ = migration_tool.validate_rows(legacy, migration_tool.detect_columns(legacy))
+    parts = migration_tool.partition_rows(rows, len(rows) // 3)
+    first, second = parts[0], [r for p in parts[1:] for r in p]
+    checks = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        runner = jobs._runners["imports"] = jobs.JobRunner(workers=3, store_dir=tmp)
+
+        # 1. same years serialize, other years run alongside
+        a = migration_tool.submit_import(first, "a")
+        b = migration_tool.submit_import(first[: len(first) // 2], "b (same years as a)")
+        c = migration_tool.submit_import(second, "c (other years)")
+        time.sleep(0.2)
+        checks["b_waits_for_a"] = runner.get(b)["state"] == "waiting"
+        ja, jb, jc = _wait(runner, [a, b, c])
+        checks["all_done"] = all(j["state"] == "done" for j in (ja, jb, jc))
+        checks["b_after_a"] = jb["started"] >= ja["finished"]
+        checks["c_alongside_a"] = jc["started"] < ja["finished"]
+        checks["a_imported_all"] = ja["result"]["imported"] == len(first)
+
+        # 2. cancel mid-run
+        d = migration_tool.submit_import(rows, "d (cancelled)")
+        while runner.get(d)["done"] == 0:
+            time.sleep(0.01)
+        runner.cancel(d)
+        (jd,) = _wait(runner, [d])
+        checks["cancelled"] = jd["state"] == "cancelled" and jd["done"] < jd["total"]
+
+        # 3. persisted status; a restart marks unfinished jobs interrupted
+        with open(os.path.join(tmp, f"{a}.json")) as f:
+            checks["persisted"] = json.load(f)["state"] == "done"
+        with open(os.path.join(tmp, "deadbeef0000.json"), "w") as f:
+            json.dump({**ja, "id": "deadbeef0000", "state": "running"}, f)
+        restarted = jobs.JobRunner(workers=1, store_dir=tmp)
+        checks["interrupted"] = restarted.get("deadbeef0000")["state"] == "interrupted"
+        checks["history"] = {a, b, c, d} <= {j["id"] for j in restarted.jobs(limit=10)}
+
+    server.shutdown()
+    return {
+        "rows": len(rows),
+        "latency_ms": args.latency_ms,
+        "seconds": {j["label"]: round(j["finished"] - j["started"], 2) for j in (ja, jb, jc, jd)},
+        "checks": checks,
+        "ok": all(checks.values()),
+    }
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=6000)
+    ap.add_argument("--latency-ms", type=float, default=5)
+    ap.add_argument("--seed", type=int, default=11)
+    report = main(ap.parse_args())
+    print(json.dumps(report, indent=2))
+    raise SystemExit(0 if report["ok"] else 1)
@@ -0,0 +1,137 @@
+# benchmarks/check_query_builder.py
+# supabase_client.Query against the PostgREST stub:
+#
+#   python -m benchmarks.check_query_builder [--events 300] [--max-rows 1000]
+#
+# 1. encoding: eq / in / ilike on values with commas, quotes, parentheses,
+#    &, +, %, _ and non-ASCII find exactly the rows they should;
+# 2. paging: whole-table snapshots come back complete when the server caps
+#    rows per response (db-max-rows), and count / range agree;
+# 3. pushdown: the intake page's per-competition-year fetch (year_rows)
+#    equals filtering the whole tables, timed against loading them;
+# 4. the cached slices are dropped when their table is written.
+import argparse
+import json
+import os
+import time
+
+import pandas as pd
+
+from benchmarks.stub_server import StubStore, TABLE_NAMES, serve
+from benchmarks.synthetic import generate
+
+AWKWARD = ["Smoke, Fire & Ice", 'The "Q" (Pit)', "A+B BBQ", "100% Hog", "Hog_Wild", "Brisket\\Bros",
+           "Café Fumé", "in.(1,2)", "eq.x", "  padded  "]
+
+
+def _same(a, b):
+    norm = lambda df: df.sort_values("id").reset_index(drop=True)
+    try:
+        pd.testing.assert_frame_equal(norm(a), norm(b)[list(norm(a).columns)], check_dtype=False)
+        return True
+    except (AssertionError, KeyError):
+        return False
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+
+def _received():
+    from metrics import REGISTRY
+    return sum(v for (name, _), v in REGISTRY.counters.items() if name == "supabase_bytes_received_total")
+
+
+def main(args):
+    tables = generate(n_events=args.events, seed=args.seed)
+    store = StubStore(max_rows=args.max_rows, latency_ms=args.latency_ms)
+    store.load_frames(tables)
+    server, url = serve(store)
+    os.environ["SUPABASE_URL"], os.environ["SUPABASE_KEY"] = url, "bench"
+    import supabase_client
+    import table_cache
+    import bbq_intake
+    from event_index import search_server
+    from supabase_client import Query
+    supabase_client.SUPABASE_URL, supabase_client.SUPABASE_KEY = url, "bench"
+    table_cache.CACHE.clear()
+    checks = {}
+
+    # 1. encoding
+    created = supabase_client.supabase_insert(
+        "competition_events", [{"event_name": n, "location": f"at {n}"} for n in AWKWARD]).json()
+    checks["eq"] = all([r["id"] for r in Query("competition_events").eq("event_name", e["event_name"])
+                        .eq("location", e["location"]).rows()] == [e["id"]] for e in created)
+    found = Query("competition_events").select("id").in_("event_name", AWKWARD).rows()
+    checks["in"] = sorted(r["id"] for r in found) == sorted(e["id"] for e in created)
+    checks["ilike"] = all(n in search_server(n.strip()[2:-1], limit=10**6) for n in AWKWARD)
+    checks["ilike_wildcards_literal"] = search_server("0%") == ["100% Hog"] and search_server("g_W") == ["Hog_Wild"]
+
+    # 2. paging past the server's row cap
+    name = TABLE_NAMES["meats"]
+    n = len(store.rows(name))
+    full, fetch_s = _timed(lambda: table_cache._fetch(name))
+    checks["snapshot_complete"] = len(full) == n > args.max_rows and full["id"].is_unique
+    capped = supabase_client.supabase_get(name)
+    checks["server_caps"] = len(capped.json()) == min(n, args.max_rows)
+    resp = Query(name).select("id").order("id").range(10, 19).count().get()
+    checks["count_range"] = (supabase_client.total(resp) == n
+                             and [r["id"] for r in resp.json()] == full["id"].sort_values().tolist()[10:20])
+    checks["limit_under_cap"] = len(Query(name).order("id").limit(5).all_rows()) == 5
+
+    # 3. pushdown on the intake page
+    year_tables = bbq_intake.YEAR_TABLES
+    b0 = _received()
+    whole, whole_s = _timed(lambda: [table_cache._fetch(t) for t in year_tables])
+    b1 = _received()
+    cy_ids = tables["years"]["id"].sample(args.picks, random_state=args.seed).tolist()
+    table_cache.CACHE.clear()
+    sliced, sliced_s = _timed(lambda: [bbq_intake.year_rows(cy) for cy in cy_ids])
+    b2 = _received()
+    ok = True
+    for cy, frames in zip(cy_ids, sliced):
+        for df_all, df in zip(whole, frames):
+            want = df_all[df_all["competition_year_id"] == cy]
+            ok &= (df.empty and want.empty) or _same(df, want)
+    checks["pushdown_equal"] = ok
+    _, cached_s = _timed(lambda: [bbq_intake.year_rows(cy) for cy in cy_ids])
+
+    # 4. a write drops the table's slices
+    cy = cy_ids[0]
+    before = len(bbq_intake.year_rows(cy)[0])
+    supabase_client.supabase_insert("meat_results", {"competition_year_id": cy, "meat": "Extra", "score": 1, "rank": 1})
+    checks["slice_invalidated"] = len(bbq_intake.year_rows(cy)[0]) == before + 1
+
+    server.shutdown()
+    return {
+        "events": args.events,
+        "max_rows": args.max_rows,
+        "latency_ms": args.latency_ms,
+        "snapshot_rows": n,
+        "snapshot_pages": -(-n // args.max_rows),
+        "snapshot_fetch_s": round(fetch_s, 3),
+        "intake_load_s": {
+            "whole_tables": round(whole_s, 3),
+            f"filtered_x{args.picks}": round(sliced_s, 3),
+            "filtered_per_year": round(sliced_s / args.picks, 4),
+            "filtered_cached_per_year": round(cached_s / args.picks, 6),
+        },
+        "intake_load_kb": {"whole_tables": round((b1 - b0) / 1e3, 1),
+                           "filtered_per_year": round((b2 - b1) / args.picks / 1e3, 1)},
+        "checks": checks,
+        "ok": all(checks.values()),
+    }
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--events", type=int, default=300)
+    ap.add_argument("--max-rows", type=int, default=1000)
+    ap.add_argument("--picks", type=int, default=5, help="competition years opened on the intake page")
+    ap.add_argument("--latency-ms", type=float, default=0)
+    ap.add_argument("--seed", type=int, default=3)
+    report = main(ap.parse_args())
+    print(json.dumps(report, indent=2))
+    raise SystemExit(0 if report["ok"] else 1)
@@ -0,0 +1,35 @@
+# benchmarks/compare.py
+#   python -m benchmarks.compare base.json head.json
+import json
+import sys
+
+
+def compare(base, head):
+    b, h = base["timings"], head["timings"]
+    print(f"{'benchmark':<40} {'base ms':>10} {'head ms':>10} {'ratio':>7}")
+    for name in sorted(set(b) | set(h)):
+        bv = b.get(name, {}).get("min_s")
+        hv = h.get(name, {}).get("min_s")
+        ratio = f"{hv / bv:6.2f}x" if bv and hv else "      -"
+        fmt = lambda v: f"{v * 1000:10.1f}" if v is not None else f"{'-':>10}"
+        print(f"{name:<40} {fmt(bv)} {fmt(hv)} {ratio}")
+
+    b, h = base.get("memory", {}), head.get("memory", {})
+    names = sorted(n for n in set(b) | set(h) if isinstance(b.get(n, h.get(n)), dict))
+    if names:
+        print(f"\n{'peak RSS added':<40} {'base MB':>10} {'head MB':>10} {'ratio':>7}")
+    for name in names:
+        bv = b.get(name, {}).get("added_mb")
+        hv = h.get(name, {}).get("added_mb")
+        ratio = f"{hv / bv:6.2f}x" if bv and hv else "      -"
+        fmt = lambda v: f"{v:10.1f}" if v is not None else f"{'-':>10}"
+        print(f"{name:<40} {fmt(bv)} {fmt(hv)} {ratio}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("usage: python -m benchmarks.compare BASE.json HEAD.json")
+    with open(sys.argv[1]) as f1, open(sys.argv[2]) as f2:
+        base, head = json.load(f1), json.load(f2)
+    print(f"base {base['meta'].get('commit')}  head {head['meta'].get('commit')}")
+    compare(base, head)
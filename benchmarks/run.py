@@ -0,0 +1,224 @@
+# benchmarks/run.py
+# Load-test suite: synthetic data served by the PostgREST stub, timings of the
+# app's data paths, JSON report for comparing commits.
+#
+#   python -m benchmarks.run --events 2000 --out bench_report.json
+#   python -m benchmarks.run --upload-mb 50 ...       # + upload peak RSS
+#   python -m benchmarks.run --decode ...             # + snapshot decode time / peak RSS
+#   python -m benchmarks.compare base.json head.json
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+
+from benchmarks.stub_server import StubStore, serve
+from benchmarks.synthetic import generate, legacy_export
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=Path(__file__).resolve().parent.parent, timeout=10,
+        ).stdout.strip() or None
+    except Exception:
+        return None
+
+
+class Timer:
+    def __init__(self):
+        self.results = {}
+
+    def measure(self, name, fn, repeat=3, setup=None):
+        runs = []
+        out = None
+        for _ in range(repeat):
+            if setup:
+                setup()
+            t0 = time.perf_counter()
+            out = fn()
+            runs.append(time.perf_counter() - t0)
+        self.results[name] = {
+            "min_s": round(min(runs), 6),
+            "median_s": round(statistics.median(runs), 6),
+            "runs": len(runs),
+        }
+        print(f"  {name:<40} {min(runs) * 1000:10.1f} ms", file=sys.stderr)
+        return out
+
+
+def run(args):
+    tables = generate(n_events=args.events, first_year=args.first_year, last_year=args.last_year,
+                      n_categories=args.categories)
+    store = StubStore()
+    store.load_frames(tables)
+    server, url = serve(store)
+
+    # supabase_client reads its config at import time
+    os.environ["SUPABASE_URL"] = url
+    os.environ["SUPABASE_KEY"] = "bench"
+    import supabase_client
+    import analytics
+    import bbq_intake
+    import bbq_results_app
+    import grid
+    from cube import PivotCube
+    import migration_tool
+    import migrate_excel_to_supabase
+    supabase_client.SUPABASE_URL, supabase_client.SUPABASE_KEY = url, "bench"
+
+    t = Timer()
+    r = args.repeat
+
+    # --- results dashboard ---
+    from table_cache import CACHE
+    loaded = t.measure("load_all", bbq_results_app.load_all, r, setup=CACHE.clear)
+    t.measure("load_all_cached", bbq_results_app.load_all, r)
+    # the JSON read path (BBQ_READ_FORMAT=json); load_all above reads CSV
+    # unless the variable says otherwise. The stub writes CSV in Python, so
+    # end to end the two mostly differ by its cost: see --decode
+    fmt = os.environ.get("BBQ_READ_FORMAT")
+    os.environ["BBQ_READ_FORMAT"] = "json"
+    t.measure("load_all_json", bbq_results_app.load_all, r, setup=CACHE.clear)
+    if fmt is None:
+        del os.environ["BBQ_READ_FORMAT"]
+    else:
+        os.environ["BBQ_READ_FORMAT"] = fmt
+    core = t.measure("render.merge_core", lambda: analytics.build_core(loaded), r)
+    anc = t.measure("render.merge_ancillary", lambda: analytics.build_ancillary(loaded), r)
+    year = str(core["year"].max())
+    event = core["event_name"].iloc[0]
+    t.measure("render.filter_all", lambda: bbq_results_app.filter_results(core, "All", "All", "meat", sorted(core["meat"].unique())), r)
+    t.measure("render.filter_year_event", lambda: bbq_results_app.filter_results(core, year, event, "meat", ["Brisket", "Ribs"]), r)
+    t.measure("render.grid_page_sorted", lambda: grid.page_slice(core, 3, 100, sort_by="score", ascending=False), r)
+    ver = loaded["version"]
+    meats = sorted(core["meat"].unique())
+    t.measure("render.trend_figure_cold", lambda: bbq_results_app.trend_figure(ver, "meat", "All", "All", tuple(meats), "Trend", core),
+              r, setup=bbq_results_app.trend_figure.clear)
+    t.measure("render.trend_figure_cached", lambda: bbq_results_app.trend_figure(ver, "meat", "All", "All", tuple(meats), "Trend", core), r)
+    cube = t.measure("render.cube_rebuild", lambda: PivotCube("meat").rebuild(core), r)
+    cmp_events = sorted(core["event_name"].unique())[:4]
+    t.measure("render.cube_compare", lambda: cube.compare("Percentile Rank", cmp_events), r)
+    t.measure("render.filter_ancillary_year", lambda: bbq_results_app.filter_results(anc, year, "All", "category_name", []), r)
+
+    # --- intake page ---
+    t.measure("intake.page_load", bbq_intake.load_master_data, r, setup=CACHE.clear)
+    t.measure("intake.page_load_cached", bbq_intake.load_master_data, r)
+    cy_id = int(tables["years"]["id"].iloc[-1])
+    core_inputs = {m: {"participant": "Bench Cook", "score": 170.5, "rank": 3} for m in ["Chicken", "Ribs", "Pork", "Brisket"]}
+    anc_inputs = {c: {"participant": "Bench Cook", "score": 168.0, "rank": 5} for c in ["Sausage", "Dessert", "Beans"]}
+    errors = t.measure(
+        "intake.save_all",
+        lambda: bbq_intake.save_all(cy_id, core_inputs, 680.0, 4, anc_inputs, 505.0, 7),
+        r,
+    )
+    if errors:
+        print("  save_all errors:", errors[:3], file=sys.stderr)
+    # the same save through the 002 migration's function: one round trip
+    store.rpc_enabled = True
+    errors = t.measure(
+        "intake.save_all_rpc",
+        lambda: bbq_intake.save_all(cy_id, core_inputs, 680.0, 4, anc_inputs, 505.0, 7),
+        r,
+    )
+    store.rpc_enabled = False
+    if errors:
+        print("  save_all_rpc errors:", errors[:3], file=sys.stderr)
+
+    # --- import paths (into an empty store so creates are exercised) ---
+    legacy = legacy_export(tables, n_years=args.import_years)
+    import_store = StubStore()
+    import_server, import_url = serve(import_store)
+    supabase_client.SUPABASE_URL = import_url
+
+    def reset_import_store():
+        import_store.tables.clear()
+        import_store.next_id.clear()
+
+    col_map = migration_tool.detect_columns(legacy)
+    rows, verrors = t.measure("migration_tool.validate", lambda: migration_tool.validate_rows(legacy, col_map), r)
+    imported = t.measure("migration_tool.import", lambda: migration_tool.import_rows(rows, on_error=lambda m: None),
+                         r, setup=reset_import_store)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        xlsx = Path(tmp) / "legacy.xlsx"
+        legacy.to_excel(xlsx, index=False)
+        t.measure("migrate_excel_cli.import", lambda: migrate_excel_to_supabase.import_excel(xlsx, workers=4, progress=False),
+                  r, setup=reset_import_store)
+
+    server.shutdown()
+    import_server.shutdown()
+
+    # peak RSS of the Migration Tool upload path, each variant in its own
+    # interpreter (slow: off unless --upload-mb is given)
+    memory = {}
+    if args.upload_mb:
+        from benchmarks import bench_upload_memory
+        with tempfile.TemporaryDirectory() as tmp:
+            xlsx = Path(tmp) / "upload.xlsx"
+            bench_upload_memory.make_workbook(xlsx, args.upload_mb, sheets=4, seed=13)
+            memory["migration_tool.upload_mb"] = round(xlsx.stat().st_size / 1e6, 1)
+            for variant, m in bench_upload_memory.measure(str(xlsx)).items():
+                memory[f"migration_tool.upload.{variant}"] = {"peak_mb": m["peak_mb"], "added_mb": round(m["peak_mb"] - m["base_mb"], 1)}
+                print(f"  {'upload ' + variant:<40} {m['peak_mb'] - m['base_mb']:10.1f} MB added", file=sys.stderr)
+
+    # decoding the snapshot responses (records / json / csv), each variant
+    # in its own interpreter (off unless --decode is given)
+    if args.decode:
+        from benchmarks import bench_read_decode
+        with tempfile.TemporaryDirectory() as tmp:
+            sizes = bench_read_decode.capture(tables, tmp)
+            memory.update({f"read_decode.wire_mb.{fmt}": round(n / 1e6, 1) for fmt, n in sizes.items()})
+            for variant, m in bench_read_decode.measure(tmp).items():
+                memory[f"read_decode.{variant}"] = {"peak_mb": m["peak_mb"], "added_mb": round(m["peak_mb"] - m["base_mb"], 1),
+                                                    "seconds": m["seconds"]}
+                print(f"  {'decode ' + variant:<40} {m['peak_mb'] - m['base_mb']:10.1f} MB added "
+                      f"{m['seconds']:8.3f}s", file=sys.stderr)
+
+    return {
+        "meta": {
+            "commit": _commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "dataset": {
+                "events": args.events,
+                "seasons": f"{args.first_year}-{args.last_year}",
+                "ancillary_categories": args.categories,
+                "rows": {name: int(len(df)) for name, df in tables.items()},
+                "import_rows": int(len(legacy)),
+                "import_rows_valid": len(rows),
+                "import_rows_imported": imported,
+                "import_validation_errors": len(verrors),
+            },
+        },
+        "timings": t.results,
+        "memory": memory,
+    }
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--events", type=int, default=2000)
+    ap.add_argument("--first-year", type=int, default=1995)
+    ap.add_argument("--last-year", type=int, default=2024)
+    ap.add_argument("--categories", type=int, default=30)
+    ap.add_argument("--import-years", type=int, default=200, help="competition years in the import file")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--upload-mb", type=float, default=0, help="also measure upload peak RSS on a workbook this big (e.g. 50)")
+    ap.add_argument("--decode", action="store_true", help="also measure snapshot decode time / peak RSS per read format")
+    ap.add_argument("--out", default="bench_report.json")
+    args = ap.parse_args()
+
+    report = run(args)
+    Path(args.out).write_text(json.dumps(report, indent=2))
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,503 @@
+# benchmarks/stub_server.py
+# Minimal in-memory PostgREST look-alike for load tests and offline runs.
+#
+#   python -m benchmarks.stub_server --port 54321 --events 2000
+#   SUPABASE_URL=http://127.0.0.1:54321 SUPABASE_KEY=stub streamlit run app.py
+#
+# Supports the subset of PostgREST the app uses: select, eq/neq/gt/gte/lt/lte/
+# in/like/ilike/is filters, order, limit/offset, JSON or CSV (Accept:
+# text/csv) responses, bulk insert, upsert with on_conflict, PATCH and
+# DELETE with filters; optionally the table_changes log (--change-log), the
+# RPC functions (--rpc), a simulated network round trip (--latency-ms),
+# the server's row cap (--max-rows) and gzip / br responses like Supabase's
+# gateway (--compress). Gzipped request bodies are refused like stock
+# PostgREST does (400 PGRST102) unless --gzip-requests.
+import argparse
+import gzip
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# load_all keys -> Supabase table names
+TABLE_NAMES = {
+    "events": "competition_events",
+    "years": "competition_years",
+    "meats": "meat_results",
+    "team": "team_results",
+    "anc_cat": "ancillary_categories",
+    "anc": "ancillary_results",
+    "anc_team": "ancillary_team_results",
+}
+
+_RESERVED = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+COMPRESS_MIN_BYTES = 1024           # smaller responses go out as they are
+_INVALID = object()                 # a request body that isn't JSON
+
+# written by the trigger from migrations/001_change_log.sql
+CHANGES_TABLE = "table_changes"
+
+
+def _py(v):
+    if isinstance(v, np.generic):
+        return v.item()
+    if isinstance(v, float) and np.isnan(v):
+        return None
+    return v
+
+
+def _split_list(text):
+    # body of in.(a,"b,c",d)
+    out, cur, quoted, esc = [], "", False, False
+    for ch in text:
+        if esc:
+            cur += ch
+            esc = False
+        elif ch == "\\":
+            esc = True
+        elif ch == '"':
+            quoted = not quoted
+        elif ch == "," and not quoted:
+            out.append(cur)
+            cur = ""
+        else:
+            cur += ch
+    out.append(cur)
+    return out
+
+
+def _cmp_value(stored, raw):
+    # compare stored values against URL text the way Postgres would cast them
+    if isinstance(stored, bool):
+        return stored, raw.lower() == "true"
+    if isinstance(stored, (int, float)):
+        try:
+            return float(stored), float(raw)
+        except ValueError:
+            return str(stored), raw
+    return str(stored), raw
+
+
+_CSV_QUOTE = re.compile(r'[",\\()\s]')
+
+
+def _csv_field(v):
+    # one field the way PostgREST's CSV writes it: the row's composite text
+    # form (NULL empty, booleans t/f, strings quoted when empty or holding
+    # quotes, backslashes, parentheses, commas or whitespace, with quotes
+    # and backslashes doubled)
+    if v is None:
+        return ""
+    if isinstance(v, bool):
+        return "t" if v else "f"
+    if isinstance(v, (int, float)):
+        return str(v)
+    text = v if isinstance(v, str) else json.dumps(v)
+    if text == "" or _CSV_QUOTE.search(text):
+        return '"' + text.replace("\\", "\\\\").replace('"', '""') + '"'
+    return text
+
+
+def _csv(rows):
+    if not rows:
+        return b""
+    header = list(dict.fromkeys(k for r in rows[:1000] for k in r))
+    columns = []
+    for k in header:
+        values = [r.get(k) for r in rows]
+        if all(type(v) in (int, float) for v in values):
+            columns.append(list(map(str, values)))
+        else:
+            columns.append([_csv_field(v) for v in values])
+    lines = [",".join(header)] + [",".join(fields) for fields in zip(*columns)]
+    return "\n".join(lines).encode()
+
+
+def _like_regex(pattern):
+    # LIKE pattern (PostgREST's * or %, _, backslash escapes) -> regex
+    out, esc = "", False
+    for ch in pattern:
+        if esc:
+            out += re.escape(ch)
+            esc = False
+        elif ch == "\\":
+            esc = True
+        elif ch in "*%":
+            out += ".*"
+        elif ch == "_":
+            out += "."
+        else:
+            out += re.escape(ch)
+    return re.compile(f"^{out}$", re.DOTALL)
+
+
+def _matcher(column, expr):
+    negate = False
+    if expr.startswith("not."):
+        negate, expr = True, expr[4:]
+    op, _, raw = expr.partition(".")
+    if op == "in":
+        # set lookups instead of comparing against every list item
+        items = _split_list(raw[1:-1])
+        as_text = set(items)
+        as_num = set()
+        for i in items:
+            try:
+                as_num.add(float(i))
+            except ValueError:
+                pass
+    elif op in ("like", "ilike"):
+        regex = _like_regex(raw.lower() if op == "ilike" else raw)
+
+    def test(row):
+        v = row.get(column)
+        if op == "is":
+            ok = (v is None) if raw == "null" else (v is (raw == "true"))
+        elif v is None:
+            ok = False
+        elif op == "in":
+            if isinstance(v, bool):
+                ok = ("true" if v else "false") in {i.lower() for i in as_text}
+            elif isinstance(v, (int, float)):
+                ok = float(v) in as_num or str(v) in as_text
+            else:
+                ok = str(v) in as_text
+        elif op in ("like", "ilike"):
+            ok = regex.match(str(v).lower() if op == "ilike" else str(v)) is not None
+        else:
+            a, b = _cmp_value(v, raw)
+            try:
+                ok = {
+                    "eq": a == b, "neq": a != b,
+                    "gt": a > b, "gte": a >= b, "lt": a < b, "lte": a <= b,
+                }[op]
+            except TypeError:
+                ok = False
+        return not ok if negate else ok
+
+    return test
+
+
+class StubStore:
+    def __init__(self, change_log=False, latency_ms=0, rpc=False, max_rows=None, compress=False,
+                 gzip_requests=False):
+        # change_log: mimic the table_changes trigger; without it the log
+        # table doesn't exist (404), like a project without the migration.
+        # rpc: serve the functions of migrations/002 (else 404 PGRST202).
+        # latency_ms: simulated network round trip added to every request
+        # max_rows: most rows one GET returns (PostgREST's db-max-rows;
+        # 1000 on a default Supabase project)
+        # compress: br / gzip responses per Accept-Encoding
+        # gzip_requests: accept Content-Encoding: gzip request bodies
+        self.tables = {}
+        self.next_id = {}
+        self.change_log = change_log
+        self.rpc_enabled = rpc
+        self.latency_ms = latency_ms
+        self.max_rows = max_rows
+        self.compress = compress
+        self.gzip_requests = gzip_requests
+        self.lock = threading.RLock()
+
+    def load_frames(self, frames):
+        with self.lock:
+            for key, df in frames.items():
+                name = TABLE_NAMES.get(key, key)
+                rows = [{k: _py(v) for k, v in r.items()} for r in df.to_dict("records")]
+                self.tables[name] = rows
+                self.next_id[name] = (max((r["id"] for r in rows), default=0) or 0) + 1
+
+    def rows(self, table):
+        return self.tables.setdefault(table, [])
+
+    def _new_id(self, table):
+        nid = self.next_id.get(table, 1)
+        self.next_id[table] = nid + 1
+        return nid
+
+    def _log(self, table, op, rows):
+        if not self.change_log or table == CHANGES_TABLE:
+            return
+        log = self.rows(CHANGES_TABLE)
+        for r in rows:
+            log.append({"id": self._new_id(CHANGES_TABLE), "table_name": table,
+                        "row_id": r.get("id"), "op": op})
+
+    def select(self, table, filters, order=None, limit=None, offset=0, columns=None):
+        with self.lock:
+            rows = [r for r in self.rows(table) if all(f(r) for f in filters)]
+        for part in reversed(order or []):
+            col, _, direction = part.partition(".")
+            desc = direction.startswith("desc")
+            # PostgreSQL: nulls sort last ascending and first descending
+            nulls_first = "nullsfirst" in direction or (desc and "nullslast" not in direction)
+            present = sorted((r for r in rows if r.get(col) is not None), key=lambda r: r[col], reverse=desc)
+            missing = [r for r in rows if r.get(col) is None]
+            rows = missing + present if nulls_first else present + missing
+        total = len(rows)
+        rows = rows[offset:offset + limit if limit is not None else None]
+        if columns:
+            rows = [{c: r.get(c) for c in columns} for r in rows]
+        return rows, total
+
+    def insert(self, table, records, on_conflict=None, merge=False):
+        out = []
+        with self.lock:
+            rows = self.rows(table)
+            keys = on_conflict.split(",") if on_conflict else ["id"]
+            index = None
+            if merge:
+                index = {tuple(r.get(k) for k in keys): r for r in rows}
+            for rec in records:
+                rec = dict(rec)
+                if merge:
+                    key = tuple(rec.get(k) for k in keys)
+                    hit = index.get(key)
+                    if hit is not None:
+                        hit.update({k: v for k, v in rec.items() if k != "id"})
+                        out.append(dict(hit))
+                        self._log(table, "U", [hit])
+                        continue
+                if rec.get("id") is None:
+                    rec["id"] = self._new_id(table)
+                rows.append(rec)
+                if merge:
+                    index[tuple(rec.get(k) for k in keys)] = rec
+                out.append(dict(rec))
+                self._log(table, "I", [rec])
+        return out
+
+    def rpc(self, function, args):
+        # (status, payload) of POST /rpc/<function>
+        fn = RPC_FUNCTIONS.get(function) if self.rpc_enabled else None
+        if fn is None:
+            return 404, {"code": "PGRST202", "message": f"Could not find the function public.{function}"}
+        with self.lock:
+            try:
+                return 200, fn(self, **(args or {}))
+            except (KeyError, TypeError, ValueError) as e:
+                return 400, {"code": "P0001", "message": str(e)}
+
+    def update(self, table, filters, values):
+        with self.lock:
+            hit = [r for r in self.rows(table) if all(f(r) for f in filters)]
+            for r in hit:
+                r.update(values)
+            self._log(table, "U", hit)
+            return [dict(r) for r in hit]
+
+    def delete(self, table, filters):
+        with self.lock:
+            rows = self.rows(table)
+            keep, gone = [], []
+            for r in rows:
+                (gone if all(f(r) for f in filters) else keep).append(r)
+            self.tables[table] = keep
+            self._log(table, "D", gone)
+            return gone
+
+
+def _save_competition_year(store, payload):
+    # migrations/002_save_competition_year.sql. Everything is checked before
+    # the first write, so a bad payload leaves the store untouched like the
+    # rolled-back transaction would.
+    cy_id = int(payload["competition_year_id"])
+    if not any(r.get("id") == cy_id for r in store.rows("competition_years")):
+        raise ValueError(f"competition year {cy_id} does not exist")
+    meats = [{"competition_year_id": cy_id, "meat": m["meat"], "participant": m.get("participant"),
+              "score": m.get("score"), "rank": m.get("rank")} for m in payload.get("meats", [])]
+    anc = [(a["category_name"], a) for a in payload.get("ancillary", [])]
+
+    store.insert("meat_results", meats, "competition_year_id,meat", merge=True)
+    if "team" in payload:
+        store.insert("team_results", [{"competition_year_id": cy_id, **payload["team"]}],
+                     "competition_year_id", merge=True)
+    cats = {r["category_name"]: r["id"] for r in store.rows("ancillary_categories")
+            if r.get("competition_year_id") == cy_id}
+    created = 0
+    for name, a in anc:
+        if name not in cats:
+            cats[name] = store.insert("ancillary_categories", [{"competition_year_id": cy_id, "category_name": name}])[0]["id"]
+            created += 1
+        store.insert("ancillary_results", [{"competition_year_id": cy_id, "category_id": cats[name],
+                                            "participant": a.get("participant"), "score": a.get("score"),
+                                            "rank": a.get("rank")}],
+                     "competition_year_id,category_id", merge=True)
+    if "ancillary_team" in payload:
+        store.insert("ancillary_team_results", [{"competition_year_id": cy_id, **payload["ancillary_team"]}],
+                     "competition_year_id", merge=True)
+    return {"competition_year_id": cy_id, "meat_results": len(meats),
+            "ancillary_categories": created, "ancillary_results": len(anc)}
+
+
+RPC_FUNCTIONS = {"save_competition_year": _save_competition_year}
+
+
+def make_handler(store):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _parse(self):
+            if store.latency_ms:
+                time.sleep(store.latency_ms / 1000)
+            parts = urlsplit(self.path)
+            table = parts.path.rstrip("/").rsplit("/", 1)[-1]
+            params = parse_qsl(parts.query, keep_blank_values=True)
+            filters = [_matcher(k, v) for k, v in params if k not in _RESERVED]
+            opts = {k: v for k, v in params if k in _RESERVED}
+            return table, filters, opts
+
+        def _prefer(self):
+            return {p.strip() for p in self.headers.get("Prefer", "").split(",") if p.strip()}
+
+        def _body(self):
+            n = int(self.headers.get("Content-Length") or 0)
+            if not n:
+                return None
+            raw = self.rfile.read(n)
+            if self.headers.get("Content-Encoding") == "gzip" and store.gzip_requests:
+                raw = gzip.decompress(raw)
+            try:
+                return json.loads(raw)
+            except ValueError:
+                return _INVALID
+
+        def _invalid(self):
+            self._send(400, {"code": "PGRST102", "message": "Empty or invalid json"})
+
+        def _encode(self, body):
+            # (body, Content-Encoding) as the client accepts it
+            if not store.compress or len(body) < COMPRESS_MIN_BYTES:
+                return body, None
+            accepted = {t.split(";")[0].strip() for t in self.headers.get("Accept-Encoding", "").split(",")}
+            if "br" in accepted and brotli is not None:
+                return brotli.compress(body, quality=5), "br"
+            if "gzip" in accepted:
+                return gzip.compress(body, compresslevel=6), "gzip"
+            return body, None
+
+        def _send(self, status, payload=None, headers=None, content_type="application/json; charset=utf-8"):
+            if isinstance(payload, bytes):
+                body = payload
+            else:
+                body = b"" if payload is None else json.dumps(payload, default=str).encode()
+            body, encoding = self._encode(body)
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            if encoding:
+                self.send_header("Content-Encoding", encoding)
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            table, filters, opts = self._parse()
+            if table == CHANGES_TABLE and not store.change_log:
+                self._send(404, {"code": "PGRST205", "message": f"Could not find the table 'public.{table}'"})
+                return
+            columns = None
+            sel = opts.get("select", "*")
+            if sel and sel != "*":
+                columns = [c.strip() for c in sel.split(",") if c.strip()]
+            order = opts["order"].split(",") if opts.get("order") else None
+            limit = int(opts["limit"]) if opts.get("limit") else None
+            offset = int(opts.get("offset") or 0)
+            if store.max_rows:
+                limit = min(limit or store.max_rows, store.max_rows)
+            rows, total = store.select(table, filters, order, limit, offset, columns)
+            end = offset + len(rows) - 1
+            headers = {"Content-Range": f"{offset}-{end}/{total}" if rows else f"*/{total}"}
+            if "text/csv" in self.headers.get("Accept", ""):
+                self._send(200, _csv(rows), headers, "text/csv; charset=utf-8")
+            else:
+                self._send(200, rows, headers)
+
+        def do_POST(self):
+            table, _, opts = self._parse()
+            body = self._body()
+            if body is _INVALID:
+                self._invalid()
+                return
+            if urlsplit(self.path).path.rstrip("/").rsplit("/", 2)[-2] == "rpc":
+                self._send(*store.rpc(table, body))
+                return
+            records = body if isinstance(body, list) else [body]
+            prefer = self._prefer()
+            merge = "resolution=merge-duplicates" in prefer
+            out = store.insert(table, records, opts.get("on_conflict"), merge)
+            if "return=representation" in prefer:
+                self._send(201, out)
+            else:
+                self._send(201)
+
+        def do_PATCH(self):
+            table, filters, _ = self._parse()
+            body = self._body()
+            if body is _INVALID:
+                self._invalid()
+                return
+            out = store.update(table, filters, body or {})
+            if "return=representation" in self._prefer():
+                self._send(200, out)
+            else:
+                self._send(204)
+
+        def do_DELETE(self):
+            table, filters, _ = self._parse()
+            out = store.delete(table, filters)
+            if "return=representation" in self._prefer():
+                self._send(200, out)
+            else:
+                self._send(204)
+
+    return Handler
+
+
+def serve(store, host="127.0.0.1", port=0):
+    # starts the server on a daemon thread; returns (server, base_url)
+    server = ThreadingHTTPServer((host, port), make_handler(store))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    from benchmarks.synthetic import generate
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=54321)
+    ap.add_argument("--events", type=int, default=2000)
+    ap.add_argument("--first-year", type=int, default=1995)
+    ap.add_argument("--last-year", type=int, default=2024)
+    ap.add_argument("--categories", type=int, default=30)
+    ap.add_argument("--change-log", action="store_true", help="serve table_changes like the 001 migration")
+    ap.add_argument("--rpc", action="store_true", help="serve the functions of the 002 migration")
+    ap.add_argument("--latency-ms", type=float, default=0, help="simulated round trip per request")
+    ap.add_argument("--max-rows", type=int, default=None, help="cap rows per GET like db-max-rows")
+    ap.add_argument("--compress", action="store_true", help="br / gzip responses per Accept-Encoding")
+    ap.add_argument("--gzip-requests", action="store_true", help="accept gzipped request bodies")
+    args = ap.parse_args()
+
+    store = StubStore(change_log=args.change_log, latency_ms=args.latency_ms, rpc=args.rpc,
+                      max_rows=args.max_rows, compress=args.compress, gzip_requests=args.gzip_requests)
+    store.load_frames(generate(n_events=args.events, first_year=args.first_year,
+                               last_year=args.last_year, n_categories=args.categories))
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(store))
+    print(f"PostgREST stub on http://{args.host}:{args.port} "
+          f"({sum(len(v) for v in store.tables.values())} rows)")
+    server.serve_forever()
@@ -0,0 +1,160 @@
+# benchmarks/synthetic.py
+# Synthetic KCBS-style data shaped like the seven Supabase tables.
+import numpy as np
+import pandas as pd
+
+MEATS = ["Chicken", "Ribs", "Pork", "Brisket"]
+
+ANCILLARY_POOL = [
+    "Sausage", "Dessert", "Chef's Choice", "Beans", "Wings", "Salsa", "Steak",
+    "Mac & Cheese", "Pie", "Cornbread", "Chili", "Veggies", "Sauce", "Pork Belly",
+    "Burgers", "Seafood", "Cobbler", "Potatoes", "Jerky", "Tacos", "Cake",
+    "Appetizer", "Bacon", "Lamb", "Exotic", "Dutch Oven", "Hot Dogs", "Wild Game",
+    "Breakfast", "Bloody Mary", "Soup", "Sliders", "Pasta", "Pizza", "Salad", "Fish",
+]
+
+STATES = ["KS", "MO", "IA", "NE", "OK", "TX", "AR", "TN", "IL", "CO", "SD", "MN"]
+
+
+def generate(n_events=300, first_year=1995, last_year=2024, n_cooks=40,
+             n_categories=30, held_prob=0.8, anc_per_year=(0, 4), seed=7):
+    # returns {"events", "years", "meats", "team", "anc_cat", "anc", "anc_team"}
+    # using the same table keys as bbq_results_app.load_all
+    rng = np.random.default_rng(seed)
+    cooks = [f"Cook {i:03d}" for i in range(n_cooks)]
+    categories = ANCILLARY_POOL[:n_categories] if n_categories <= len(ANCILLARY_POOL) else (
+        ANCILLARY_POOL + [f"Side {i}" for i in range(n_categories - len(ANCILLARY_POOL))]
+    )
+
+    events = pd.DataFrame({
+        "id": np.arange(1, n_events + 1),
+        "event_name": [f"Smoke Off #{i}" for i in range(1, n_events + 1)],
+        "location": [f"Town {i % 97}, {STATES[i % len(STATES)]}" for i in range(1, n_events + 1)],
+    })
+
+    # competition years: each event held in a random subset of seasons
+    all_years = np.arange(first_year, last_year + 1)
+    held = rng.random((n_events, len(all_years))) < held_prob
+    ev_idx, yr_idx = np.nonzero(held)
+    n_cy = len(ev_idx)
+    start = pd.to_datetime([f"{y}-04-01" for y in all_years[yr_idx]]) + pd.to_timedelta(
+        rng.integers(0, 180, n_cy), unit="D"
+    )
+    total_teams = rng.integers(20, 120, n_cy)
+    years = pd.DataFrame({
+        "id": np.arange(1, n_cy + 1),
+        "event_id": events["id"].to_numpy()[ev_idx],
+        "year": all_years[yr_idx],
+        "start_date": start.strftime("%Y-%m-%d"),
+        "end_date": (start + pd.Timedelta(days=1)).strftime("%Y-%m-%d"),
+        "total_teams": total_teams,
+    })
+    cy_ids = years["id"].to_numpy()
+
+    # core meats: one row per (competition year, meat)
+    m_cy = np.repeat(cy_ids, len(MEATS))
+    m_tt = np.repeat(total_teams, len(MEATS))
+    m_rank = np.minimum(rng.geometric(0.06, len(m_cy)), m_tt)
+    meats = pd.DataFrame({
+        "id": np.arange(1, len(m_cy) + 1),
+        "competition_year_id": m_cy,
+        "meat": np.tile(MEATS, n_cy),
+        "participant": np.array(cooks)[rng.integers(0, n_cooks, len(m_cy))],
+        "score": np.round(180 - (m_rank - 1) * 40 / m_tt + rng.normal(0, 2, len(m_cy)), 4),
+        "rank": m_rank,
+    })
+
+    team_rank = np.minimum(rng.geometric(0.05, n_cy), total_teams)
+    team = pd.DataFrame({
+        "id": np.arange(1, n_cy + 1),
+        "competition_year_id": cy_ids,
+        "total_score": np.round(meats.groupby("competition_year_id")["score"].sum().to_numpy(), 4),
+        "rank": team_rank,
+    })
+
+    # ancillary: a few categories per competition year
+    lo, hi = anc_per_year
+    n_cat_per = rng.integers(lo, hi + 1, n_cy)
+    c_cy = np.repeat(cy_ids, n_cat_per)
+    c_tt = np.repeat(total_teams, n_cat_per)
+    # distinct categories within a year: offset + arange modulo pool size
+    offsets = np.repeat(rng.integers(0, len(categories), n_cy), n_cat_per)
+    within = np.arange(len(c_cy)) - np.repeat(np.cumsum(n_cat_per) - n_cat_per, n_cat_per)
+    c_names = np.array(categories)[(offsets + within) % len(categories)]
+    anc_cat = pd.DataFrame({
+        "id": np.arange(1, len(c_cy) + 1),
+        "competition_year_id": c_cy,
+        "category_name": c_names,
+    })
+    a_rank = np.minimum(rng.geometric(0.08, len(c_cy)), c_tt)
+    anc = pd.DataFrame({
+        "id": np.arange(1, len(c_cy) + 1),
+        "competition_year_id": c_cy,
+        "category_id": anc_cat["id"].to_numpy(),
+        "participant": np.array(cooks)[rng.integers(0, n_cooks, len(c_cy))],
+        "score": np.round(180 - (a_rank - 1) * 40 / c_tt + rng.normal(0, 2, len(c_cy)), 4),
+        "rank": a_rank,
+    })
+    has_anc = np.unique(c_cy)
+    anc_team = pd.DataFrame({
+        "id": np.arange(1, len(has_anc) + 1),
+        "competition_year_id": has_anc,
+        "total_score": np.round(anc.groupby("competition_year_id")["score"].sum().to_numpy(), 4),
+        "rank": np.minimum(rng.geometric(0.05, len(has_anc)), total_teams[has_anc - 1]),
+    })
+
+    return {
+        "events": events,
+        "years": years,
+        "meats": meats,
+        "team": team,
+        "anc_cat": anc_cat,
+        "anc": anc,
+        "anc_team": anc_team,
+    }
+
+
+def split_latest_season(tables):
+    # (history, full) pair where `history` lacks the most recent season's
+    # results; used to measure incremental updates against full rebuilds
+    last = tables["years"]["year"].max()
+    latest_cy = tables["years"].loc[tables["years"]["year"] == last, "id"]
+    history = dict(tables)
+    for key in ("meats", "team", "anc", "anc_team", "anc_cat"):
+        df = tables[key]
+        history[key] = df[~df["competition_year_id"].isin(latest_cy)].reset_index(drop=True)
+    return history, tables
+
+
+def legacy_export(tables, n_years=200, seed=11):
+    # flat one-row-per-submission frame in the shape of the legacy Excel
+    # export both importers read (migration_tool and the CLI)
+    rng = np.random.default_rng(seed)
+    years = tables["years"]
+    pick = years.iloc[rng.choice(len(years), min(n_years, len(years)), replace=False)]
+    ev = tables["events"].set_index("id")
+    team = tables["team"].set_index("competition_year_id")
+    cats = tables["anc_cat"].set_index("id")["category_name"]
+
+    meats = tables["meats"][tables["meats"]["competition_year_id"].isin(pick["id"])]
+    anc = tables["anc"][tables["anc"]["competition_year_id"].isin(pick["id"])]
+    subs = pd.concat([
+        meats.rename(columns={"meat": "Category"}),
+        anc.assign(Category=cats.reindex(anc["category_id"]).to_numpy()),
+    ], ignore_index=True)
+    y = pick.set_index("id").reindex(subs["competition_year_id"])
+    # "Location" before "Competition": migration_tool's detection lets the
+    # last matching column win for the event name
+    return pd.DataFrame({
+        "Year": y["year"].to_numpy(),
+        "Location": ev["location"].reindex(y["event_id"]).to_numpy(),
+        "Competition": ev["event_name"].reindex(y["event_id"]).to_numpy(),
+        "Competition Dates": (y["start_date"] + " to " + y["end_date"]).to_numpy(),
+        "Total Teams": y["total_teams"].to_numpy(),
+        "Category": subs["Category"].to_numpy(),
+        "Participant": subs["participant"].to_numpy(),
+        "Score": subs["score"].to_numpy(),
+        "Rank": subs["rank"].to_numpy(),
+        "Team Total": team["total_score"].reindex(subs["competition_year_id"]).to_numpy(),
+        "Team Rank": team["rank"].reindex(subs["competition_year_id"]).to_numpy(),
+    })
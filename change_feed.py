@@ -0,0 +1,313 @@
+# change_feed.py
+# Keeps the shared table snapshots (table_cache) current by polling a change
+# log instead of reloading whole tables. The log is the table_changes table
+# from migrations/001_change_log.sql: one (seq, table, row id, op) entry per
+# written row. Each refresh fetches only the touched rows and patches them
+# into the cached frames.
+import os
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from table_cache import CACHE, index_by_id
+
+FEED_ENV = "BBQ_CHANGE_FEED"    # 0 disables polling (snapshots then rely on TTL / own writes)
+CHANGES_TABLE = "table_changes"
+POLL_INTERVAL_S = 2.0           # at most one poll per interval, process-wide
+MAX_DELTA = 5000                # larger bursts drop the snapshots instead of patching
+FETCH_CHUNK = 200               # ids per in.() request
+DELETE_RUNS = 64                # more deleted rows per table are dropped by mask, not by slicing
+
+Change = namedtuple("Change", ["seq", "table", "op", "row_id"])
+
+
+# ---------------------------------------------------
+# FEEDS
+# ---------------------------------------------------
+class SupabaseFeed:
+    # table_changes over PostgREST
+
+    def latest(self):
+        # highest seq in the log; None when the log table isn't there
+        from supabase_client import Query
+
+        resp = Query(CHANGES_TABLE).select("id").order("id", desc=True).limit(1).get()
+        if resp.status_code != 200:
+            return None
+        rows = resp.json()
+        return int(rows[0]["id"]) if rows else 0
+
+    def poll(self, since, limit):
+        from supabase_client import Query
+
+        rows = (Query(CHANGES_TABLE).select("id", "table_name", "row_id", "op")
+                .gt("id", int(since)).order("id").limit(limit).rows())
+        return [Change(int(r["id"]), r["table_name"], r["op"], int(r["row_id"])) for r in rows]
+
+    def fetch_rows(self, table, ids):
+        from supabase_client import Query
+
+        ids = sorted(ids)
+        frames = []
+        for i in range(0, len(ids), FETCH_CHUNK):
+            frames.append(pd.DataFrame(Query(table).in_("id", ids[i:i + FETCH_CHUNK]).rows()))
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+class FakeFeed:
+    # in-memory tables plus the change log the trigger would write; used by
+    # benchmarks/check_change_feed.py to drive the refresher without Supabase
+
+    def __init__(self, frames=None):
+        self.rows = {}
+        self.changes = []
+        for table, df in (frames or {}).items():
+            self.rows[table] = {int(r["id"]): r for r in df.to_dict("records")}
+
+    def _log(self, table, op, row_id):
+        self.changes.append(Change(len(self.changes) + 1, table, op, int(row_id)))
+
+    def insert(self, table, row):
+        rows = self.rows.setdefault(table, {})
+        row = dict(row)
+        if row.get("id") is None:
+            row["id"] = max(rows, default=0) + 1
+        rows[int(row["id"])] = row
+        self._log(table, "I", row["id"])
+        return row
+
+    def update(self, table, row_id, **values):
+        self.rows[table][int(row_id)].update(values)
+        self._log(table, "U", row_id)
+
+    def delete(self, table, row_id):
+        del self.rows[table][int(row_id)]
+        self._log(table, "D", row_id)
+
+    def frame(self, table):
+        # what a full reload would return
+        rows = self.rows.get(table, {})
+        return pd.DataFrame([rows[k] for k in sorted(rows)])
+
+    def latest(self):
+        return len(self.changes)
+
+    def poll(self, since, limit):
+        return self.changes[since:since + limit]
+
+    def fetch_rows(self, table, ids):
+        rows = self.rows.get(table, {})
+        return pd.DataFrame([rows[i] for i in sorted(ids) if i in rows])
+
+
+# ---------------------------------------------------
+# PATCHING
+# ---------------------------------------------------
+def _positions(index, ids):
+    # positions of `ids` in `index`, -1 where absent. Snapshots come in id
+    # order, so this is a binary search per id rather than a hash table
+    # built over the whole index
+    if not index.is_monotonic_increasing:
+        return index.get_indexer(ids)
+    labels = index.to_numpy()
+    pos = labels.searchsorted(ids)
+    found = pos < len(labels)
+    found[found] = labels[pos[found]] == ids[found]
+    return np.where(found, pos, -1)
+
+
+def _write(frame, pos, rows):
+    # rows' values into frame's rows at `pos`, in place, column by column;
+    # unchanged cells are skipped (a pyarrow string column is rebuilt
+    # whole on any write, and most updates only touch scores and ranks)
+    for col in rows.columns.intersection(frame.columns, sort=False):
+        j = frame.columns.get_loc(col)
+        old = frame.iloc[pos, j].reset_index(drop=True)
+        new = rows[col].reset_index(drop=True)
+        try:
+            changed = ~(old.eq(new) | (old.isna() & new.isna())).to_numpy(dtype=bool)
+        except TypeError:
+            changed = np.ones(len(pos), dtype=bool)
+        if not changed.any():
+            continue
+        values = new.to_numpy()[changed]
+        try:
+            frame.iloc[pos[changed], j] = values
+        except (TypeError, ValueError):
+            # a value the column's dtype can't hold (a NULL in an int
+            # column): rebuild it and let pandas infer, as a reload would
+            column = frame[col].tolist()
+            for p, v in zip(pos[changed].tolist(), values.tolist()):
+                column[p] = v
+            frame[col] = pd.Series(column, index=frame.index)
+
+
+def apply_changes(frame, upserts, deleted_ids=()):
+    # `frame` indexed by id (table_cache.index_by_id) with the rows of
+    # `upserts` replacing / adding rows and `deleted_ids` removed. Updates
+    # are written in place on their labels, so a patch that only updates
+    # costs a lookup per touched id; deletes and new ids copy the columns
+    # once, in one concat (sorted only when a new id lands before the last
+    # one). May return `frame` itself, modified; None when rows can't be
+    # found by id.
+    if frame.empty:
+        return index_by_id(upserts.reset_index(drop=True)) if not upserts.empty else frame
+    if "id" not in frame.columns:
+        return None
+    dtype = frame.index.dtype
+    parts = [frame]
+    if len(deleted_ids):
+        gone = _positions(frame.index, np.fromiter(deleted_ids, dtype=dtype))
+        gone = np.unique(gone[gone >= 0])
+        if len(gone) > DELETE_RUNS:
+            keep = np.ones(len(frame), dtype=bool)
+            keep[gone] = False
+            parts = [frame[keep]]
+        elif len(gone):
+            # the runs between deleted rows are views: concat copies each once
+            edges = np.concatenate([[-1], gone, [len(frame)]])
+            parts = [frame.iloc[a + 1:b] for a, b in zip(edges[:-1].tolist(), edges[1:].tolist()) if b > a + 1]
+    ids = upserts["id"].to_numpy(dtype=dtype) if not upserts.empty else np.array([], dtype=dtype)
+    new = _positions(frame.index, ids) < 0
+    resort = False
+    if new.any():
+        parts.append(index_by_id(upserts[new].reset_index(drop=True)).reindex(columns=frame.columns))
+        resort = frame.index.is_monotonic_increasing and ids[new].min() < frame.index[-1]
+    if len(parts) != 1 or parts[0] is not frame:
+        frame = pd.concat(parts) if parts else frame.iloc[:0]
+        if resort:
+            frame = frame.sort_index(kind="stable")
+    if (~new).any():
+        _write(frame, _positions(frame.index, ids[~new]), upserts[~new])
+    return frame
+
+
+class ChangeFeedRefresher:
+    # polls `feed` from a seq watermark and patches `cache`. The first
+    # refresh only records the watermark (and drops snapshots older than
+    # it); a feed without a log table disables itself.
+
+    def __init__(self, feed, cache=CACHE, interval=POLL_INTERVAL_S, max_delta=MAX_DELTA):
+        self.feed = feed
+        self.cache = cache
+        self.interval = interval
+        self.max_delta = max_delta
+        self.watermark = None
+        self.disabled = False
+        self.last_poll = 0.0
+        self.pending = False
+        self.polls = self.changes_seen = self.rows_patched = self.failures = 0
+        self._lock = threading.Lock()
+
+    @property
+    def active(self):
+        return not self.disabled and self.watermark is not None
+
+    def note_write(self):
+        # the app just wrote through supabase_client: poll on the next
+        # refresh regardless of the interval so the page sees its own write
+        self.pending = True
+
+    def refresh(self, force=False):
+        # returns the number of changes applied; never raises
+        own_write = self.pending
+        force = force or own_write
+        if self.disabled or (not force and time.monotonic() - self.last_poll < self.interval):
+            return 0
+        # a routine poll skips when another session is already polling; after
+        # an own write, wait for it and poll again so the write is visible
+        if not self._lock.acquire(blocking=force):
+            return 0
+        try:
+            self.last_poll = time.monotonic()
+            self.pending = False
+            return self._refresh()
+        except Exception:
+            # a failed poll keeps the watermark; the next one retries
+            self.failures += 1
+            self.pending = self.pending or own_write
+            return 0
+        finally:
+            self._lock.release()
+
+    def _refresh(self):
+        if self.watermark is None:
+            latest = self.feed.latest()
+            if latest is None:
+                self.disabled = True
+                return 0
+            self.cache.clear()
+            self.watermark = latest
+            return 0
+
+        changes = self.feed.poll(self.watermark, self.max_delta + 1)
+        self.polls += 1
+        if not changes:
+            return 0
+        if len(changes) > self.max_delta:
+            # a bulk import: reloading is cheaper than patching
+            self.cache.clear()
+            self.watermark = self.feed.latest() or changes[-1].seq
+            self.changes_seen += len(changes)
+            return len(changes)
+
+        by_table = {}
+        for c in changes:
+            by_table.setdefault(c.table, set()).add(c.row_id)
+        cached = set(self.cache.cached_tables())
+        for table, ids in by_table.items():
+            if table not in cached:
+                # nothing to patch, but a load already in flight may predate
+                # the change: don't let it be stored
+                self.cache.invalidate(table)
+                continue
+            rows = self.feed.fetch_rows(table, ids)
+            found = set(rows["id"].astype("int64")) if not rows.empty else set()
+            # touched ids the fetch no longer returns were deleted
+            if self.cache.patch(table, lambda frame: apply_changes(frame, rows, ids - found)):
+                self.rows_patched += len(ids)
+        self.watermark = changes[-1].seq
+        self.changes_seen += len(changes)
+        return len(changes)
+
+    def stats(self):
+        return {
+            "watermark": self.watermark,
+            "disabled": self.disabled,
+            "polls": self.polls,
+            "changes": self.changes_seen,
+            "rows_patched": self.rows_patched,
+            "failures": self.failures,
+        }
+
+
+_refresher = None
+_refresher_lock = threading.Lock()
+
+
+def get_refresher():
+    global _refresher
+    with _refresher_lock:
+        if _refresher is None:
+            _refresher = ChangeFeedRefresher(SupabaseFeed())
+            _refresher.disabled = os.environ.get(FEED_ENV, "1").lower() in ("0", "false", "no")
+        return _refresher
+
+
+def refresh():
+    # called at the top of the pages' data loads; cheap when nothing changed
+    return get_refresher().refresh()
+
+
+def note_write(table):
+    # supabase_client calls this after every insert / upsert / delete. With
+    # the feed active the change arrives through the log (patched on the
+    # next refresh); otherwise the table's snapshot is dropped.
+    r = _refresher
+    if r is not None and r.active:
+        r.note_write()
+    else:
+        CACHE.invalidate(table)
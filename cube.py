@@ -0,0 +1,205 @@
+# cube.py
+import threading
+import numpy as np
+import pandas as pd
+
+DIMS = ["event", "year", "group"]
+MEASURES = {"Percentile Rank": "Percentile Rank", "Score": "score", "Rank": "rank"}
+
+
+class Dimension:
+    # label <-> position index for one cube axis; positions never move, new
+    # labels are appended (the cube grows along that axis)
+
+    def __init__(self):
+        self.labels = []
+        self.index = {}
+
+    def __len__(self):
+        return len(self.labels)
+
+    def encode(self, values):
+        codes, uniques = pd.factorize(values)
+        mapped = np.empty(len(uniques), dtype="int64")
+        for i, label in enumerate(uniques):
+            pos = self.index.get(label)
+            if pos is None:
+                pos = self.index[label] = len(self.labels)
+                self.labels.append(label)
+            mapped[i] = pos
+        return mapped[codes] if len(codes) else np.array([], dtype="int64")
+
+    def positions(self, labels=None):
+        if labels is None:
+            return np.arange(len(self.labels))
+        return np.array([self.index[l] for l in labels if l in self.index], dtype="int64")
+
+
+class PivotCube:
+    # dense event x year x meat/category cube over an enriched fact frame
+    # (analytics.build_core / build_ancillary output). Each measure keeps a
+    # sum and a count array, so cells are means and any change is a signed
+    # add: update() diffs by row id and only touches the rows that changed.
+
+    def __init__(self, group_col):
+        self.group_col = group_col
+        self.version = None
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.dims = {d: Dimension() for d in DIMS}
+        self.sums = np.zeros((len(MEASURES), 0, 0, 0))
+        self.counts = np.zeros((len(MEASURES), 0, 0, 0), dtype="int32")
+        self._ids = np.array([], dtype="int64")
+        self._codes = np.zeros((0, len(DIMS)), dtype="int64")
+        self._vals = np.zeros((0, len(MEASURES)))
+
+    @property
+    def shape(self):
+        return tuple(len(self.dims[d]) for d in DIMS)
+
+    def _rows(self, df):
+        # (ids, codes, values) sorted by id; registers unseen labels
+        if df.empty or self.group_col not in df.columns:
+            return np.array([], dtype="int64"), np.zeros((0, len(DIMS)), dtype="int64"), np.zeros((0, len(MEASURES)))
+        year = pd.to_numeric(df["year"], errors="coerce").to_numpy(dtype="float64")
+        keep = ~np.isnan(year)
+        raw_ids = df["id"].to_numpy()
+        if keep.all() and (np.diff(raw_ids) > 0).all():
+            # already unique and sorted (the usual case): no row gather
+            ids, pick = raw_ids, slice(None)
+        else:
+            ids, first = np.unique(raw_ids[keep], return_index=True)
+            pick = np.flatnonzero(keep)[first]
+
+        def labels(col):
+            return df[col].fillna("(unknown)").array
+
+        codes = np.column_stack([
+            self.dims["event"].encode(labels("event_name"))[pick],
+            self.dims["year"].encode(year[pick].astype("int64")),
+            self.dims["group"].encode(labels(self.group_col))[pick],
+        ])
+        vals = np.column_stack([
+            pd.to_numeric(df[col], errors="coerce").to_numpy(dtype="float64")[pick]
+            for col in MEASURES.values()
+        ])
+        return ids.astype("int64"), codes, vals
+
+    def _grow(self):
+        # pad the arrays when encode() registered new labels
+        shape = self.shape
+        if self.sums.shape[1:] == shape:
+            return
+        pad = [(0, 0)] + [(0, n - cur) for n, cur in zip(shape, self.sums.shape[1:])]
+        self.sums = np.pad(self.sums, pad)
+        self.counts = np.pad(self.counts, pad)
+
+    def _apply(self, codes, vals, sign):
+        if not len(codes):
+            return
+        flat = np.ravel_multi_index(codes.T, self.shape)
+        for m in range(len(MEASURES)):
+            ok = ~np.isnan(vals[:, m])
+            np.add.at(self.sums[m].reshape(-1), flat[ok], sign * vals[ok, m])
+            np.add.at(self.counts[m].reshape(-1), flat[ok], sign)
+
+    def rebuild(self, df, version=None):
+        with self._lock:
+            self._reset()
+            ids, codes, vals = self._rows(df)
+            self._grow()
+            self._apply(codes, vals, 1)
+            self._ids, self._codes, self._vals = ids, codes, vals
+            self.version = version
+        return self
+
+    def append(self, df, version=None):
+        # fast path when `df` only holds newly inserted results: O(len(df))
+        if not len(self._ids):
+            return self.rebuild(df, version)
+        with self._lock:
+            ids, codes, vals = self._rows(df)
+            fresh = ~np.isin(ids, self._ids)
+            if fresh.any():
+                self._grow()
+                self._apply(codes[fresh], vals[fresh], 1)
+                merged_ids = np.concatenate([self._ids, ids[fresh]])
+                order = np.argsort(merged_ids, kind="stable")
+                self._ids = merged_ids[order]
+                self._codes = np.concatenate([self._codes, codes[fresh]])[order]
+                self._vals = np.concatenate([self._vals, vals[fresh]])[order]
+            self.version = version
+        return self
+
+    def update(self, df, version=None):
+        if version is not None and version == self.version:
+            return self
+        if not len(self._ids):
+            return self.rebuild(df, version)
+        with self._lock:
+            ids, codes, vals = self._rows(df)
+            self._grow()
+            old_ids = self._ids
+
+            pos = np.minimum(np.searchsorted(old_ids, ids), len(old_ids) - 1)
+            in_old = old_ids[pos] == ids
+            if len(ids):
+                back = np.minimum(np.searchsorted(ids, old_ids), len(ids) - 1)
+                gone = ids[back] != old_ids
+            else:
+                gone = np.ones(len(old_ids), dtype=bool)
+
+            old_pos = pos[in_old]
+            if len(old_pos) == len(old_ids):
+                # same or only added ids: compare without gathering rows
+                old_codes, old_vals = self._codes, self._vals
+            else:
+                old_codes, old_vals = self._codes[old_pos], self._vals[old_pos]
+            new_codes, new_vals = (codes, vals) if in_old.all() else (codes[in_old], vals[in_old])
+            same_vals = (old_vals == new_vals) | (np.isnan(old_vals) & np.isnan(new_vals))
+            changed = (old_codes != new_codes).any(axis=1) | ~same_vals.all(axis=1)
+
+            out = gone.copy()
+            out[old_pos[changed]] = True
+            add = ~in_old
+            add[np.flatnonzero(in_old)[changed]] = True
+
+            self._apply(self._codes[out], self._vals[out], -1)
+            self._apply(codes[add], vals[add], 1)
+            self._ids, self._codes, self._vals = ids, codes, vals
+            self.version = version
+        return self
+
+    # --- queries ---
+    def _select(self, measure, events, years, groups):
+        m = list(MEASURES).index(measure)
+        sel = [self.dims["event"].positions(events), self.dims["year"].positions(years),
+               self.dims["group"].positions(groups)]
+        idx = np.ix_(*sel)
+        labels = [np.asarray(self.dims[d].labels, dtype=object)[s] for d, s in zip(DIMS, sel)]
+        return self.sums[m][idx], self.counts[m][idx], labels
+
+    def slice(self, measure, events=None, years=None, groups=None):
+        # mean of `measure` per selected (event, year, group) cell, NaN where
+        # there is no result; returns (array, [event, year, group labels])
+        sums, counts, labels = self._select(measure, events, years, groups)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(counts > 0, sums / counts, np.nan), labels
+
+    def compare(self, measure, events, years=None, groups=None):
+        # year x group rows, one column per event
+        cells, (ev, yr, gr) = self.slice(measure, events, years, groups)
+        table = cells.transpose(1, 2, 0).reshape(len(yr) * len(gr), len(ev))
+        out = pd.DataFrame(table, columns=ev,
+                           index=pd.MultiIndex.from_product([yr, gr], names=["year", "group"]))
+        return out[~np.isnan(table).all(axis=1)] if len(ev) else out
+
+    def summary(self, measure, events, years=None, groups=None):
+        # group rows, one column per event: mean over the selected years
+        sums, counts, (ev, _, gr) = self._select(measure, events, years, groups)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cells = np.where(counts.sum(axis=1) > 0, sums.sum(axis=1) / counts.sum(axis=1), np.nan)
+        out = pd.DataFrame(cells.T, columns=ev, index=pd.Index(gr, name="group"))
+        return out[~np.isnan(cells.T).all(axis=1)] if len(ev) else out
@@ -0,0 +1,177 @@
+# event_index.py
+# Lookup structures over the events / competition years snapshots for the
+# intake pickers: name -> id and (event, year) -> competition year id dicts
+# for O(1) picks, plus a prefix / trigram index for type-ahead search. Built
+# once per snapshot pair and shared by every session (get_index). Catalogs
+# too big for the trigram index are never loaded whole: ServerIndex answers
+# the same lookups with filtered queries and searches with ilike.
+from bisect import bisect_left
+
+import streamlit as st
+
+import table_cache
+from supabase_client import Query
+
+MAX_MATCHES = 50            # options sent to the selectbox per search
+TRIGRAM_MAX = 50_000        # larger catalogs search on the server instead
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class EventIndex:
+
+    def __init__(self, events_df, years_df, trigrams=True):
+        self.by_name = {}       # event_name -> id (first row wins, like the old scan)
+        self.events = {}        # id -> (event_name, location)
+        self.years = {}         # event id -> {year as str: competition year id}
+        if not events_df.empty:
+            for eid, name, location in zip(events_df["id"].tolist(), events_df["event_name"].tolist(),
+                                           events_df["location"].tolist()):
+                self.events[eid] = (name, location)
+                self.by_name.setdefault(name, eid)
+        if not years_df.empty:
+            for cy_id, eid, year in zip(years_df["id"].tolist(), years_df["event_id"].tolist(),
+                                        years_df["year"].astype(str).tolist()):
+                self.years.setdefault(eid, {}).setdefault(year, cy_id)
+
+        # (lower name, name) sorted for prefix search; trigram -> names
+        self._sorted = sorted((n.lower(), n) for n in self.by_name if isinstance(n, str))
+        self._keys = [k for k, _ in self._sorted]
+        self.trigrams = None
+        if trigrams and len(self._sorted) <= TRIGRAM_MAX:
+            self.trigrams = {}
+            for low, name in self._sorted:
+                for g in _trigrams(low):
+                    self.trigrams.setdefault(g, set()).add(name)
+
+    def __len__(self):
+        return len(self.by_name)
+
+    @property
+    def local_search(self):
+        return self.trigrams is not None
+
+    def event_id(self, name):
+        return self.by_name.get(name)
+
+    def location(self, event_id):
+        return self.events.get(event_id, (None, None))[1]
+
+    def years_of(self, event_id):
+        # year labels of an event, in snapshot order
+        return list(self.years.get(event_id, {}))
+
+    def year_id(self, event_id, year):
+        return self.years.get(event_id, {}).get(str(year))
+
+    def names(self, limit=MAX_MATCHES):
+        return [name for _, name in self._sorted[:limit]]
+
+    def _prefix(self, low, limit):
+        out = []
+        i = bisect_left(self._keys, low)
+        while i < len(self._keys) and self._keys[i].startswith(low) and len(out) < limit:
+            out.append(self._sorted[i][1])
+            i += 1
+        return out
+
+    def search(self, query, limit=MAX_MATCHES):
+        # names containing `query` (case-insensitive), prefix matches first;
+        # queries under 3 characters only match name prefixes
+        low = query.strip().lower()
+        if not low:
+            return self.names(limit)
+        prefix = self._prefix(low, limit)
+        if len(low) < 3 or len(prefix) >= limit:
+            return prefix
+        sets = sorted((self.trigrams.get(g, set()) for g in _trigrams(low)), key=len)
+        hits = set.intersection(*sets) if sets and sets[0] else set()
+        seen = set(prefix)
+        rest = sorted(n for n in hits if n not in seen and low in n.lower())
+        return prefix + rest[:limit - len(prefix)]
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _cached_index(tokens, _events_df, _years_df):
+    return EventIndex(_events_df, _years_df)
+
+
+def get_index(events_df, years_df, tokens):
+    # shared index for a (events token, years token) pair of snapshots;
+    # snapshots that failed to load (None token) get a private one
+    if None in tokens:
+        return EventIndex(events_df, years_df)
+    return _cached_index(tuple(tokens), events_df, years_df)
+
+
+def catalog_is_large():
+    # more than TRIGRAM_MAX events? Asks for the one row past the limit,
+    # cached until the events table changes
+    probe = Query("competition_events").select("id").order("id").range(TRIGRAM_MAX, TRIGRAM_MAX)
+    return not table_cache.query_snapshot(probe)[0].empty
+
+
+def _ilike_pattern(query):
+    # *query* with ilike's own wildcards escaped
+    escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"*{escaped}*"
+
+
+def search_server(query, limit=MAX_MATCHES):
+    # event names matching `query`, searched by PostgREST (for catalogs
+    # above TRIGRAM_MAX); cached per query until the events table changes
+    q = Query("competition_events").select("event_name").order("event_name").limit(limit)
+    if query.strip():
+        q.ilike("event_name", _ilike_pattern(query.strip()))
+    df = table_cache.query_snapshot(q)[0]
+    return list(dict.fromkeys(df["event_name"].tolist())) if not df.empty else []
+
+
+class ServerIndex:
+    # EventIndex's lookups for catalogs above TRIGRAM_MAX, each one a
+    # filtered query cached like the intake page's year rows
+    # (table_cache.query_snapshot), so the events and competition years
+    # tables are never fetched whole
+
+    local_search = False
+
+    def event_id(self, name):
+        # first event of that name by id, like EventIndex.by_name
+        if not isinstance(name, str):
+            return None
+        q = Query("competition_events").select("id").eq("event_name", name).order("id").limit(1)
+        df = table_cache.query_snapshot(q)[0]
+        return int(df["id"].iloc[0]) if not df.empty else None
+
+    def location(self, event_id):
+        if event_id is None:
+            return None
+        df = table_cache.query_snapshot(Query("competition_events").select("location").eq("id", event_id))[0]
+        return df["location"].iloc[0] if not df.empty else None
+
+    def _years(self, event_id):
+        # {year as str: competition year id} of an event, first row wins
+        if event_id is None:
+            return {}
+        q = Query("competition_years").select("id", "year").eq("event_id", event_id).order("id")
+        df = table_cache.query_snapshot(q)[0]
+        years = {}
+        if not df.empty:
+            for cy_id, year in zip(df["id"].tolist(), df["year"].astype(str).tolist()):
+                years.setdefault(year, cy_id)
+        return years
+
+    def years_of(self, event_id):
+        return list(self._years(event_id))
+
+    def year_id(self, event_id, year):
+        return self._years(event_id).get(str(year))
+
+    def search(self, query, limit=MAX_MATCHES):
+        return search_server(query, limit)
+
+
+def search(index, query, limit=MAX_MATCHES):
+    return index.search(query, limit) if index.local_search else search_server(query, limit)
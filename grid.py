@@ -0,0 +1,64 @@
+# grid.py
+# Paged result tables: only the visible slice is serialized to the browser.
+import math
+
+import streamlit as st
+
+PAGE_SIZES = [50, 100, 250, 500]
+MAX_ROWS = 500          # hard cap on rows sent per render, whatever the page size
+NO_SORT = "(none)"
+
+
+def sort_positions(df, column, ascending=True):
+    # row positions of df ordered by `column`; stable, missing values last
+    s = df[column].reset_index(drop=True)
+    return s.sort_values(ascending=ascending, na_position="last", kind="stable").index.to_numpy()
+
+
+def page_slice(df, page, page_size, sort_by=None, ascending=True):
+    # rows of one page (0-based); sorting happens here on the server so the
+    # order is over all rows, not just the ones on screen
+    page_size = min(page_size, MAX_ROWS)
+    start = page * page_size
+    if sort_by:
+        return df.iloc[sort_positions(df, sort_by, ascending)[start:start + page_size]]
+    return df.iloc[start:start + page_size]
+
+
+def paged_dataframe(df, key, columns=None, reset_on=None):
+    # st.dataframe over one page of `df`. Page, page size and sort live in
+    # st.session_state under `key`; `reset_on` is any hashable describing
+    # the current filters; a change to it or to the sort goes back to page 1.
+    columns = list(columns or df.columns)
+    state = st.session_state
+    page_key, size_key = f"{key}_page", f"{key}_size"
+    sort_key, asc_key = f"{key}_sort", f"{key}_asc"
+    sig_key = f"{key}_filters"
+
+    c1, c2, c3, c4 = st.columns([3, 2, 2, 2])
+    with c1:
+        sort_by = st.selectbox("Sort by", [NO_SORT] + columns, key=sort_key)
+    with c2:
+        ascending = st.radio("Order", ["Ascending", "Descending"], horizontal=True,
+                             key=asc_key) == "Ascending"
+    with c3:
+        page_size = st.selectbox("Rows per page", PAGE_SIZES, index=1, key=size_key)
+
+    signature = (reset_on, sort_by, ascending)
+    if state.get(sig_key) != signature:
+        state[sig_key] = signature
+        state[page_key] = 1
+
+    n_pages = max(1, math.ceil(len(df) / page_size))
+    # a narrower filter or bigger page may leave the stored page out of range
+    state[page_key] = min(max(1, int(state.get(page_key, 1))), n_pages)
+    with c4:
+        page = st.number_input(f"Page (of {n_pages})", min_value=1, max_value=n_pages,
+                               step=1, key=page_key)
+
+    view = page_slice(df, page - 1, page_size,
+                      sort_by=None if sort_by == NO_SORT else sort_by, ascending=ascending)[columns]
+    st.dataframe(view, use_container_width=True, hide_index=True)
+    first = (page - 1) * page_size
+    st.caption(f"Rows {first + 1 if len(df) else 0:,}–{first + len(view):,} of {len(df):,}")
+    return view
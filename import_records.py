@@ -0,0 +1,64 @@
+# import_records.py
+# Compact, typed rows for the migration import. A 100k-row upload used to be
+# held as 100k 16-key dicts; slotted dataclasses drop the per-row dict and
+# the repeated event / location / category / participant strings are
+# interned, so every row of the same event shares one string object.
+# The payload records serialize straight to JSON (supabase_client.dumps).
+import sys
+from dataclasses import dataclass
+from datetime import date
+
+
+def intern(value):
+    # stripped, interned string; None stays None
+    return None if value is None else sys.intern(str(value).strip())
+
+
+@dataclass(slots=True)
+class ImportRow:
+    year: int
+    event: str
+    location: str
+    start_date: date | None
+    end_date: date | None
+    total_teams: int | None
+    meat: str | None
+    ancillary_category: str | None
+    participant: str | None
+    score: float | None
+    rank: int | None
+    team_total_score: float | None
+    team_rank: int | None
+    ancillary_team_total: float | None
+    ancillary_team_rank: int | None
+
+    @property
+    def event_key(self):
+        # the (event, location) key the dimension caches use
+        return self.event.lower(), self.location.lower()
+
+
+# --- payloads, one per result row / team total ---
+@dataclass(slots=True)
+class MeatResult:
+    competition_year_id: int
+    meat: str
+    participant: str | None
+    score: float | None
+    rank: int | None
+
+
+@dataclass(slots=True)
+class AncillaryResult:
+    competition_year_id: int
+    category_id: int
+    participant: str | None
+    score: float | None
+    rank: int | None
+
+
+@dataclass(slots=True)
+class TeamTotal:
+    competition_year_id: int
+    total_score: float | None
+    rank: int | None
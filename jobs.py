@@ -0,0 +1,239 @@
+# jobs.py
+# Background jobs for work that must outlive a Streamlit rerun (imports).
+# Jobs run on a process-wide pool of worker threads, so reruns, page
+# switches and closed tabs don't abandon them; pages poll the runner for
+# status. Each job declares the keys it writes (competition years for an
+# import): jobs sharing a key run one after the other. Status is persisted
+# as JSON so the history survives a restart (unfinished jobs of a previous
+# process show up as interrupted).
+import json
+import os
+import tempfile
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+JOBS_DIR_ENV = "BBQ_JOBS_DIR"       # where job status is persisted (default: <tmp>/bbq_jobs)
+WORKERS_ENV = "BBQ_JOB_WORKERS"     # concurrent jobs (default 2)
+KEEP = 50                           # persisted jobs kept
+MAX_ERRORS = 200                    # error messages kept per job (all are counted)
+PERSIST_EVERY_S = 0.5
+
+ACTIVE = ("queued", "waiting", "running")
+FINISHED = ("done", "failed", "cancelled", "interrupted")
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    # one unit of background work. The job function gets the Job and
+    # reports through update() / error(), checking `cancelled` between steps.
+
+    def __init__(self, runner, kind, label, keys, total=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.label = label
+        self.keys = frozenset(keys)
+        self.state = "queued"
+        self.done = 0
+        self.total = total
+        self.message = ""
+        self.errors = []
+        self.error_count = 0
+        self.result = None
+        self.created = time.time()
+        self.started = self.finished = None
+        self._cancel = threading.Event()
+        self._runner = runner
+        self._persisted = 0.0
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def check(self):
+        # raise JobCancelled when the job was cancelled
+        if self.cancelled:
+            raise JobCancelled()
+
+    def update(self, done=None, total=None, message=None):
+        if done is not None:
+            self.done = done
+        if total is not None:
+            self.total = total
+        if message is not None:
+            self.message = message
+        if time.monotonic() - self._persisted >= PERSIST_EVERY_S:
+            self._runner._persist(self)
+
+    def error(self, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append(str(message))
+
+    def status(self):
+        # plain dict for the UI and the JSON file
+        return {
+            "id": self.id, "kind": self.kind, "label": self.label, "state": self.state,
+            "done": self.done, "total": self.total, "message": self.message,
+            "errors": list(self.errors), "error_count": self.error_count, "result": self.result,
+            "created": self.created, "started": self.started, "finished": self.finished,
+            "pid": os.getpid(),
+        }
+
+
+class JobRunner:
+
+    def __init__(self, workers=2, store_dir=None):
+        self.store_dir = store_dir
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bbq-job")
+        self._jobs = {}
+        self._history = []              # statuses of jobs from earlier processes
+        self._held = {}                 # key -> job id
+        self._cond = threading.Condition()
+        if store_dir:
+            os.makedirs(store_dir, exist_ok=True)
+            self._history = self._load_history()
+
+    # --- submit / control ---
+    def submit(self, kind, fn, label="", keys=(), total=None):
+        # run fn(job) in the background; returns the job id
+        job = Job(self, kind, label, keys, total)
+        with self._cond:
+            self._jobs[job.id] = job
+        self._persist(job)
+        self._pool.submit(self._run, job, fn)
+        return job.id
+
+    def cancel(self, job_id):
+        job = self._jobs.get(job_id)
+        if job is not None and job.state in ACTIVE:
+            job._cancel.set()
+            job.message = "cancelling…"
+            with self._cond:
+                self._cond.notify_all()
+
+    def get(self, job_id):
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job.status()
+        return next((s for s in self._history if s["id"] == job_id), None)
+
+    def jobs(self, limit=10):
+        # newest first, this process's jobs and the persisted history
+        with self._cond:
+            current = [j.status() for j in self._jobs.values()]
+        return sorted(current + self._history, key=lambda s: s["created"], reverse=True)[:limit]
+
+    def active(self):
+        return any(j.state in ACTIVE for j in list(self._jobs.values()))
+
+    # --- running ---
+    def _acquire(self, job):
+        # take all of the job's keys at once, waiting while another job
+        # holds any of them; False when cancelled while waiting
+        with self._cond:
+            while not job.cancelled:
+                busy = [self._held[k] for k in job.keys if k in self._held]
+                if not busy:
+                    for k in job.keys:
+                        self._held[k] = job.id
+                    return True
+                if job.state != "waiting":
+                    job.state = "waiting"
+                    job.message = f"waiting for job {busy[0]} (same competition years)"
+                    self._persist(job)
+                self._cond.wait(timeout=0.5)
+            return False
+
+    def _release(self, job):
+        with self._cond:
+            for k in job.keys:
+                if self._held.get(k) == job.id:
+                    del self._held[k]
+            self._cond.notify_all()
+
+    def _run(self, job, fn):
+        if not self._acquire(job):
+            self._finish(job, "cancelled", "cancelled before it started")
+            return
+        try:
+            job.state, job.started, job.message = "running", time.time(), ""
+            self._persist(job)
+            job.result = fn(job)
+            if job.cancelled:
+                self._finish(job, "cancelled", job.message or "cancelled")
+            else:
+                self._finish(job, "done", job.message)
+        except JobCancelled:
+            self._finish(job, "cancelled", job.message or "cancelled")
+        except Exception as e:
+            job.error("".join(traceback.format_exception_only(type(e), e)).strip())
+            self._finish(job, "failed", f"failed: {e}")
+        finally:
+            self._release(job)
+
+    def _finish(self, job, state, message):
+        job.state, job.message, job.finished = state, message, time.time()
+        self._persist(job)
+
+    # --- persistence ---
+    def _persist(self, job):
+        if not self.store_dir:
+            return
+        job._persisted = time.monotonic()
+        path = os.path.join(self.store_dir, f"{job.id}.json")
+        try:
+            with tempfile.NamedTemporaryFile("w", dir=self.store_dir, delete=False, suffix=".tmp") as f:
+                json.dump(job.status(), f, default=str)
+            os.replace(f.name, path)
+        except OSError:
+            pass
+
+    def _load_history(self):
+        statuses = []
+        for name in os.listdir(self.store_dir):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.store_dir, name)) as f:
+                    statuses.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        statuses.sort(key=lambda s: s.get("created", 0), reverse=True)
+        for s in statuses[KEEP:]:
+            try:
+                os.remove(os.path.join(self.store_dir, f"{s['id']}.json"))
+            except OSError:
+                pass
+        statuses = statuses[:KEEP]
+        for s in statuses:
+            if s.get("state") in ACTIVE:
+                # its process is gone
+                s["state"], s["message"] = "interrupted", "interrupted (the app restarted)"
+        return statuses
+
+
+# one runner per pool, so quick jobs (validating an upload) never queue
+# behind long ones (imports); only import jobs are persisted
+POOLS = {
+    "imports": {"workers": lambda: int(os.environ.get(WORKERS_ENV, 2)), "persist": True},
+    "validation": {"workers": lambda: 2, "persist": False},
+}
+_runners = {}
+_runner_lock = threading.Lock()
+
+
+def get_runner(pool="imports"):
+    with _runner_lock:
+        if pool not in _runners:
+            conf = POOLS[pool]
+            store_dir = None
+            if conf["persist"]:
+                store_dir = os.environ.get(JOBS_DIR_ENV) or os.path.join(tempfile.gettempdir(), "bbq_jobs")
+            _runners[pool] = JobRunner(workers=conf["workers"](), store_dir=store_dir)
+        return _runners[pool]
@@ -0,0 +1,56 @@
+# leaderboard.py
+import streamlit as st
+import analytics
+from bbq_results_app import load_all
+from profiling import phase
+import rollups
+
+
+@st.cache_data(max_entries=4)
+def get_cells(version, _metrics):
+    # participant x group x year cells per data version (`_metrics` is not
+    # hashed by streamlit; `version` is the cache key, as in compute_metrics)
+    return {"core": rollups.cells(_metrics["core"], "meat"),
+            "anc": rollups.cells(_metrics["anc"], "category_name")}
+
+
+def render():
+    st.title("🏆 Participant Leaderboard")
+    st.caption("Who cooks each meat and category best, across all years")
+
+    with phase("load"):
+        tables = load_all()
+    with phase("merge"):
+        metrics = analytics.get_metrics(tables)
+        cells = get_cells(tables["version"], metrics)
+
+    kind = st.radio("Results", ["Core Meats", "Ancillary"], horizontal=True)
+    table = cells["core"] if kind == "Core Meats" else cells["anc"]
+    if table.empty:
+        st.info("No results available.")
+        return
+
+    label = "Meat" if kind == "Core Meats" else "Category"
+    groups_all = sorted(table.index.get_level_values("group").unique())
+    years_all = table.index.get_level_values("year")
+    y_min, y_max = int(years_all.min()), int(years_all.max())
+
+    c1, c2 = st.columns([3, 2])
+    with c1:
+        groups = st.multiselect(label, groups_all, default=groups_all, key=f"lb_groups_{kind}")
+    with c2:
+        years = st.slider("Years", y_min, y_max, (y_min, y_max)) if y_min < y_max else (y_min, y_max)
+    c3, c4 = st.columns(2)
+    with c3:
+        min_entries = st.number_input("Minimum entries", min_value=1, value=3, step=1)
+    with c4:
+        by_group = st.checkbox(f"Split by {label.lower()}", value=True)
+
+    with phase("filter"):
+        board = rollups.leaderboard(table, groups=groups, years=years, min_entries=int(min_entries), by_group=by_group)
+    if board.empty:
+        st.info("No participants match the current filters.")
+        return
+    board = board.rename(columns={"participant": "Participant", "group": label})
+    with phase("widgets"):
+        st.dataframe(board, use_container_width=True, hide_index=True)
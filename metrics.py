@@ -0,0 +1,198 @@
+# metrics.py
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque, namedtuple
+
+# one Supabase REST call as seen by supabase_client. bytes_in / bytes_out
+# are the bodies as the app sees them, wire_in / wire_out as they crossed
+# the network (compressed); None when not known
+RequestRecord = namedtuple(
+    "RequestRecord",
+    ["ts", "table", "method", "status", "bytes_in", "bytes_out", "latency_s", "retries",
+     "wire_in", "wire_out"],
+    defaults=(None, None),
+)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8)
+
+DEBUG_ENV = "BBQ_DEBUG_METRICS"
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        out, running = [], 0
+        for bound, n in zip(self.buckets + (float("inf"),), self.counts):
+            running += n
+            out.append((bound, running))
+        return out
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    inner = ",".join(f'{k}="{str(v)}"' for k, v in labels)
+    return "{" + inner + "}"
+
+
+class MetricsRegistry:
+    # in-process counters / histograms plus a ring buffer of recent requests;
+    # requests made by the current thread since start_rerun() are kept apart
+    # so the debug panel can show the slowest calls of this rerun only
+
+    HELP = {
+        "supabase_requests_total": ("counter", "Supabase REST calls by table, method and status"),
+        "supabase_retries_total": ("counter", "Retries performed by the HTTP adapter"),
+        "supabase_bytes_received_total": ("counter", "Response body bytes"),
+        "supabase_bytes_sent_total": ("counter", "Request body bytes"),
+        "supabase_wire_bytes_received_total": ("counter", "Response body bytes on the wire (compressed)"),
+        "supabase_wire_bytes_sent_total": ("counter", "Request body bytes on the wire (compressed)"),
+        "supabase_request_duration_seconds": ("histogram", "Supabase REST call latency"),
+        "supabase_response_bytes": ("histogram", "Supabase REST response size"),
+    }
+
+    def __init__(self, history=2000):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.counters = {}
+        self.histograms = {}
+        self.recent = deque(maxlen=history)
+
+    def _inc(self, name, labels, value=1):
+        key = (name, labels)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def _observe(self, name, labels, value, buckets):
+        key = (name, labels)
+        hist = self.histograms.get(key)
+        if hist is None:
+            hist = self.histograms[key] = Histogram(buckets)
+        hist.observe(value)
+
+    def record_request(self, rec):
+        base = (("table", rec.table), ("method", rec.method))
+        with self._lock:
+            self._inc("supabase_requests_total", base + (("status", rec.status),))
+            if rec.retries:
+                self._inc("supabase_retries_total", base, rec.retries)
+            self._inc("supabase_bytes_received_total", base, rec.bytes_in)
+            self._inc("supabase_bytes_sent_total", base, rec.bytes_out)
+            self._inc("supabase_wire_bytes_received_total", base,
+                      rec.bytes_in if rec.wire_in is None else rec.wire_in)
+            self._inc("supabase_wire_bytes_sent_total", base,
+                      rec.bytes_out if rec.wire_out is None else rec.wire_out)
+            self._observe("supabase_request_duration_seconds", base, rec.latency_s, LATENCY_BUCKETS)
+            self._observe("supabase_response_bytes", base, rec.bytes_in, BYTES_BUCKETS)
+            self.recent.append(rec)
+        current = getattr(self._local, "rerun", None)
+        if current is not None:
+            current.append(rec)
+
+    # --- per rerun ---
+    def start_rerun(self):
+        self._local.rerun = []
+        self._local.started = time.time()
+
+    def rerun_records(self):
+        return list(getattr(self._local, "rerun", None) or [])
+
+    # --- export ---
+    def to_prometheus(self):
+        with self._lock:
+            counters = dict(self.counters)
+            hists = {k: (h.cumulative(), h.sum, h.count) for k, h in self.histograms.items()}
+        lines = []
+        names = sorted({n for n, _ in counters} | {n for n, _ in hists})
+        for name in names:
+            kind, help_text = self.HELP.get(name, ("untyped", name))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for (n, labels), value in sorted(counters.items()):
+                if n == name:
+                    lines.append(f"{name}{_labels(labels)} {value}")
+            for (n, labels), (cum, total, count) in sorted(hists.items()):
+                if n != name:
+                    continue
+                for bound, running in cum:
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {running}")
+                lines.append(f"{name}_sum{_labels(labels)} {total}")
+                lines.append(f"{name}_count{_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def to_jsonl(self, records=None):
+        if records is None:
+            with self._lock:
+                records = list(self.recent)
+        return "".join(json.dumps(r._asdict()) + "\n" for r in records)
+
+    def byte_totals(self):
+        # body bytes over all tables: as the app saw them and on the wire
+        names = {"received": "supabase_bytes_received_total", "received_wire": "supabase_wire_bytes_received_total",
+                 "sent": "supabase_bytes_sent_total", "sent_wire": "supabase_wire_bytes_sent_total"}
+        with self._lock:
+            return {key: sum(v for (n, _), v in self.counters.items() if n == name) for key, name in names.items()}
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.recent.clear()
+
+
+REGISTRY = MetricsRegistry()
+
+
+def debug_enabled():
+    return os.environ.get(DEBUG_ENV, "").lower() in ("1", "true", "yes")
+
+
+def render_debug_panel(limit=10):
+    # sidebar panel with the slowest Supabase calls of the current rerun;
+    # call at the end of the script so the page's requests are included
+    if not debug_enabled():
+        return
+    import streamlit as st
+    import pandas as pd
+
+    records = REGISTRY.rerun_records()
+    with st.sidebar.expander(f"🐢 Supabase calls this rerun ({len(records)})"):
+        if not records:
+            st.caption("No requests in this rerun.")
+        else:
+            df = pd.DataFrame([r._asdict() for r in records])
+            wire_in = df["wire_in"].fillna(df["bytes_in"]).sum()
+            st.caption(
+                f"{df['latency_s'].sum() * 1000:.0f} ms total, "
+                f"{df['bytes_in'].sum() / 1024:.0f} KiB received ({wire_in / 1024:.0f} KiB on the wire), "
+                f"{int(df['retries'].sum())} retries"
+            )
+            df["latency_ms"] = (df["latency_s"] * 1000).round(1)
+            st.dataframe(
+                df.sort_values("latency_s", ascending=False)
+                .head(limit)[["table", "method", "status", "latency_ms", "bytes_in", "wire_in", "retries"]],
+                hide_index=True,
+                use_container_width=True,
+            )
+        from table_cache import CACHE
+        cs = CACHE.stats()
+        st.caption(
+            f"Table cache: {cs['hits']} hits, {cs['misses']} misses, {cs['coalesced']} coalesced, "
+            f"{cs['evictions']} evicted, {cs['entries']} tables / {cs['bytes'] / 2**20:.1f} MiB"
+        )
+        st.download_button("Prometheus metrics", REGISTRY.to_prometheus(), "supabase_metrics.prom")
+        st.download_button("Request log (JSON lines)", REGISTRY.to_jsonl(), "supabase_requests.jsonl")
@@ -1,199 +1,133 @@
 # migrate_excel_to_supabase.py
-import pandas as pd
-from pathlib import Path
-from datetime import datetime
-from supabase_client import supabase_get, supabase_insert
+# Command-line import of legacy Excel / CSV exports, for archive migrations
+# covering many seasons.
+#
+#   python migrate_excel_to_supabase.py bbq_results.xlsx --workers 8
+#   python migrate_excel_to_supabase.py bbq_results.xlsx --gzip-kb 64   # slow links
+#
+# Rows are validated like the Migration Tool page does, shared dimensions
+# (events, competition years, ancillary categories) are resolved once up
+# front, then the rows are split into partitions of whole competition years
+# and written in parallel: every worker has its own pooled session and
+# bulk-inserts its partition. A competition year never spans two
+# partitions, so workers never upsert the same team total.
+import argparse
+import os
+import sys
 import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from pathlib import Path
 
-CORE_MEATS = {"Chicken", "Ribs", "Pork", "Brisket"}
+import supabase_client
+from metrics import REGISTRY
+from migration_tool import (parse_upload, prefetch_dimensions, build_payloads, write_payloads,
+                            partition_rows, PARTITION_ROWS)
 
 EXCEL_FILE = "bbq_results.xlsx"   # change to your filename
+MAX_ERRORS_SHOWN = 20
 
-def parse_date_range(text):
-    # Accepts "YYYY-MM-DD to YYYY-MM-DD" or single date "YYYY-MM-DD"
-    if pd.isna(text):
-        return None, None
-    text = str(text).strip()
-    if "to" in text:
-        parts = [p.strip() for p in text.split("to")]
-        try:
-            s = pd.to_datetime(parts[0]).date()
-            e = pd.to_datetime(parts[1]).date()
-            return s, e
-        except Exception:
-            return None, None
-    else:
-        try:
-            d = pd.to_datetime(text).date()
-            return d, d
-        except Exception:
-            return None, None
-
-def ensure_competition(row, cache):
-    # key by (name, start_date, end_date, location)
-    name = str(row.get("Competition") or row.get("Competition Name") or row.get("Location") or "").strip()
-    comp_dates = row.get("Competition Dates") or row.get("Competition Date") or row.get("Dates") or None
-    start_date, end_date = parse_date_range(comp_dates)
-    location = str(row.get("Location") or "").strip()
-    total_teams = int(row.get("Total Teams") or 0)
-    key = (name, start_date, end_date, location, total_teams)
-    if key in cache:
-        return cache[key]
-
-    comp_payload = {
-        "name": name,
-        "location": location,
-        "start_date": start_date.isoformat() if start_date else None,
-        "end_date": end_date.isoformat() if end_date else None,
-        "total_teams": total_teams
-    }
-    resp = supabase_insert("competitions", comp_payload)
-    if resp.status_code not in (200,201):
-        raise RuntimeError(f"Error creating competition: {resp.status_code} {resp.text}")
-    comp_row = resp.json()[0]
-    comp_id = comp_row["id"]
-    cache[key] = comp_id
-    return comp_id
-
-def ensure_ancillary_category(comp_id, cat_name, cache):
-    key = (comp_id, cat_name)
-    if key in cache:
-        return cache[key]
-    payload = {"competition_id": comp_id, "category_name": cat_name}
-    resp = supabase_insert("ancillary_categories", payload)
-    if resp.status_code not in (200,201):
-        # Could be unique violation if category already exists, attempt to fetch
-        get_resp = supabase_get("ancillary_categories")
-        if get_resp.status_code == 200:
-            for r in get_resp.json():
-                if r["competition_id"] == comp_id and r["category_name"].lower() == cat_name.lower():
-                    cache[key] = r["id"]
-                    return r["id"]
-        raise RuntimeError(f"Error creating ancillary category: {resp.status_code} {resp.text}")
-    cat_row = resp.json()[0]
-    cache[key] = cat_row["id"]
-    return cat_row["id"]
-
-def import_excel(file_path):
-    p = Path(file_path)
-    if not p.exists():
-        raise FileNotFoundError(file_path)
-    xls = pd.ExcelFile(p)
-    # combine all valid sheets into single dataframe
-    frames = []
-    for sheet in xls.sheet_names:
-        df = pd.read_excel(xls, sheet_name=sheet)
-        frames.append(df)
-    df_all = pd.concat(frames, ignore_index=True, sort=False)
-
-    # normalize column names (simple)
-    df_all.columns = [c.strip() for c in df_all.columns]
 
-    # caches
-    comp_cache = {}
-    ancillary_cache = {}
+# --- workers ---
+# the resolved dimension caches, set once per worker (thread or process)
+_caches = None
 
-    # iterate rows
-    for idx, row in df_all.iterrows():
-        # Skip rows with no useful data
-        if pd.isna(row.get("Year")) and pd.isna(row.get("Competition")):
-            continue
 
-        try:
-            competition_id = ensure_competition(row, comp_cache)
-        except Exception as e:
-            print("Competition create error:", e)
-            continue
+def _init_worker(caches):
+    global _caches
+    _caches = caches
+    supabase_client.bind_session()
 
-        year = int(row.get("Year")) if not pd.isna(row.get("Year")) else None
 
-        meat_field = row.get("Meat") or row.get("Category") or row.get("Submission") or None
-        participant = row.get("Participant") or row.get("Member") or row.get("Cook") or None
-        score = row.get("Score") if not pd.isna(row.get("Score")) else None
-        rank = int(row.get("Rank")) if (not pd.isna(row.get("Rank"))) else None
+def _import_partition(rows):
+    # (rows, rows imported, errors) for one partition
+    errors = []
+    *payloads, resolved = build_payloads(rows, *_caches, on_error=errors.append)
+    failed = write_payloads(*payloads, on_error=errors.append)
+    return len(rows), resolved - failed, errors
 
-        # Team totals handling
-        team_total = row.get("Team Total") or row.get("Team Score") or row.get("Team_Score") or None
-        team_rank = row.get("Team Rank") or row.get("Team_Rank") or None
 
-        # Ancillary team totals handling (sides)
-        ancillary_team_total = row.get("Sides Team Score") or row.get("Side Total") or None
-        ancillary_team_rank = row.get("Sides Team Rank") or row.get("Side Rank") or None
-
-        # Insert core meat result
-        if meat_field and str(meat_field).strip() in CORE_MEATS:
-            meat_payload = {
-                "competition_id": competition_id,
-                "year": year,
-                "meat": str(meat_field).strip(),
-                "participant": participant,
-                "score": float(score) if score is not None else None,
-                "rank": int(rank) if rank is not None else None
-            }
-            resp = supabase_insert("meat_results", meat_payload)
-            if resp.status_code not in (200,201):
-                print("meat insert error:", resp.status_code, resp.text)
-
-        else:
-            # Treat as ancillary submission (if meat_field present)
-            if meat_field and str(meat_field).strip():
-                cat_name = str(meat_field).strip()
-                try:
-                    cat_id = ensure_ancillary_category(competition_id, cat_name, ancillary_cache)
-                except Exception as e:
-                    print("ancillary category error:", e)
-                    continue
-                ancillary_payload = {
-                    "competition_id": competition_id,
-                    "category_id": cat_id,
-                    "participant": participant,
-                    "score": float(score) if score is not None else None,
-                    "rank": int(rank) if rank is not None else None
-                }
-                resp = supabase_insert("ancillary_results", ancillary_payload)
-                if resp.status_code not in (200,201):
-                    print("ancillary insert error:", resp.status_code, resp.text)
-
-        # Insert team_results row if team_total or team_rank present (one per competition expected)
-        if (team_total is not None) or (team_rank is not None):
-            # Try insert; if exists, skip or update
-            # We'll attempt insert; unique constraint on competition_id will error if exists
-            team_payload = {
-                "competition_id": competition_id,
-                "total_score": float(team_total) if team_total is not None else None,
-                "rank": int(team_rank) if team_rank is not None else None
-            }
-            resp = supabase_insert("team_results", team_payload)
-            if resp.status_code not in (200,201):
-                # ignore duplicates/errors
-                pass
-
-        # Insert ancillary_team_results if present
-        if (ancillary_team_total is not None) or (ancillary_team_rank is not None):
-            at_payload = {
-                "competition_id": competition_id,
-                "total_score": float(ancillary_team_total) if ancillary_team_total is not None else None,
-                "rank": int(ancillary_team_rank) if ancillary_team_rank is not None else None
-            }
-            resp = supabase_insert("ancillary_team_results", at_payload)
-            if resp.status_code not in (200,201):
-                # ignore duplicates/errors
-                pass
-
-        time.sleep(0.05)  # gentle throttle
+def import_excel(file_path, workers=4, mode="thread", partition_size=PARTITION_ROWS, progress=True):
+    # imports `file_path`; returns the summary dict that is also printed
+    t0 = time.perf_counter()
+    bytes0 = REGISTRY.byte_totals()
+    if not Path(file_path).exists():
+        raise FileNotFoundError(file_path)
+    _, rows, invalid = parse_upload(file_path)
+    for e in invalid[:MAX_ERRORS_SHOWN]:
+        print(f"row {e['row']} skipped: {', '.join(e['errors'])}")
+
+    caches = ({}, {}, {})
+    prefetch_dimensions(rows, *caches)
+    parts = partition_rows(rows, partition_size)
+    resolve_s = time.perf_counter() - t0
+
+    pool_cls = ProcessPoolExecutor if mode == "process" else ThreadPoolExecutor
+    workers = max(1, min(workers, len(parts) or 1))
+    done = imported = 0
+    errors = []
+    last_report = time.perf_counter()
+    with pool_cls(max_workers=workers, initializer=_init_worker, initargs=(caches,)) as pool:
+        futures = [pool.submit(_import_partition, part) for part in parts]
+        for i, fut in enumerate(as_completed(futures), 1):
+            try:
+                n, ok, errs = fut.result()
+            except Exception as e:
+                n, ok, errs = 0, 0, [f"partition failed: {e}"]
+            done += n
+            imported += ok
+            errors.extend(errs)
+            now = time.perf_counter()
+            if progress and (now - last_report >= 1 or i == len(futures)):
+                last_report = now
+                rate = done / (now - t0)
+                print(f"  {i}/{len(futures)} partitions, {done}/{len(rows)} rows, {rate:,.0f} rows/s",
+                      file=sys.stderr, flush=True)
+
+    for e in errors[:MAX_ERRORS_SHOWN]:
+        print(e)
+    elapsed = time.perf_counter() - t0
+    summary = {
+        "rows": len(rows) + len(invalid),
+        "valid": len(rows),
+        "invalid": len(invalid),
+        "imported": imported,
+        "errors": len(errors),
+        "partitions": len(parts),
+        "workers": workers,
+        "mode": mode,
+        "resolve_s": round(resolve_s, 2),
+        "write_s": round(elapsed - resolve_s, 2),
+        "seconds": round(elapsed, 2),
+        "rows_per_s": round(imported / elapsed, 1) if elapsed else None,
+    }
+    if mode == "thread":
+        # request / response bodies as built and as sent (worker processes
+        # keep their own counters)
+        moved = {k: v - bytes0[k] for k, v in REGISTRY.byte_totals().items()}
+        summary.update({f"{k}_mb": round(v / 1e6, 2) for k, v in moved.items()})
+        print(f"Sent {moved['sent'] / 1e6:.1f} MB ({moved['sent_wire'] / 1e6:.1f} MB on the wire), "
+              f"received {moved['received'] / 1e6:.1f} MB ({moved['received_wire'] / 1e6:.1f} MB on the wire)")
+    print(f"Import completed: {imported}/{summary['rows']} rows in {elapsed:.1f}s "
+          f"({summary['rows_per_s']:,.0f} rows/s, {workers} {mode} workers, "
+          f"{len(parts)} partitions, {len(invalid)} invalid, {len(errors)} errors)")
+    return summary
 
-    print("Import completed.")
 
 if __name__ == "__main__":
-    import sys
-    fname = sys.argv[1] if len(sys.argv) > 1 else EXCEL_FILE
-    import_excel = import_excel if False else None
-    # call import function
-    try:
-        import_excel = import_excel  # placeholder to satisfy static analyzers
-    except:
-        pass
-
-    # Run actual import
-    from migrate_excel_to_supabase import import_excel as runner
-    runner(fname)
+    ap = argparse.ArgumentParser(description="Import a legacy Excel / CSV export into Supabase.")
+    ap.add_argument("file", nargs="?", default=EXCEL_FILE)
+    ap.add_argument("--workers", type=int, default=min(8, os.cpu_count() or 1),
+                    help="parallel writers (default: min(8, CPUs))")
+    ap.add_argument("--mode", choices=("thread", "process"), default="thread",
+                    help="worker threads (default) or processes")
+    ap.add_argument("--partition-rows", type=int, default=PARTITION_ROWS,
+                    help="target rows per partition; partitions hold whole competition years")
+    ap.add_argument("--gzip-kb", type=float, default=None,
+                    help="gzip request bodies of at least this many KiB (the server side has to "
+                         "accept Content-Encoding: gzip; falls back to plain bodies otherwise)")
+    args = ap.parse_args()
+    if args.gzip_kb is not None:
+        # an environment variable, so worker processes see it too
+        os.environ[supabase_client.GZIP_REQUESTS_ENV] = str(args.gzip_kb)
+    summary = import_excel(args.file, workers=args.workers, mode=args.mode, partition_size=args.partition_rows)
+    sys.exit(1 if summary["errors"] else 0)
@@ -1,39 +1,259 @@
 # migration_tool.py
+import itertools
+import os
+import shutil
+import tempfile
+import threading
+import time
 import streamlit as st
 import pandas as pd
 from io import BytesIO
-from datetime import datetime
-from supabase_client import supabase_get, supabase_insert, supabase_upsert
-from utils import sidebar_logo, app_navigation
+from datetime import date, datetime
+import supabase_client
+from supabase_client import Query, supabase_insert, supabase_upsert, dumps
+from import_records import ImportRow, MeatResult, AncillaryResult, TeamTotal, intern
+from utils import sidebar_logo, app_navigation, MEATS
+from profiling import phase
+import jobs
 
-def render():
-    st.title("📥 Migration Tool — Upload, Validate, Import")
+# keys per "in.(...)" lookup; keeps the query string well under URL limits
+PREFETCH_CHUNK = 200
+# result rows per bulk insert request
+INSERT_CHUNK = 1000
+# target rows per import partition (whole competition years)
+PARTITION_ROWS = 2000
+# rows shown in the upload preview
+PREVIEW_ROWS = 200
+UPLOAD_COPY_BYTES = 1 << 20
+# rows per block when reading and validating an upload; the first block
+# is small so the page shows results within a second or two
+BLOCK_ROWS = 50_000
+FIRST_BLOCK_ROWS = 2_000
+FIRST_FEEDBACK_S = 2.0
+# validation stops at this many errors by default (a badly mapped file
+# fails in the first block); at most ERRORS_SHOWN are listed
+MAX_ERRORS = 1000
+ERRORS_SHOWN = 1000
+VALIDATION_POLL_S = 0.5
+# seconds between status refreshes while an import job runs
+JOB_POLL_S = 1.0
 
-    uploaded = st.file_uploader("Upload Excel or CSV (legacy export)", type=["xlsx", "xls", "csv"])
-    if not uploaded:
-        st.info("Upload a file to begin.")
-        st.stop()
+# concurrent imports resolve events / years / categories one at a time, so
+# two of them never both create the same missing event
+_dimension_lock = threading.Lock()
 
-    # Read file
-    try:
-        if uploaded.name.lower().endswith(".csv"):
-            df = pd.read_csv(uploaded)
+
+def _chunks(values, size=PREFETCH_CHUNK):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def _fetch_in(table, select, column, values, also=None):
+    # one GET per chunk of keys: ?select=...&column=in.(...)[&also[0]=in.(also[1])]
+    found = []
+    for chunk in _chunks(values):
+        q = Query(table).select(*select).in_(column, chunk).order("id")
+        if also:
+            q.in_(*also)
+        found.extend(q.all_rows())
+    return found
+
+
+def _bulk_insert(table, payloads):
+    if not payloads:
+        return []
+    r = supabase_insert(table, payloads)
+    r.raise_for_status()
+    return r.json()
+
+
+def prefetch_dimensions(rows, event_cache, year_cache, ancillary_cache):
+    # Resolve all distinct (event, location), (event_id, year) and
+    # (year_id, category) keys of the validated rows: one in.(...) lookup per
+    # table, one bulk insert for whatever is missing, results go into the
+    # same caches the per-row get_or_create_* helpers use.
+
+    # --- events ---
+    wanted_events = {}
+    for r in rows:
+        key = r.event_key
+        if key not in event_cache and key not in wanted_events:
+            wanted_events[key] = {"event_name": r.event, "location": r.location}
+    if wanted_events:
+        names = {p["event_name"] for p in wanted_events.values()}
+        for e in _fetch_in("competition_events", ("id", "event_name", "location"), "event_name", names):
+            key = (str(e["event_name"]).lower(), str(e["location"]).lower())
+            if key in wanted_events and key not in event_cache:
+                event_cache[key] = e["id"]
+        missing = [p for key, p in wanted_events.items() if key not in event_cache]
+        for e in _bulk_insert("competition_events", missing):
+            event_cache[(e["event_name"].lower(), e["location"].lower())] = e["id"]
+
+    # --- competition years ---
+    wanted_years = {}
+    for r in rows:
+        event_id = event_cache[r.event_key]
+        key = (event_id, r.year)
+        if key not in year_cache and key not in wanted_years:
+            wanted_years[key] = {
+                "event_id": event_id,
+                "year": r.year,
+                # bulk inserts need the same keys on every object
+                "start_date": r.start_date.isoformat() if r.start_date else None,
+                "end_date": r.end_date.isoformat() if r.end_date else None,
+                "total_teams": r.total_teams,
+            }
+    if wanted_years:
+        event_ids = {k[0] for k in wanted_years}
+        year_vals = sorted({k[1] for k in wanted_years})
+        for y in _fetch_in("competition_years", ("id", "event_id", "year"), "event_id", event_ids,
+                           also=("year", year_vals)):
+            key = (y["event_id"], int(y["year"]))
+            if key in wanted_years and key not in year_cache:
+                year_cache[key] = y["id"]
+        missing = [p for key, p in wanted_years.items() if key not in year_cache]
+        for y in _bulk_insert("competition_years", missing):
+            year_cache[(y["event_id"], int(y["year"]))] = y["id"]
+
+    # --- ancillary categories (only rows that take the ancillary branch) ---
+    wanted_cats = {}
+    for r in rows:
+        if (r.meat and r.meat in MEATS) or not r.ancillary_category:
+            continue
+        event_id = event_cache[r.event_key]
+        cy_id = year_cache[(event_id, r.year)]
+        key = (cy_id, r.ancillary_category.lower())
+        if key not in ancillary_cache and key not in wanted_cats:
+            wanted_cats[key] = {"competition_year_id": cy_id, "category_name": r.ancillary_category}
+    if wanted_cats:
+        cy_ids = {k[0] for k in wanted_cats}
+        cat_names = sorted({p["category_name"] for p in wanted_cats.values()})
+        for c in _fetch_in("ancillary_categories", ("id", "competition_year_id", "category_name"),
+                           "competition_year_id", cy_ids, also=("category_name", cat_names)):
+            key = (c["competition_year_id"], str(c["category_name"]).lower())
+            if key in wanted_cats and key not in ancillary_cache:
+                ancillary_cache[key] = c["id"]
+        missing = [p for key, p in wanted_cats.items() if key not in ancillary_cache]
+        for c in _bulk_insert("ancillary_categories", missing):
+            ancillary_cache[(c["competition_year_id"], c["category_name"].lower())] = c["id"]
+
+
+def spool_upload(uploaded):
+    # copies an upload to a temp file, UPLOAD_COPY_BYTES at a time, so it is
+    # parsed from disk instead of from another in-memory buffer; returns
+    # the path (the caller removes it)
+    suffix = os.path.splitext(uploaded.name)[1].lower()
+    uploaded.seek(0)
+    with tempfile.NamedTemporaryFile(prefix="bbq_upload_", suffix=suffix, delete=False) as f:
+        shutil.copyfileobj(uploaded, f, UPLOAD_COPY_BYTES)
+    return f.name
+
+
+def _is_csv(path):
+    return str(path).lower().endswith(".csv")
+
+
+def _header(values):
+    # column names the way pandas makes them: stripped, "Unnamed: i" for
+    # blank headers, ".1", ".2", ... appended to repeats
+    names, seen = [], {}
+    for i, value in enumerate(values):
+        name = ("" if value is None else str(value)).strip() or f"Unnamed: {i}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
         else:
-            xls = pd.ExcelFile(uploaded)
-            # concat all sheets
-            frames = [pd.read_excel(xls, sheet_name=sh) for sh in xls.sheet_names]
-            df = pd.concat(frames, ignore_index=True, sort=False)
-    except Exception as e:
-        st.error(f"Failed to read file: {e}")
-        st.stop()
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _sheet_blocks(ws, sizes):
+    rows = ws.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        return
+    columns = _header(header)
+    width = len(columns)
+    empty = (None,) * width
+    block, size, blanks = [], next(sizes), 0
+    for row in rows:
+        # blank rows are kept (as all-empty rows, so later rows keep their
+        # spreadsheet row numbers) unless nothing follows them, like
+        # read_excel
+        if all(v is None for v in row):
+            blanks += 1
+            continue
+        pending = [empty] * blanks + [row[:width] if len(row) >= width else row + (None,) * (width - len(row))]
+        blanks = 0
+        for values in pending:
+            block.append(values)
+            if len(block) == size:
+                yield pd.DataFrame(block, columns=columns)
+                block, size = [], next(sizes)
+    if block:
+        yield pd.DataFrame(block, columns=columns)
+
+
+def _blocks(path, sizes):
+    # blocks of next(sizes) rows each
+    if _is_csv(path):
+        with pd.read_csv(path, chunksize=BLOCK_ROWS, memory_map=True) as reader:
+            while True:
+                try:
+                    chunk = reader.get_chunk(next(sizes))
+                except StopIteration:
+                    return
+                chunk.columns = [str(c).strip() for c in chunk.columns]
+                yield chunk
+    elif str(path).lower().endswith(".xls"):
+        # legacy .xls has no streaming reader: one whole sheet at a time
+        with pd.ExcelFile(path) as xls:
+            for sheet in xls.sheet_names:
+                df = pd.read_excel(xls, sheet_name=sheet)
+                df.columns = [str(c).strip() for c in df.columns]
+                yield df
+    else:
+        import openpyxl
 
-    st.write("Preview (first 200 rows):")
-    st.dataframe(df.head(200))
+        wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+        try:
+            for ws in wb.worksheets:
+                yield from _sheet_blocks(ws, sizes)
+        finally:
+            wb.close()
 
-    # normalize column names
-    df.columns = [c.strip() for c in df.columns]
 
-    # REQUIRED FIELDS (best-effort mapping)
+def iter_table(path, block_rows=BLOCK_ROWS, first_rows=None):
+    # the rows of a CSV, or of every sheet of a workbook, as DataFrames of up
+    # to `block_rows` rows (`first_rows` for the first one) indexed by
+    # running row number, column names stripped. Only one block is in memory
+    # at a time: CSVs are read in chunks (memory-mapped), .xlsx sheets
+    # streamed by openpyxl's read-only reader straight from the file.
+    sizes = itertools.chain([first_rows] if first_rows else [], itertools.repeat(block_rows))
+    start = 0
+    for block in _blocks(path, sizes):
+        block.index = pd.RangeIndex(start, start + len(block))
+        start += len(block)
+        yield block
+
+
+def read_table(path):
+    # the whole file as one frame
+    blocks = list(iter_table(path))
+    if not blocks:
+        return pd.DataFrame()
+    return blocks[0] if len(blocks) == 1 else pd.concat(blocks, sort=False)
+
+
+def read_preview(path, nrows=PREVIEW_ROWS):
+    # the first rows of a file (first sheet of a workbook), read on their own
+    # so the preview never holds a slice of the full frame
+    return next(iter_table(path, nrows), pd.DataFrame())
+
+
+def detect_columns(df):
     # flexible column mapping
     col_map = {
         "year": None,
@@ -89,39 +309,66 @@ def render():
             col_map["ancillary_total_score"] = c
         if lc in ("ancillary team rank","sides rank","ancillary_team_rank"):
             col_map["ancillary_team_rank"] = c
+    return col_map
 
-    st.subheader("Detected column mapping")
-    st.json(col_map)
 
-    # validation rules
-    errors = []
-    rows_to_import = []
+def _to_date(text):
+    # ISO dates without the pd.to_datetime format guessing (~50x faster)
+    try:
+        return date.fromisoformat(text)
+    except ValueError:
+        return pd.to_datetime(text).date()
+
 
-    def parse_date_range(text):
-        if pd.isna(text) or not text:
+def parse_date_range(text):
+    if pd.isna(text) or not text:
+        return None, None
+    s = str(text).strip()
+    if "to" in s:
+        parts = [p.strip() for p in s.split("to")]
+        try:
+            return _to_date(parts[0]), _to_date(parts[1])
+        except:
             return None, None
-        s = str(text).strip()
-        if "to" in s:
-            parts = [p.strip() for p in s.split("to")]
-            try:
-                return pd.to_datetime(parts[0]).date(), pd.to_datetime(parts[1]).date()
-            except:
-                return None, None
-        else:
-            try:
-                d = pd.to_datetime(s).date()
-                return d, d
-            except:
-                return None, None
+    else:
+        try:
+            d = _to_date(s)
+            return d, d
+        except:
+            return None, None
+
+
+def _column(df, col):
+    # values of a mapped column as a plain list (None for every row when the
+    # column isn't mapped / present); much cheaper than per-row Series lookups
+    if col is not None and col in df.columns:
+        return df[col].tolist()
+    return [None] * len(df)
+
 
-    for idx, row in df.iterrows():
+def _opt(value, cast):
+    return None if pd.isna(value) else cast(value)
+
+
+def validate_rows(df, col_map):
+    # returns (rows_to_import, errors); rows are import_records.ImportRow,
+    # row numbers in errors are 1-based spreadsheet rows (header = row 1)
+    errors = []
+    rows_to_import = []
+    cols = {k: _column(df, col_map[k]) for k in col_map}
+    has_total_teams = bool(col_map["total_teams"]) and col_map["total_teams"] in df.columns
+    # every submission row of a competition year repeats its date range;
+    # pd.to_datetime on a scalar is ~0.5 ms, so parse each distinct text once
+    date_ranges = {}
+
+    for i, idx in enumerate(df.index):
         row_errors = []
-        year = row.get(col_map["year"]) if col_map["year"] in row.index else None
-        event = row.get(col_map["event"]) if col_map["event"] in row.index else None
-        location = row.get(col_map["location"]) if col_map["location"] in row.index else None
-        comp_dates = row.get(col_map["competition_dates"]) if col_map["competition_dates"] in row.index else None
-        start_d = row.get(col_map["start_date"]) if col_map["start_date"] in row.index else None
-        end_d = row.get(col_map["end_date"]) if col_map["end_date"] in row.index else None
+        year = cols["year"][i]
+        event = cols["event"][i]
+        location = cols["location"][i]
+        comp_dates = cols["competition_dates"][i]
+        start_d = cols["start_date"][i]
+        end_d = cols["end_date"][i]
 
         # event name required
         if pd.isna(event) or str(event).strip() == "" or str(event).strip().lower() == "nan":
@@ -135,7 +382,9 @@ def render():
         # parse dates
         sd, ed = None, None
         if comp_dates and not pd.isna(comp_dates):
-            sd, ed = parse_date_range(comp_dates)
+            if comp_dates not in date_ranges:
+                date_ranges[comp_dates] = parse_date_range(comp_dates)
+            sd, ed = date_ranges[comp_dates]
         else:
             if start_d and not pd.isna(start_d):
                 try:
@@ -149,8 +398,8 @@ def render():
                     row_errors.append("Invalid end date")
         # total teams optional but if present must be integer
         tt = None
-        if col_map["total_teams"] and col_map["total_teams"] in row.index:
-            val = row.get(col_map["total_teams"])
+        if has_total_teams:
+            val = cols["total_teams"][i]
             if not pd.isna(val):
                 try:
                     tt = int(val)
@@ -158,10 +407,10 @@ def render():
                     row_errors.append("Invalid total_teams")
 
         # meat/ancillary detection and score/rank validation
-        meat = row.get(col_map["meat"]) if col_map["meat"] in row.index else None
-        ancillary = row.get(col_map["ancillary_category"]) if col_map["ancillary_category"] in row.index else None
-        score = row.get(col_map["score"]) if col_map["score"] in row.index else None
-        rank = row.get(col_map["rank"]) if col_map["rank"] in row.index else None
+        meat = cols["meat"][i]
+        ancillary = cols["ancillary_category"][i]
+        score = cols["score"][i]
+        rank = cols["rank"][i]
 
         # If meat/ancillary present then score & rank should be numeric
         if (not pd.isna(meat) and str(meat).strip() != "") or (not pd.isna(ancillary) and str(ancillary).strip() != ""):
@@ -173,189 +422,433 @@ def render():
         if row_errors:
             errors.append({"row": int(idx)+2, "errors": row_errors})
         else:
-            rows_to_import.append({
-                "year": int(year) if not pd.isna(year) else None,
-                "event": str(event).strip(),
-                "location": str(location).strip(),
-                "start_date": sd,
-                "end_date": ed,
-                "total_teams": tt,
-                "meat": None if pd.isna(meat) else str(meat).strip(),
-                "ancillary_category": None if pd.isna(ancillary) else str(ancillary).strip(),
-                "participant": None if pd.isna(row.get(col_map["participant"])) else str(row.get(col_map["participant"])).strip(),
-                "score": None if pd.isna(score) else float(score),
-                "rank": None if pd.isna(rank) else int(rank),
-                "team_total_score": None if col_map["team_total_score"] not in row.index or pd.isna(row.get(col_map["team_total_score"])) else float(row.get(col_map["team_total_score"])),
-                "team_rank": None if col_map["team_rank"] not in row.index or pd.isna(row.get(col_map["team_rank"])) else int(row.get(col_map["team_rank"])),
-                "ancillary_team_total": None if col_map["ancillary_total_score"] not in row.index or pd.isna(row.get(col_map["ancillary_total_score"])) else float(row.get(col_map["ancillary_total_score"])),
-                "ancillary_team_rank": None if col_map["ancillary_team_rank"] not in row.index or pd.isna(row.get(col_map["ancillary_team_rank"])) else int(row.get(col_map["ancillary_team_rank"]))
-            })
-
-    st.subheader("Validation Results")
-    if errors:
-        st.error(f"Found {len(errors)} validation errors. Fix the file and try again.")
-        st.json(errors)
+            rows_to_import.append(ImportRow(
+                year=int(year),
+                event=intern(event),
+                location=intern(location),
+                start_date=sd,
+                end_date=ed,
+                total_teams=tt,
+                meat=_opt(meat, intern),
+                ancillary_category=_opt(ancillary, intern),
+                participant=_opt(cols["participant"][i], intern),
+                score=_opt(score, float),
+                rank=_opt(rank, int),
+                team_total_score=_opt(cols["team_total_score"][i], float),
+                team_rank=_opt(cols["team_rank"][i], int),
+                ancillary_team_total=_opt(cols["ancillary_total_score"][i], float),
+                ancillary_team_rank=_opt(cols["ancillary_team_rank"][i], int),
+            ))
+    return rows_to_import, errors
+
+
+def new_report(max_errors=None):
+    # validation state of a file, filled in by validate_upload. Other threads
+    # may read it while validation runs: counts only grow and lists are only
+    # appended to.
+    return {"col_map": None, "rows": [], "errors": [], "checked": 0,
+            "max_errors": max_errors, "status": "running"}
+
+
+def validate_upload(path, report, block_rows=BLOCK_ROWS, first_rows=None, cancelled=None):
+    # parses and validates a file a block at a time into `report`; only the
+    # compact rows are kept. Each block gets its own column mapping (sheets
+    # of a workbook may name columns differently); the first one is shown.
+    # Stops once report["max_errors"] errors are found ("stopped") or
+    # cancelled() is true ("cancelled"); otherwise ends "done".
+    max_errors = report["max_errors"]
+    for block in iter_table(path, block_rows, first_rows):
+        if cancelled and cancelled():
+            report["status"] = "cancelled"
+            return report
+        block_map = detect_columns(block)
+        if report["col_map"] is None:
+            report["col_map"] = block_map
+        rows, errors = validate_rows(block, block_map)
+        report["rows"] += rows
+        report["errors"] += errors
+        report["checked"] += len(block)
+        if max_errors and len(report["errors"]) >= max_errors:
+            report["status"] = "stopped"
+            return report
+    if report["col_map"] is None:
+        report["col_map"] = detect_columns(pd.DataFrame())
+    report["status"] = "done"
+    return report
+
+
+def parse_upload(path, block_rows=BLOCK_ROWS):
+    # (column mapping, rows to import, validation errors) of a whole file
+    report = validate_upload(path, new_report(), block_rows)
+    return report["col_map"], report["rows"], report["errors"]
+
+
+def get_or_create_event(name, location, event_cache):
+    key = (name.lower(), location.lower())
+    if key in event_cache:
+        return event_cache[key]
+    # try find
+    resp = Query("competition_events").eq("event_name", name).eq("location", location).get()
+    if resp.status_code == 200 and resp.json():
+        eid = resp.json()[0]["id"]
+        event_cache[key] = eid
+        return eid
+    # create
+    payload = {"event_name": name, "location": location}
+    r = supabase_insert("competition_events", payload)
+    r.raise_for_status()
+    eid = r.json()[0]["id"]
+    event_cache[key] = eid
+    return eid
+
+
+def get_or_create_competition_year(event_id, year, start_date, end_date, total_teams, year_cache):
+    key = (event_id, int(year))
+    if key in year_cache:
+        return year_cache[key]
+    # try find
+    resp = Query("competition_years").eq("event_id", event_id).eq("year", year).get()
+    if resp.status_code == 200 and resp.json():
+        cyid = resp.json()[0]["id"]
+        year_cache[key] = cyid
+        return cyid
+    payload = {"event_id": event_id, "year": int(year)}
+    if start_date:
+        payload["start_date"] = start_date.isoformat()
+    if end_date:
+        payload["end_date"] = end_date.isoformat()
+    if total_teams is not None:
+        payload["total_teams"] = total_teams
+    r = supabase_insert("competition_years", payload)
+    r.raise_for_status()
+    cyid = r.json()[0]["id"]
+    year_cache[key] = cyid
+    return cyid
+
+
+def get_or_create_ancillary_category(comp_year_id, cat_name, ancillary_cache):
+    key = (comp_year_id, cat_name.lower())
+    if key in ancillary_cache:
+        return ancillary_cache[key]
+    resp = Query("ancillary_categories").eq("competition_year_id", comp_year_id).eq("category_name", cat_name).get()
+    if resp.status_code == 200 and resp.json():
+        cid = resp.json()[0]["id"]
+        ancillary_cache[key] = cid
+        return cid
+    payload = {"competition_year_id": comp_year_id, "category_name": cat_name}
+    r = supabase_insert("ancillary_categories", payload)
+    r.raise_for_status()
+    cid = r.json()[0]["id"]
+    ancillary_cache[key] = cid
+    return cid
+
+
+def _insert_batches(table, payloads, label, on_error):
+    # bulk insert in INSERT_CHUNK slices, each serialized once straight from
+    # the payload records; returns the payloads of the batches that failed
+    failed = []
+    for chunk in _chunks(payloads, INSERT_CHUNK):
+        try:
+            rr = supabase_insert(table, dumps(chunk))
+        except Exception as e:
+            on_error(f"{label} error: {e}")
+            failed.extend(chunk)
+            continue
+        if rr.status_code not in (200, 201):
+            on_error(f"{label} error: {rr.status_code} {rr.text}")
+            failed.extend(chunk)
+    return failed
+
+
+def build_payloads(rows, event_cache, year_cache, ancillary_cache, on_error=print):
+    # result / total records for `rows`, ids taken from the caches (filled by
+    # prefetch_dimensions). Returns (meat results, ancillary results, core
+    # totals, ancillary totals, number of rows resolved).
+    resolved = 0
+    meat_payloads = []
+    anc_payloads = []
+    core_totals = {}
+    anc_totals = {}
+
+    for r in rows:
+        try:
+            event_id = get_or_create_event(r.event, r.location, event_cache)
+            comp_year_id = get_or_create_competition_year(event_id, r.year, r.start_date, r.end_date, r.total_teams, year_cache)
+            # core meat
+            if r.meat and r.meat in MEATS:
+                meat_payloads.append(MeatResult(comp_year_id, r.meat, r.participant, r.score, r.rank))
+            else:
+                # ancillary
+                if r.ancillary_category:
+                    cat_id = get_or_create_ancillary_category(comp_year_id, r.ancillary_category, ancillary_cache)
+                    anc_payloads.append(AncillaryResult(comp_year_id, cat_id, r.participant, r.score, r.rank))
+            # capture totals to insert later (not now)
+            key = comp_year_id
+
+            if r.team_total_score is not None or r.team_rank is not None:
+                core_totals[key] = TeamTotal(key, r.team_total_score, r.team_rank)
+
+            if r.ancillary_team_total is not None or r.ancillary_team_rank is not None:
+                anc_totals[key] = TeamTotal(key, r.ancillary_team_total, r.ancillary_team_rank)
+            resolved += 1
+        except Exception as e:
+            on_error(f"Row import error: {e}")
+            continue
+    return meat_payloads, anc_payloads, list(core_totals.values()), list(anc_totals.values()), resolved
+
+
+def write_payloads(meat_payloads, anc_payloads, core_totals, anc_totals, on_error=print):
+    # bulk writes of build_payloads() output; returns the number of result
+    # rows in batches that failed
+    failed = _insert_batches("meat_results", meat_payloads, "meat insert", on_error)
+    failed += _insert_batches("ancillary_results", anc_payloads, "ancillary insert", on_error)
+
+    # upsert core / ancillary totals
+    for table, totals in (("team_results", core_totals), ("ancillary_team_results", anc_totals)):
+        for chunk in _chunks(totals, INSERT_CHUNK):
+            rr = supabase_upsert(table, dumps(chunk), on_conflict="competition_year_id")
+            if rr.status_code not in (200, 201):
+                on_error(f"{table} upsert error: {rr.status_code} {rr.text}")
+    return len(failed)
+
+
+def partition_rows(rows, partition_rows=PARTITION_ROWS):
+    # lists of rows, each holding whole competition years, about
+    # `partition_rows` long; input order is kept within a year
+    by_year = {}
+    for r in rows:
+        by_year.setdefault((r.event_key, r.year), []).append(r)
+    parts, current = [], []
+    for year_rows in by_year.values():
+        if current and len(current) + len(year_rows) > partition_rows:
+            parts.append(current)
+            current = []
+        current.extend(year_rows)
+    if current:
+        parts.append(current)
+    return parts
+
+
+def import_rows(rows_to_import, on_error=print, progress=None, cancelled=None):
+    # writes validated rows; returns the number of rows imported. Errors are
+    # reported through `on_error` (st.error in the page, print in scripts).
+    # Rows are written a partition (whole competition years) at a time:
+    # progress(rows done, rows total, message) is called after each one and
+    # the import stops between partitions once cancelled() is true.
+    event_cache = {}
+    year_cache = {}
+    ancillary_cache = {}
+    total = len(rows_to_import)
+
+    # resolve every event / year / ancillary key up front so the row loop
+    # below only hits the caches
+    if progress:
+        progress(0, total, "Resolving events / years / categories")
+    with _dimension_lock:
+        prefetch_dimensions(rows_to_import, event_cache, year_cache, ancillary_cache)
+
+    done = imported = 0
+    for part in partition_rows(rows_to_import):
+        if cancelled and cancelled():
+            break
+        *payloads, resolved = build_payloads(part, event_cache, year_cache, ancillary_cache, on_error)
+        # rows of a failed batch don't count as imported
+        imported += resolved - write_payloads(*payloads, on_error=on_error)
+        done += len(part)
+        if progress:
+            progress(done, total, f"Imported {imported} of {total} rows")
+    return imported
+
+
+def import_keys(rows):
+    # the competition years an import writes; imports sharing one run in turn
+    return {("competition_year", *r.event_key, r.year) for r in rows}
+
+
+def submit_import(rows, label):
+    # runs import_rows in the background (jobs.JobRunner); returns the job id
+    def run(job):
+        supabase_client.bind_session()
+        imported = import_rows(rows, on_error=job.error, progress=job.update, cancelled=lambda: job.cancelled)
+        if job.cancelled:
+            job.update(message=f"Cancelled after importing {imported} of {len(rows)} rows")
+        return {"imported": imported}
+    return jobs.get_runner().submit("import", run, label=label, keys=import_keys(rows), total=len(rows))
+
+
+def _job_status(runner, job):
+    state = job["state"]
+    icon = {"queued": "⏳", "waiting": "⏳", "running": "🔄", "done": "✅", "failed": "❌",
+            "cancelled": "🚫", "interrupted": "⚠️"}.get(state, "")
+    c1, c2 = st.columns([6, 1], vertical_alignment="center")
+    c1.markdown(f"{icon} **{job['label'] or job['id']}** — {state}")
+    if state in jobs.ACTIVE:
+        c2.button("Cancel", key=f"cancel_job_{job['id']}", on_click=runner.cancel, args=(job["id"],))
+    total = job["total"] or 0
+    if total and state not in ("queued", "waiting"):
+        st.progress(min(job["done"] / total, 1.0), text=job["message"] or f"{job['done']} / {total} rows")
+    elif job["message"]:
+        st.caption(job["message"])
+    if job["error_count"]:
+        with st.expander(f"{job['error_count']} errors"):
+            st.json(job["errors"])
+
+
+def job_panel():
+    # status of this session's import and the other recent ones; refreshes
+    # itself every JOB_POLL_S while a job is active, so the rest of the page
+    # isn't rerun. Jobs live in the process, not the session: they keep
+    # going across reruns and page switches.
+    runner = jobs.get_runner()
+    mine = st.session_state.get("import_job")
+    if mine is None and not runner.jobs(limit=1):
+        return
+
+    @st.fragment(run_every=JOB_POLL_S if runner.active() else None)
+    def panel():
+        recent = runner.jobs(limit=5)
+        current = runner.get(mine) if mine else None
+        if current is not None:
+            st.subheader("Import")
+            _job_status(runner, current)
+            if current["state"] == "done":
+                st.success(f"Imported {current['result']['imported']} rows.")
+        others = [j for j in recent if current is None or j["id"] != current["id"]]
+        if others:
+            with st.expander("Recent imports", expanded=any(j["state"] in jobs.ACTIVE for j in others)):
+                for job in others:
+                    _job_status(runner, job)
+        # once nothing runs, a full rerun stops the polling
+        if not runner.active() and st.session_state.get("_import_jobs_active"):
+            st.session_state["_import_jobs_active"] = False
+            st.rerun()
+        st.session_state["_import_jobs_active"] = runner.active()
+
+    panel()
+
+
+def _cancel_validation(upload):
+    if upload.get("validation_job"):
+        jobs.get_runner("validation").cancel(upload["validation_job"])
+
+
+def _drop_upload():
+    upload = st.session_state.pop("upload", None)
+    if upload is not None:
+        _cancel_validation(upload)
+        try:
+            os.remove(upload["path"])
+        except OSError:
+            pass
+
+
+def _load_upload(uploaded):
+    # the spooled upload, kept in session state per uploaded file
+    upload = st.session_state.get("upload")
+    if upload is None or upload["file_id"] != uploaded.file_id:
+        _drop_upload()
+        with phase("load"):
+            upload = {"file_id": uploaded.file_id, "path": spool_upload(uploaded), "preview": None}
+        st.session_state["upload"] = upload
+    return upload
+
+
+def _start_validation(upload, max_errors, label):
+    # validates the spooled file in the background; upload["report"] fills
+    # in as it goes. Waits up to FIRST_FEEDBACK_S for the first (small)
+    # block so the page has something to show right away.
+    _cancel_validation(upload)
+    report = upload["report"] = new_report(max_errors)
+
+    def run(job):
+        try:
+            validate_upload(upload["path"], report, first_rows=FIRST_BLOCK_ROWS, cancelled=lambda: job.cancelled)
+        except Exception as e:
+            report["error"] = str(e)
+            report["status"] = "failed"
+            raise
+        return report["status"]
+
+    upload["validation_job"] = jobs.get_runner("validation").submit("validate", run, label=label)
+    deadline = time.monotonic() + FIRST_FEEDBACK_S
+    while report["status"] == "running" and not report["checked"] and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return report
+
+
+def validation_results(report):
+    # column mapping and validation results; refreshes itself every
+    # VALIDATION_POLL_S while validation runs, then reruns the page once
+    # it has finished
+    running = report["status"] == "running"
+
+    @st.fragment(run_every=VALIDATION_POLL_S if running else None)
+    def section():
+        status, errors = report["status"], report["errors"]
+        if running and status != "running":
+            st.rerun()
+
+        st.subheader("Detected column mapping")
+        if report["col_map"] is not None:
+            st.json(report["col_map"])
+        else:
+            st.caption("Reading the file…")
+
+        st.subheader("Validation Results")
+        if status == "running":
+            st.info(f"Validating… {report['checked']:,} rows checked, {len(errors):,} errors so far.")
+        elif status == "failed":
+            st.error(f"Failed to read file: {report.get('error')}")
+        elif status == "stopped":
+            st.error(f"Stopped after {report['checked']:,} rows: {len(errors):,} errors reached the limit of "
+                     f"{report['max_errors']:,}. Check the column mapping or fix the file and try again.")
+        elif errors:
+            st.error(f"Found {len(errors):,} validation errors. Fix the file and try again.")
+        else:
+            st.success(f"Validation passed for {len(report['rows']):,} rows. Ready to import.")
+        if errors:
+            if len(errors) > ERRORS_SHOWN:
+                st.caption(f"First {ERRORS_SHOWN:,} errors:")
+            st.json(errors[:ERRORS_SHOWN])
+
+    section()
+
+
+def render():
+    st.title("📥 Migration Tool — Upload, Validate, Import")
+    job_panel()
+
+    uploaded = st.file_uploader("Upload Excel or CSV (legacy export)", type=["xlsx", "xls", "csv"])
+    if not uploaded:
+        _drop_upload()
+        st.info("Upload a file to begin.")
+        st.stop()
+    max_errors = st.number_input("Stop validating after this many errors (0: check every row)",
+                                 min_value=0, value=MAX_ERRORS, step=100, key="validation_max_errors")
+
+    try:
+        upload = _load_upload(uploaded)
+    except Exception as e:
+        _drop_upload()
+        st.error(f"Failed to read file: {e}")
+        st.stop()
+
+    # validate once per upload (again if the limit changes before it's done)
+    report = upload.get("report")
+    if report is None or (report["max_errors"] != max_errors and report["status"] != "done"):
+        report = _start_validation(upload, max_errors, uploaded.name)
+
+    if st.toggle(f"Preview (first {PREVIEW_ROWS} rows)"):
+        if upload["preview"] is None:
+            upload["preview"] = read_preview(upload["path"])
+        st.dataframe(upload["preview"])
+
+    validation_results(report)
+    if report["status"] != "done" or report["errors"]:
         st.stop()
-    else:
-        st.success(f"Validation passed for {len(rows_to_import)} rows. Ready to import.")
 
-    # Confirm import
+    # Confirm import: runs as a background job, job_panel shows its progress
+    rows_to_import = report["rows"]
     if st.button("Import into Supabase"):
-        st.info("Starting import. This may take a few moments...")
-        # caches
-        event_cache = {}
-        year_cache = {}
-        ancillary_cache = {}
-
-        def get_or_create_event(name, location):
-            key = (name.lower(), location.lower())
-            if key in event_cache:
-                return event_cache[key]
-            # try find
-            resp = supabase_get("competition_events", params=f"event_name=eq.{quote_param(name)}&location=eq.{quote_param(location)}")
-            if resp.status_code == 200 and resp.json():
-                eid = resp.json()[0]["id"]
-                event_cache[key] = eid
-                return eid
-            # create
-            payload = {"event_name": name, "location": location}
-            r = supabase_insert("competition_events", payload)
-            r.raise_for_status()
-            eid = r.json()[0]["id"]
-            event_cache[key] = eid
-            return eid
-
-        def get_or_create_competition_year(event_id, year, start_date, end_date, total_teams):
-            key = (event_id, int(year))
-            if key in year_cache:
-                return year_cache[key]
-            # try find
-            params = f"event_id=eq.{event_id}&year=eq.{year}"
-            resp = supabase_get("competition_years", params=params)
-            if resp.status_code == 200 and resp.json():
-                cyid = resp.json()[0]["id"]
-                year_cache[key] = cyid
-                return cyid
-            payload = {"event_id": event_id, "year": int(year)}
-            if start_date:
-                payload["start_date"] = start_date.isoformat()
-            if end_date:
-                payload["end_date"] = end_date.isoformat()
-            if total_teams is not None:
-                payload["total_teams"] = total_teams
-            r = supabase_insert("competition_years", payload)
-            r.raise_for_status()
-            cyid = r.json()[0]["id"]
-            year_cache[key] = cyid
-            return cyid
-
-        def get_or_create_ancillary_category(comp_year_id, cat_name):
-            key = (comp_year_id, cat_name.lower())
-            if key in ancillary_cache:
-                return ancillary_cache[key]
-            params = f"competition_year_id=eq.{comp_year_id}&category_name=eq.{quote_param(cat_name)}"
-            resp = supabase_get("ancillary_categories", params=params)
-            if resp.status_code == 200 and resp.json():
-                cid = resp.json()[0]["id"]
-                ancillary_cache[key] = cid
-                return cid
-            payload = {"competition_year_id": comp_year_id, "category_name": cat_name}
-            r = supabase_insert("ancillary_categories", payload)
-            r.raise_for_status()
-            cid = r.json()[0]["id"]
-            ancillary_cache[key] = cid
-            return cid
-
-        from urllib.parse import quote_plus
-        def quote_param(v):
-            return quote_plus(str(v))
-
-        imported = 0
-        core_totals = {}
-        anc_totals = {}
-
-        for r in rows_to_import:
-            try:
-                event_id = get_or_create_event(r["event"], r["location"])
-                comp_year_id = get_or_create_competition_year(event_id, r["year"], r["start_date"], r["end_date"], r["total_teams"])
-                # core meat
-                if r["meat"] and r["meat"] in ["Chicken","Ribs","Pork","Brisket"]:
-                    payload = {
-                        "competition_year_id": comp_year_id,
-                        "meat": r["meat"],
-                        "participant": r["participant"],
-                        "score": r["score"],
-                        "rank": r["rank"]
-                    }
-                    rr = supabase_insert("meat_results", payload)
-                    if rr.status_code not in (200,201):
-                        st.error(f"meat insert error: {rr.status_code} {rr.text}")
-                else:
-                    # ancillary
-                    if r["ancillary_category"]:
-                        cat_id = get_or_create_ancillary_category(comp_year_id, r["ancillary_category"])
-                        payload = {
-                            "competition_year_id": comp_year_id,
-                            "category_id": cat_id,
-                            "participant": r["participant"],
-                            "score": r["score"],
-                            "rank": r["rank"]
-                        }
-                        rr = supabase_insert("ancillary_results", payload)
-                        if rr.status_code not in (200,201):
-                            st.error(f"ancillary insert error: {rr.status_code} {rr.text}")
-                # capture totals to insert later (not now)
-                key = comp_year_id
-
-                if r["team_total_score"] is not None or r["team_rank"] is not None:
-                    core_totals[key] = {
-                        "competition_year_id": key,
-                        "total_score": r["team_total_score"],
-                        "rank": r["team_rank"]
-                    }
-
-                if r["ancillary_team_total"] is not None or r["ancillary_team_rank"] is not None:
-                    anc_totals[key] = {
-                        "competition_year_id": key,
-                        "total_score": r["ancillary_team_total"],
-                        "rank": r["ancillary_team_rank"]
-                    }
-
-                # # team totals (core)
-                # if r["team_total_score"] is not None or r["team_rank"] is not None:
-                #     payload = {
-                #         "competition_year_id": comp_year_id,
-                #         "total_score": r["team_total_score"],
-                #         "rank": r["team_rank"]
-                #     }
-                #     rr = supabase_insert("team_results", payload)
-                #     # ignore errors (unique constraint may exist)
-                # # ancillary team totals
-                # if r["ancillary_team_total"] is not None or r["ancillary_team_rank"] is not None:
-                #     payload = {
-                #         "competition_year_id": comp_year_id,
-                #         "total_score": r["ancillary_team_total"],
-                #         "rank": r["ancillary_team_rank"]
-                #     }
-                #     rr = supabase_insert("ancillary_team_results", payload)
-                imported += 1
-            except Exception as e:
-                st.error(f"Row import error: {e}")
-                continue
-        # insert core totals
-        for key, payload in core_totals.items():
-            supabase_upsert(
-                "team_results",
-                payload,
-                on_conflict="competition_year_id"
-            )
-
-        # insert ancillary totals
-        for key, payload in anc_totals.items():
-            supabase_upsert(
-                "ancillary_team_results",
-                payload,
-                on_conflict="competition_year_id"
-            )
-
-        st.success(f"Imported {imported} rows.")
+        st.session_state["import_job"] = submit_import(rows_to_import, f"{uploaded.name} ({len(rows_to_import)} rows)")
+        st.rerun()
@@ -0,0 +1,58 @@
+-- 001_change_log.sql
+-- Change feed for the app's snapshot cache (change_feed.py). Every insert,
+-- update or delete on the result tables appends (table, row id, op) to
+-- table_changes; the app polls it by id watermark and refetches only the
+-- touched rows.
+--
+-- Apply in the Supabase SQL editor (or psql) once per project.
+
+create table if not exists public.table_changes (
+    id          bigint generated always as identity primary key,
+    table_name  text        not null,
+    row_id      bigint      not null,
+    op          char(1)     not null check (op in ('I', 'U', 'D')),
+    changed_at  timestamptz not null default now()
+);
+
+create index if not exists table_changes_changed_at_idx on public.table_changes (changed_at);
+
+-- security definer: writers don't need (and don't get) insert rights on the log
+create or replace function public.log_table_change() returns trigger
+language plpgsql security definer set search_path = public as $$
+begin
+    if tg_op = 'DELETE' then
+        insert into public.table_changes (table_name, row_id, op) values (tg_table_name, old.id, 'D');
+        return old;
+    end if;
+    insert into public.table_changes (table_name, row_id, op)
+    values (tg_table_name, new.id, case tg_op when 'INSERT' then 'I' else 'U' end);
+    return new;
+end;
+$$;
+
+do $$
+declare
+    t text;
+begin
+    foreach t in array array[
+        'competition_events', 'competition_years', 'meat_results', 'team_results',
+        'ancillary_categories', 'ancillary_results', 'ancillary_team_results'
+    ] loop
+        execute format('drop trigger if exists %I on public.%I', t || '_change_log', t);
+        execute format(
+            'create trigger %I after insert or update or delete on public.%I '
+            'for each row execute function public.log_table_change()',
+            t || '_change_log', t
+        );
+    end loop;
+end;
+$$;
+
+-- the app reads the feed with the anon / service key like the other tables
+alter table public.table_changes enable row level security;
+drop policy if exists table_changes_read on public.table_changes;
+create policy table_changes_read on public.table_changes for select using (true);
+
+-- the app only needs changes newer than its watermark, so old rows can be
+-- trimmed periodically, e.g.
+-- delete from public.table_changes where changed_at < now() - interval '7 days';
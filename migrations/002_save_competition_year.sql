@@ -0,0 +1,104 @@
+-- 002_save_competition_year.sql
+-- Save All of the intake form (bbq_intake.save_all) as one call: the whole
+-- competition-year payload goes in as JSON and every table is written in a
+-- single transaction, so a save is either fully committed or not at all.
+--
+--   POST /rest/v1/rpc/save_competition_year  {"payload": {...}}
+--
+-- payload:
+--   {
+--     "competition_year_id": 42,
+--     "meats":          [{"meat": "Brisket", "participant": "...", "score": 170.5, "rank": 3}, ...],
+--     "team":           {"total_score": 680.0, "rank": 4},
+--     "ancillary":      [{"category_name": "Dessert", "participant": "...", "score": 168.0, "rank": 5}, ...],
+--     "ancillary_team": {"total_score": 505.0, "rank": 7}
+--   }
+-- Every key but competition_year_id is optional. Returns the row counts
+-- written per table.
+--
+-- Relies on the unique keys the app already upserts on:
+--   meat_results (competition_year_id, meat)
+--   team_results (competition_year_id)
+--   ancillary_results (competition_year_id, category_id)
+--   ancillary_team_results (competition_year_id)
+--
+-- Apply in the Supabase SQL editor (or psql) once per project. Without it
+-- the app falls back to one REST call per table.
+
+create or replace function public.save_competition_year(payload jsonb) returns jsonb
+language plpgsql set search_path = public as $$
+declare
+    cy_id       bigint := (payload ->> 'competition_year_id')::bigint;
+    item        jsonb;
+    cat_id      bigint;
+    n_meats     int := 0;
+    n_anc       int := 0;
+    n_cats      int := 0;
+begin
+    if cy_id is null then
+        raise exception 'competition_year_id is required' using errcode = '22023';
+    end if;
+    if not exists (select 1 from competition_years where id = cy_id) then
+        raise exception 'competition year % does not exist', cy_id using errcode = 'P0002';
+    end if;
+
+    -- concurrent saves of the same year queue up instead of interleaving
+    perform pg_advisory_xact_lock(hashtext('save_competition_year'), cy_id::int);
+
+    for item in select * from jsonb_array_elements(coalesce(payload -> 'meats', '[]'::jsonb)) loop
+        insert into meat_results (competition_year_id, meat, participant, score, rank)
+        values (cy_id, item ->> 'meat', item ->> 'participant',
+                (item ->> 'score')::numeric, (item ->> 'rank')::int)
+        on conflict (competition_year_id, meat) do update
+            set participant = excluded.participant, score = excluded.score, rank = excluded.rank;
+        n_meats := n_meats + 1;
+    end loop;
+
+    if payload ? 'team' then
+        insert into team_results (competition_year_id, total_score, rank)
+        values (cy_id, (payload -> 'team' ->> 'total_score')::numeric, (payload -> 'team' ->> 'rank')::int)
+        on conflict (competition_year_id) do update
+            set total_score = excluded.total_score, rank = excluded.rank;
+    end if;
+
+    for item in select * from jsonb_array_elements(coalesce(payload -> 'ancillary', '[]'::jsonb)) loop
+        select id into cat_id from ancillary_categories
+        where competition_year_id = cy_id and category_name = item ->> 'category_name'
+        order by id limit 1;
+        if cat_id is null then
+            insert into ancillary_categories (competition_year_id, category_name)
+            values (cy_id, item ->> 'category_name')
+            returning id into cat_id;
+            n_cats := n_cats + 1;
+        end if;
+
+        insert into ancillary_results (competition_year_id, category_id, participant, score, rank)
+        values (cy_id, cat_id, item ->> 'participant',
+                (item ->> 'score')::numeric, (item ->> 'rank')::int)
+        on conflict (competition_year_id, category_id) do update
+            set participant = excluded.participant, score = excluded.score, rank = excluded.rank;
+        n_anc := n_anc + 1;
+    end loop;
+
+    if payload ? 'ancillary_team' then
+        insert into ancillary_team_results (competition_year_id, total_score, rank)
+        values (cy_id, (payload -> 'ancillary_team' ->> 'total_score')::numeric,
+                (payload -> 'ancillary_team' ->> 'rank')::int)
+        on conflict (competition_year_id) do update
+            set total_score = excluded.total_score, rank = excluded.rank;
+    end if;
+
+    return jsonb_build_object(
+        'competition_year_id', cy_id,
+        'meat_results', n_meats,
+        'ancillary_categories', n_cats,
+        'ancillary_results', n_anc
+    );
+end;
+$$;
+
+-- security invoker (the default): the caller's row level security applies
+grant execute on function public.save_competition_year(jsonb) to anon, authenticated, service_role;
+
+-- PostgREST caches the schema; make it pick up the new function
+notify pgrst, 'reload schema';
@@ -0,0 +1,143 @@
+# profiling.py
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+
+PROFILE_ENV = "BBQ_PROFILE"            # 1 = record phase timings per rerun
+DUMP_ENV = "BBQ_PROFILE_DUMP"          # cprofile | pyinstrument
+DIR_ENV = "BBQ_PROFILE_DIR"            # where dumps go (default: <tmp>/bbq-profiles)
+HISTORY = 200                          # reruns kept per page
+
+_local = threading.local()
+_lock = threading.Lock()
+_history = {}
+
+
+def enabled():
+    return os.environ.get(PROFILE_ENV, "").lower() in ("1", "true", "yes")
+
+
+def dump_dir():
+    d = Path(os.environ.get(DIR_ENV) or Path(tempfile.gettempdir()) / "bbq-profiles")
+    d.mkdir(parents=True, exist_ok=True)
+    return d
+
+
+@contextmanager
+def phase(name):
+    # accumulate wall time for a named phase (load, merge, filter, chart,
+    # widgets, ...) of the current rerun; no-op outside profile_page
+    phases = getattr(_local, "phases", None)
+    if phases is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases[name] = phases.get(name, 0.0) + time.perf_counter() - t0
+
+
+def _dump_profile(page, kind, fn):
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    safe = page.lower().replace(" ", "_")
+    if kind == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            return fn()
+        profiler = Profiler()
+        profiler.start()
+        try:
+            return fn()
+        finally:
+            profiler.stop()
+            path = dump_dir() / f"{safe}-{stamp}.html"
+            path.write_text(profiler.output_html())
+            _local.dump = str(path)
+    import cProfile
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(fn)
+    finally:
+        path = dump_dir() / f"{safe}-{stamp}.prof"
+        profiler.dump_stats(path)
+        _local.dump = str(path)
+
+
+def profile_page(page, render):
+    # run a page's render() and, when BBQ_PROFILE is set, record its total
+    # and per-phase wall time in the rolling history for that page
+    if not enabled():
+        return render()
+    _local.phases = {}
+    _local.dump = None
+    t0 = time.perf_counter()
+    try:
+        kind = os.environ.get(DUMP_ENV, "").lower()
+        if kind in ("cprofile", "pyinstrument"):
+            return _dump_profile(page, kind, render)
+        return render()
+    finally:
+        entry = {
+            "ts": time.time(),
+            "page": page,
+            "total_s": time.perf_counter() - t0,
+            "phases": _local.phases,
+            "dump": _local.dump,
+        }
+        _local.phases = None
+        with _lock:
+            _history.setdefault(page, deque(maxlen=HISTORY)).append(entry)
+
+
+def history(page=None):
+    with _lock:
+        if page is not None:
+            return list(_history.get(page, ()))
+        return {p: list(h) for p, h in _history.items()}
+
+
+def summary():
+    # per page: reruns, p50 / p95 / last rerun latency in ms
+    rows = []
+    for page, entries in history().items():
+        totals = sorted(e["total_s"] for e in entries)
+        if not totals:
+            continue
+        pick = lambda q: totals[min(len(totals) - 1, int(q * len(totals)))]
+        rows.append({
+            "page": page,
+            "reruns": len(totals),
+            "p50_ms": round(pick(0.5) * 1000, 1),
+            "p95_ms": round(pick(0.95) * 1000, 1),
+            "last_ms": round(entries[-1]["total_s"] * 1000, 1),
+        })
+    return rows
+
+
+def render_profile_panel(page):
+    # sidebar view of the rolling rerun history; drawn after the page so the
+    # current rerun is included
+    if not enabled():
+        return
+    import streamlit as st
+
+    entries = history(page)
+    with st.sidebar.expander("⏱️ Rerun profile"):
+        if entries:
+            last = entries[-1]
+            st.caption(f"Last rerun of {page}: {last['total_s'] * 1000:.0f} ms")
+            st.dataframe(
+                [{"phase": k, "ms": round(v * 1000, 1)} for k, v in
+                 sorted(last["phases"].items(), key=lambda kv: -kv[1])],
+                hide_index=True,
+                use_container_width=True,
+            )
+            if last["dump"]:
+                st.caption(f"Profile written to {last['dump']}")
+        st.dataframe(summary(), hide_index=True, use_container_width=True)
@@ -0,0 +1,76 @@
+# rollups.py
+# participant x meat/category x year cells of an enriched fact frame
+# (analytics.build_core / build_ancillary output), and the leaderboard
+# rolled up from them over a group / year selection. The cells are built
+# once per data version (leaderboard.get_cells); a leaderboard query only
+# groups the cells, not the fact rows.
+import numpy as np
+import pandas as pd
+
+KEY_COLS = ["participant", "group", "year"]
+AGG_COLS = ["count", "score_sum", "score_n", "pct_sum", "pct_n", "best_rank"]
+
+
+def _empty_table():
+    return pd.DataFrame(
+        {c: pd.Series(dtype="float64") for c in AGG_COLS},
+        index=pd.MultiIndex.from_arrays([[], [], []], names=KEY_COLS),
+    )
+
+
+def cells(df, group_col):
+    # one row per (participant, group, year) with additive sums / counts and
+    # the best rank; rows without a year are left out, ids counted once
+    if df.empty or group_col not in df.columns:
+        return _empty_table()
+    df = df[pd.to_numeric(df["year"], errors="coerce").notna()].drop_duplicates("id")
+    if df.empty:
+        return _empty_table()
+    rows = pd.DataFrame({
+        "participant": df["participant"].fillna("(unknown)").astype(str),
+        "group": df[group_col].fillna("(unknown)").astype(str),
+        "year": pd.to_numeric(df["year"], errors="coerce").astype("int64"),
+        "score": pd.to_numeric(df["score"], errors="coerce"),
+        "pct": pd.to_numeric(df["Percentile Rank"], errors="coerce"),
+        "rank": pd.to_numeric(df["rank"], errors="coerce"),
+    })
+    gb = rows.groupby(KEY_COLS, sort=False)
+    sums = gb[["score", "pct"]].sum()
+    counts = gb[["score", "pct"]].count()
+    return pd.DataFrame({
+        "count": gb.size(),
+        "score_sum": sums["score"],
+        "score_n": counts["score"],
+        "pct_sum": sums["pct"],
+        "pct_n": counts["pct"],
+        "best_rank": gb["rank"].min(),
+    }).astype("float64")
+
+
+def leaderboard(table, groups=None, years=None, min_entries=1, by_group=True):
+    # roll the per-year cells up to participant (x group) over the selection
+    t = table
+    if t.empty:
+        return pd.DataFrame()
+    mask = np.ones(len(t), dtype=bool)
+    if groups:
+        mask &= t.index.get_level_values("group").isin(groups)
+    if years:
+        lo, hi = years
+        yv = t.index.get_level_values("year")
+        mask &= (yv >= lo) & (yv <= hi)
+    t = t[mask]
+    if t.empty:
+        return pd.DataFrame()
+    keys = ["participant", "group"] if by_group else ["participant"]
+    gb = t.groupby(level=keys)
+    g = gb[AGG_COLS[:-1]].sum()
+    g["best_rank"] = gb["best_rank"].min()
+    g = g[g["count"] >= min_entries]
+    out = pd.DataFrame({
+        "Entries": g["count"].astype(int),
+        "Mean Score": g["score_sum"] / g["score_n"].replace(0, np.nan),
+        "Mean Percentile": g["pct_sum"] / g["pct_n"].replace(0, np.nan),
+        "Best Rank": g["best_rank"],
+    })
+    return out.sort_values(["Mean Percentile", "Mean Score"], ascending=False).reset_index()
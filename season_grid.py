@@ -0,0 +1,291 @@
+# season_grid.py
+# Bulk entry for a whole season on the intake page: one editable grid with a
+# row per competition year and score / rank columns per meat, per ancillary
+# category and for the team totals. The grid is filled from one filtered
+# fetch per table and saved as one bulk upsert per table, holding only the
+# rows whose cells changed.
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import table_cache
+from supabase_client import Query, supabase_insert, supabase_upsert, dumps
+from utils import MEATS
+from profiling import phase
+
+FETCH_CHUNK = 200           # competition year ids per in.() request
+RESULT_TABLES = ["meat_results", "team_results", "ancillary_categories",
+                 "ancillary_results", "ancillary_team_results"]
+KEY_COLUMNS = ["id", "Event", "Location"]
+TOTALS = {"Core": "team_results", "Ancillary": "ancillary_team_results"}
+
+
+def score_col(name):
+    return f"{name} Score"
+
+
+def rank_col(name):
+    return f"{name} Rank"
+
+
+def _fetch_in(table, column, ids):
+    rows = []
+    for i in range(0, len(ids), FETCH_CHUNK):
+        rows += Query(table).in_(column, ids[i:i + FETCH_CHUNK]).order("id").all_rows()
+    return pd.DataFrame(rows)
+
+
+def fetch_season(year, with_events=False):
+    # {table: frame} of the season's competition years and everything that
+    # hangs off them: one request per table (per FETCH_CHUNK years). With
+    # with_events, also the season's events (when the page has no events
+    # snapshot, see bbq_intake.load_event_index)
+    years = pd.DataFrame(Query("competition_years").eq("year", int(year)).order("id").all_rows())
+    frames = {"competition_years": years}
+    ids = years["id"].astype(int).tolist() if not years.empty else []
+    for table in RESULT_TABLES:
+        frames[table] = _fetch_in(table, "competition_year_id", ids)
+    if with_events:
+        event_ids = sorted(set(years["event_id"].astype(int).tolist())) if not years.empty else []
+        frames["competition_events"] = _fetch_in("competition_events", "id", event_ids)
+    return frames
+
+
+def seasons_on_server():
+    # newest to oldest season between the first and last competition year,
+    # from two one-row queries cached until the years table changes
+    bounds = []
+    for desc in (True, False):
+        q = Query("competition_years").select("year").order("year", desc=desc, nulls="last").limit(1)
+        df = table_cache.query_snapshot(q)[0]
+        if df.empty:
+            return []
+        bounds.append(int(df["year"].iloc[0]))
+    return list(range(bounds[0], bounds[1] - 1, -1))
+
+
+def _pivot(df, column, value):
+    # competition year x `column` table of `value` (first row per cell)
+    if df.empty:
+        return pd.DataFrame()
+    return df.pivot_table(index="competition_year_id", columns=column, values=value, aggfunc="first")
+
+
+def season_categories(frames, extra=()):
+    # ancillary category names of the season, most used first
+    cats = frames["ancillary_categories"]
+    names = cats["category_name"].value_counts().index.tolist() if not cats.empty else []
+    return names + [c for c in extra if c not in names]
+
+
+def build_grid(frames, events_df, categories):
+    # the editable grid (one row per competition year) and the
+    # (competition_year_id, category name) -> category id map
+    years = frames["competition_years"]
+    if years.empty:
+        return pd.DataFrame(columns=KEY_COLUMNS), {}
+    names = events_df.set_index("id") if events_df is not None and not events_df.empty else pd.DataFrame(columns=["event_name", "location"])
+    grid = pd.DataFrame({
+        "id": years["id"].astype(int).to_numpy(),
+        "Event": names["event_name"].reindex(years["event_id"]).to_numpy(),
+        "Location": names["location"].reindex(years["event_id"]).to_numpy(),
+    }).set_index("id", drop=False)
+
+    def put(table, column, value, name, target):
+        cells = _pivot(table, column, value)
+        if name in cells.columns:
+            grid[target] = cells[name].reindex(grid.index)
+        else:
+            grid[target] = np.nan
+
+    meats = frames["meat_results"]
+    for meat in MEATS:
+        put(meats, "meat", "score", meat, score_col(meat))
+        put(meats, "meat", "rank", meat, rank_col(meat))
+
+    cats = frames["ancillary_categories"]
+    cat_ids = {}
+    anc = frames["ancillary_results"]
+    if not cats.empty:
+        cat_ids = {(int(r.competition_year_id), r.category_name): int(r.id) for r in cats.itertuples()}
+        if not anc.empty:
+            anc = anc.assign(category_name=anc["category_id"].map(cats.set_index("id")["category_name"]))
+    for cat in categories:
+        put(anc, "category_name", "score", cat, score_col(cat))
+        put(anc, "category_name", "rank", cat, rank_col(cat))
+
+    for label, table in TOTALS.items():
+        totals = frames[table]
+        totals = totals.drop_duplicates("competition_year_id").set_index("competition_year_id") \
+            if not totals.empty else pd.DataFrame(columns=["total_score", "rank"])
+        grid[f"{label} Total"] = totals["total_score"].reindex(grid.index).astype("float64")
+        grid[f"{label} Rank"] = totals["rank"].reindex(grid.index).astype("float64")
+
+    for col in grid.columns:
+        if col.endswith(" Rank"):
+            grid[col] = grid[col].astype("Int64")
+    return grid.reset_index(drop=True), cat_ids
+
+
+def _changed(base, edited, cols):
+    # rows where any of `cols` differs (NaN == NaN)
+    a = base[cols].astype("float64").to_numpy()
+    b = edited[cols].astype("float64").to_numpy()
+    return ~((a == b) | (np.isnan(a) & np.isnan(b))).all(axis=1)
+
+
+def _num(value, cast):
+    return None if pd.isna(value) else cast(value)
+
+
+def diff_payloads(base, edited, categories):
+    # {table: [payload, ...]} for the changed rows; ancillary payloads carry
+    # category_name instead of category_id (resolved in save_grid). Rows
+    # whose score and rank are both empty are skipped: clearing cells
+    # doesn't delete results.
+    base = base.set_index("id")
+    edited = edited.set_index("id").reindex(base.index)
+    out = {"meat_results": [], "ancillary_results": [], "team_results": [], "ancillary_team_results": []}
+
+    def collect(table, name, cols, make):
+        changed = _changed(base, edited, cols)
+        for cy_id, score, rank in edited.loc[changed, cols].itertuples():
+            if pd.isna(score) and pd.isna(rank):
+                continue
+            out[table].append(make(int(cy_id), name, _num(score, float), _num(rank, int)))
+
+    for meat in MEATS:
+        collect("meat_results", meat, [score_col(meat), rank_col(meat)],
+                lambda cy, name, s, r: {"competition_year_id": cy, "meat": name, "score": s, "rank": r})
+    for cat in categories:
+        collect("ancillary_results", cat, [score_col(cat), rank_col(cat)],
+                lambda cy, name, s, r: {"competition_year_id": cy, "category_name": name, "score": s, "rank": r})
+    for label, table in TOTALS.items():
+        collect(table, label, [f"{label} Total", f"{label} Rank"],
+                lambda cy, name, s, r: {"competition_year_id": cy, "total_score": s, "rank": r})
+    return out
+
+
+def save_grid(payloads, cat_ids):
+    # one bulk request per table; returns (rows written per table, errors)
+    written, errors = {}, []
+    anc = payloads.get("ancillary_results", [])
+
+    # categories the season doesn't have yet, created in one insert
+    missing = sorted({(p["competition_year_id"], p["category_name"]) for p in anc} - set(cat_ids))
+    if missing:
+        resp = supabase_insert("ancillary_categories", dumps(
+            [{"competition_year_id": cy, "category_name": name} for cy, name in missing]))
+        if resp.status_code in (200, 201):
+            cat_ids = {**cat_ids, **{(int(c["competition_year_id"]), c["category_name"]): int(c["id"])
+                                     for c in resp.json()}}
+            written["ancillary_categories"] = len(missing)
+        else:
+            errors.append(f"Error creating ancillary categories: {resp.text}")
+            anc = [p for p in anc if (p["competition_year_id"], p["category_name"]) in cat_ids]
+
+    payloads = {**payloads, "ancillary_results": [
+        {"competition_year_id": p["competition_year_id"], "category_id": cat_ids[(p["competition_year_id"], p["category_name"])],
+         "score": p["score"], "rank": p["rank"]}
+        for p in anc
+    ]}
+    conflicts = {
+        "meat_results": "competition_year_id,meat",
+        "ancillary_results": "competition_year_id,category_id",
+        "team_results": "competition_year_id",
+        "ancillary_team_results": "competition_year_id",
+    }
+    for table, on_conflict in conflicts.items():
+        rows = payloads.get(table) or []
+        if not rows:
+            continue
+        resp = supabase_upsert(table, dumps(rows), on_conflict=on_conflict)
+        if resp.status_code in (200, 201):
+            written[table] = len(rows)
+        else:
+            errors.append(f"Error saving {table}: {resp.text}")
+    return written, errors
+
+
+def _column_config(categories):
+    config = {
+        "id": st.column_config.NumberColumn("Year id", disabled=True),
+        "Event": st.column_config.TextColumn(disabled=True),
+        "Location": st.column_config.TextColumn(disabled=True),
+    }
+    for name in list(MEATS) + list(categories):
+        config[score_col(name)] = st.column_config.NumberColumn(min_value=0.0, step=0.0001, format="%.4f")
+        config[rank_col(name)] = st.column_config.NumberColumn(min_value=0, step=1, format="%d")
+    for label in TOTALS:
+        config[f"{label} Total"] = st.column_config.NumberColumn(min_value=0.0, step=0.0001, format="%.4f")
+        config[f"{label} Rank"] = st.column_config.NumberColumn(min_value=0, step=1, format="%d")
+    return config
+
+
+def render(events_df, years_df):
+    # season grid section of the intake page. The fetched grid stays in
+    # session state (it is the base the edits are diffed against) until a
+    # save or a reload; edits happen inside a form, so nothing reruns or
+    # hits the network until "Save season". events_df / years_df are None
+    # for catalogs the page doesn't load whole.
+    state = st.session_state
+    if years_df is None:
+        seasons = seasons_on_server()
+    else:
+        seasons = sorted(years_df["year"].dropna().astype(int).unique().tolist(), reverse=True) if not years_df.empty else []
+    if not seasons:
+        st.info("No competition years yet. Create them in single-year mode first.")
+        return
+
+    c1, c2, c3 = st.columns([2, 4, 2], vertical_alignment="bottom")
+    season = c1.selectbox("Season", seasons, key="season_grid_year")
+    with c2.form("season_grid_add_category", clear_on_submit=True, border=False):
+        f1, f2 = st.columns([5, 2], vertical_alignment="bottom")
+        new_cat = f1.text_input("Add an ancillary category column")
+        if f2.form_submit_button("Add") and new_cat.strip():
+            extra = state.setdefault(f"season_grid_extra_{season}", [])
+            if new_cat.strip() not in extra:
+                extra.append(new_cat.strip())
+    if c3.button("↻ Reload"):
+        state.pop(f"season_grid_{season}", None)
+
+    key = f"season_grid_{season}"
+    extra = tuple(state.get(f"season_grid_extra_{season}", []))
+    loaded = state.get(key)
+    if loaded is None or loaded["extra"] != extra:
+        with phase("load"):
+            frames = loaded["frames"] if loaded is not None else fetch_season(season, with_events=events_df is None)
+            categories = season_categories(frames, extra)
+            grid, cat_ids = build_grid(frames, frames.get("competition_events", events_df), categories)
+        loaded = state[key] = {"frames": frames, "extra": extra, "categories": categories,
+                               "grid": grid, "cat_ids": cat_ids, "version": state.get(f"{key}_version", 0)}
+
+    grid, categories = loaded["grid"], loaded["categories"]
+    st.caption(f"{len(grid)} competition years · {len(categories)} ancillary categories. "
+               "Clearing cells doesn't delete results.")
+    with st.form(f"season_grid_form_{season}", border=False):
+        edited = st.data_editor(
+            grid,
+            column_config=_column_config(categories),
+            hide_index=True,
+            num_rows="fixed",
+            key=f"season_editor_{season}_{loaded['version']}",
+        )
+        submitted = st.form_submit_button("💾 Save season")
+
+    if submitted:
+        payloads = diff_payloads(grid, edited, categories)
+        if not any(payloads.values()):
+            st.info("No changes to save.")
+            return
+        with phase("save"):
+            written, errors = save_grid(payloads, loaded["cat_ids"])
+        for msg in errors:
+            st.error(msg)
+        # refetch on the next run; a new editor key drops the saved edits
+        state.pop(key, None)
+        state[f"{key}_version"] = loaded["version"] + 1
+        state.pop(f"season_grid_extra_{season}", None)
+        if not errors:
+            st.toast("Saved " + ", ".join(f"{n} {t}" for t, n in written.items()))
+            st.rerun()
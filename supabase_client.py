@@ -1,8 +1,25 @@
 # supabase_client.py
 import os
+import gzip
+import json
+import time
+import threading
+import dataclasses
+from datetime import date, datetime
 import requests
 import streamlit as st
 from urllib.parse import quote_plus
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from metrics import REGISTRY, RequestRecord
+from change_feed import note_write
+
+# orjson is optional: several times faster than the stdlib encoder, writes
+# dataclasses, dates and numpy scalars natively and NaN as null
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Support both local script env and Streamlit secrets
 def _get_config():
@@ -31,22 +48,336 @@ HEADERS = lambda: {
     "Content-Type": "application/json"
 }
 
-def supabase_get(table, params=""):
+# pooled connections + retries on transient gateway errors for idempotent calls
+def _new_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_maxsize=16,
+        max_retries=Retry(
+            total=2,
+            backoff_factor=0.3,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=("GET", "HEAD", "DELETE"),
+            raise_on_status=False,
+        ),
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+_session = _new_session()
+_local = threading.local()
+
+
+def bind_session(session=None):
+    # give the calling thread its own pooled session (import workers);
+    # everything else shares the module session
+    _local.session = session or _new_session()
+    return _local.session
+
+
+# Responses: requests asks for gzip / deflate, plus br when the brotli
+# package is installed, and decodes them transparently.
+# Requests: write bodies of at least GZIP_REQUESTS_ENV KiB are gzipped
+# (off by default: stock PostgREST doesn't decompress request bodies, a
+# gateway in front of it has to). A server that turns one away gets the
+# body again uncompressed, and no more compressed bodies from this process.
+GZIP_REQUESTS_ENV = "BBQ_GZIP_REQUESTS_KB"
+GZIP_LEVEL = 6
+_gzip_refused = False
+
+
+def _gzipped(kwargs):
+    # kwargs with the body gzipped, or None when it stays as it is
+    data = kwargs.get("data")
+    min_kb = float(os.environ.get(GZIP_REQUESTS_ENV) or 0)
+    if _gzip_refused or not min_kb or not data or len(data) < min_kb * 1024:
+        return None
+    headers = {**(kwargs.get("headers") or {}), "Content-Encoding": "gzip"}
+    return {**kwargs, "data": gzip.compress(data, compresslevel=GZIP_LEVEL), "headers": headers}
+
+
+def _refused(resp):
+    # 415, or PostgREST reading the compressed bytes as (invalid) JSON
+    return resp.status_code == 415 or (resp.status_code == 400 and "PGRST102" in resp.text)
+
+
+def _wire_bytes(resp):
+    # response body bytes as they crossed the network (before decompression)
+    try:
+        n = resp.raw.tell()
+    except (AttributeError, OSError):
+        n = 0
+    return n or len(resp.content or b"")
+
+
+def _request(method, table, url, **kwargs):
+    # every REST call goes through here so it lands in the metrics registry
+    global _gzip_refused
+    t0 = time.perf_counter()
+    session = getattr(_local, "session", _session)
+    sent = kwargs
+    refused_bytes = (0, 0)       # (sent, received) by a refused compressed attempt
+    try:
+        sent = _gzipped(kwargs) or kwargs
+        resp = session.request(method, url, **sent)
+        if sent is not kwargs and _refused(resp):
+            _gzip_refused = True
+            refused_bytes = (len(sent["data"]), _wire_bytes(resp))
+            sent = kwargs
+            resp = session.request(method, url, **sent)
+    except requests.RequestException:
+        REGISTRY.record_request(RequestRecord(
+            time.time(), table, method, 0, 0, 0, time.perf_counter() - t0, 0
+        ))
+        raise
+    finally:
+        # writes refresh the table's shared snapshot once they have landed
+        # (also when they failed, as they may have partly applied)
+        if method != "GET":
+            note_write(table)
+    latency = time.perf_counter() - t0
+    retries = resp.raw.retries if resp.raw is not None else None
+    body = kwargs.get("data")
+    wire_body = sent.get("data")
+    REGISTRY.record_request(RequestRecord(
+        time.time(),
+        table,
+        method,
+        resp.status_code,
+        len(resp.content or b""),
+        len(body) if body else 0,
+        latency,
+        len(retries.history) if retries is not None else 0,
+        _wire_bytes(resp) + refused_bytes[1],
+        (len(wire_body) if wire_body else 0) + refused_bytes[0],
+    ))
+    return resp
+
+def _default(obj):
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if isinstance(obj, (date, datetime)):
+        return obj.isoformat()
+    if hasattr(obj, "item"):
+        # numpy / pandas scalars
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dumps(obj):
+    # JSON request body as bytes; insert / upsert take these pre-serialized
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, default=_default, separators=(",", ":")).encode()
+
+def loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def _body(record):
+    return record if isinstance(record, (bytes, bytearray)) else dumps(record)
+
+def in_list(values):
+    # PostgREST "in.(...)" filter value; strings are double-quoted so commas,
+    # dots and parens inside names don't break the list
+    items = []
+    for v in values:
+        if isinstance(v, (int, float)) and not isinstance(v, bool):
+            items.append(str(v))
+        else:
+            s = str(v).replace("\\", "\\\\").replace('"', '\\"')
+            items.append(f'"{s}"')
+    return quote_plus(f"in.({','.join(items)})", safe="(),")
+
+def _text(value):
+    # filter value as PostgREST reads it from the URL
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if hasattr(value, "item"):
+        value = value.item()
+    return str(value)
+
+
+class Query:
+    # PostgREST read of one table, built up by chaining and encoded in one
+    # place:
+    #   Query("meat_results").select("meat", "score").eq("competition_year_id", 42)
+    #       .order("meat").limit(50).rows()
+    # Filters on several columns (or twice on one, e.g. gte + lte) are ANDed.
+    # str(query) is the query string.
+
+    def __init__(self, table):
+        self.table = table
+        self._select = None
+        self._filters = []
+        self._order = []
+        self._limit = None
+        self._offset = None
+        self._count = None
+
+    def select(self, *columns):
+        self._select = ",".join(columns)
+        return self
+
+    def _op(self, column, op, value):
+        self._filters.append(f"{quote_plus(column)}={op}.{quote_plus(_text(value))}")
+        return self
+
+    def eq(self, column, value):
+        return self._op(column, "eq", value)
+
+    def neq(self, column, value):
+        return self._op(column, "neq", value)
+
+    def gt(self, column, value):
+        return self._op(column, "gt", value)
+
+    def gte(self, column, value):
+        return self._op(column, "gte", value)
+
+    def lt(self, column, value):
+        return self._op(column, "lt", value)
+
+    def lte(self, column, value):
+        return self._op(column, "lte", value)
+
+    def in_(self, column, values):
+        self._filters.append(f"{quote_plus(column)}={in_list(values)}")
+        return self
+
+    def ilike(self, column, pattern):
+        # case-insensitive match, * as the wildcard
+        return self._op(column, "ilike", pattern)
+
+    def is_(self, column, value):
+        # value: None, True or False
+        return self._op(column, "is", "null" if value is None else value)
+
+    def order(self, column, desc=False, nulls=None):
+        # nulls: "first" / "last"
+        term = f"{column}.{'desc' if desc else 'asc'}"
+        if nulls:
+            term += f".nulls{nulls}"
+        self._order.append(term)
+        return self
+
+    def limit(self, n):
+        self._limit = int(n)
+        return self
+
+    def range(self, start, end):
+        # rows start..end inclusive, like the Range header
+        self._offset = int(start)
+        self._limit = int(end) - int(start) + 1
+        return self
+
+    def count(self, method="exact"):
+        # ask for the total row count (Content-Range, see total())
+        self._count = method
+        return self
+
+    def params(self):
+        parts = []
+        if self._select:
+            parts.append(f"select={quote_plus(self._select, safe=',*()')}")
+        parts += self._filters
+        if self._order:
+            parts.append(f"order={','.join(self._order)}")
+        if self._limit is not None:
+            parts.append(f"limit={self._limit}")
+        if self._offset:
+            parts.append(f"offset={self._offset}")
+        return "&".join(parts)
+
+    __str__ = params
+
+    def get(self, headers=None):
+        headers = dict(headers or {})
+        if self._count:
+            headers["Prefer"] = f"count={self._count}"
+        return supabase_get(self.table, self.params(), headers=headers or None)
+
+    def rows(self):
+        # the result rows; raises on an error response
+        resp = self.get()
+        resp.raise_for_status()
+        return resp.json()
+
+    def pages(self, headers=None):
+        # responses holding every matching row, paged when the server caps
+        # the response (the project's max-rows setting, 1000 by default on
+        # Supabase). The first request asks for the exact count; further
+        # pages use the size of the first one. Order by a unique column for
+        # stable pages. headers (e.g. Accept) go on every request.
+        first = self.count().get(headers)
+        first.raise_for_status()
+        yield first
+        got = returned(first)
+        n = total(first)
+        start = self._offset or 0
+        wanted = n - start if n is not None else None
+        if self._limit is not None:
+            wanted = self._limit if wanted is None else min(wanted, self._limit)
+        page = got
+        while page and wanted is not None and got < wanted:
+            lo = start + got
+            nxt = Query(self.table)
+            nxt._select, nxt._filters, nxt._order = self._select, self._filters, self._order
+            resp = nxt.range(lo, lo + min(page, wanted - got) - 1).get(headers)
+            resp.raise_for_status()
+            if not returned(resp):
+                break
+            yield resp
+            got += returned(resp)
+
+    def all_rows(self):
+        # every matching row as dicts (see pages)
+        rows = []
+        for resp in self.pages():
+            data = resp.json()
+            rows += [data] if isinstance(data, dict) else data
+        return rows
+
+
+def _content_range(resp):
+    # ("0-24", "573") from "0-24/573"; ("*", "0") for no rows
+    rng, _, n = (resp.headers.get("Content-Range") or "").partition("/")
+    return rng, n
+
+
+def total(resp):
+    # total row count from a counted response's Content-Range; None when
+    # the server didn't count
+    n = _content_range(resp)[1]
+    return int(n) if n.isdigit() else None
+
+
+def returned(resp):
+    # rows in the response, from its Content-Range (any format); 0 when
+    # the header is missing
+    lo, _, hi = _content_range(resp)[0].partition("-")
+    return int(hi) - int(lo) + 1 if lo.isdigit() and hi.isdigit() else 0
+
+
+def supabase_get(table, params="", headers=None):
     global SUPABASE_URL, SUPABASE_KEY
     if not SUPABASE_URL or not SUPABASE_KEY:
         SUPABASE_URL, SUPABASE_KEY = _get_config()
     url = f"{SUPABASE_URL}/rest/v1/{table}"
     if params:
         url = f"{url}?{params}"
-    resp = requests.get(url, headers=HEADERS())
+    resp = _request("GET", table, url, headers={**HEADERS(), **(headers or {})})
     return resp
 
 def supabase_insert(table, record):
+    # record: dict, list of dicts / dataclasses, or bytes from dumps()
     global SUPABASE_URL, SUPABASE_KEY
     if not SUPABASE_URL or not SUPABASE_KEY:
         SUPABASE_URL, SUPABASE_KEY = _get_config()
     url = f"{SUPABASE_URL}/rest/v1/{table}"
-    resp = requests.post(url, json=record, headers={**HEADERS(), "Prefer": "return=representation"})
+    resp = _request("POST", table, url, data=_body(record), headers={**HEADERS(), "Prefer": "return=representation"})
     return resp
 
 def supabase_upsert(table, record, on_conflict=None):
@@ -57,7 +388,7 @@ def supabase_upsert(table, record, on_conflict=None):
     params = ""
     if on_conflict:
         params = f"?on_conflict={quote_plus(on_conflict)}"
-    resp = requests.post(url + params, json=record, headers={**HEADERS(), "Prefer": "resolution=merge-duplicates,return=representation"})
+    resp = _request("POST", table, url + params, data=_body(record), headers={**HEADERS(), "Prefer": "resolution=merge-duplicates,return=representation"})
     return resp
 
 def supabase_delete(table, params):
@@ -65,5 +396,20 @@ def supabase_delete(table, params):
     if not SUPABASE_URL or not SUPABASE_KEY:
         SUPABASE_URL, SUPABASE_KEY = _get_config()
     url = f"{SUPABASE_URL}/rest/v1/{table}?{params}"
-    resp = requests.delete(url, headers=HEADERS())
+    resp = _request("DELETE", table, url, headers=HEADERS())
+    return resp
+
+def supabase_rpc(function, args=None, writes=()):
+    # POST /rest/v1/rpc/<function> with the named arguments in `args` (dict
+    # or bytes from dumps()). `writes`: tables the function writes, whose
+    # shared snapshots are refreshed like after a direct write.
+    global SUPABASE_URL, SUPABASE_KEY
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        SUPABASE_URL, SUPABASE_KEY = _get_config()
+    url = f"{SUPABASE_URL}/rest/v1/rpc/{function}"
+    try:
+        resp = _request("POST", f"rpc/{function}", url, data=_body(args or {}), headers=HEADERS())
+    finally:
+        for table in writes:
+            note_write(table)
     return resp
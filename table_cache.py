@@ -0,0 +1,345 @@
+# table_cache.py
+# Process-wide snapshots of whole Supabase tables, shared by every page and
+# every Streamlit session. A table's snapshot is dropped when the app writes
+# to it, or patched in place when the change feed (change_feed.py) is active;
+# snapshots are cached indexed by id for that.
+# Filtered reads (query_snapshot) are cached the same way, keyed by table and
+# query, and dropped whenever their table changes.
+import os
+import threading
+import time
+from collections import OrderedDict
+from itertools import count
+
+import pandas as pd
+
+BUDGET_ENV = "BBQ_CACHE_MB"         # memory budget for cached frames (default 512)
+TTL_ENV = "BBQ_CACHE_TTL"           # seconds before a snapshot is refetched (default 600,
+                                    # bounds staleness from writers outside this process)
+READ_FORMAT_ENV = "BBQ_READ_FORMAT"  # "csv" (default; pyarrow's CSV reader) or "json"
+
+# read as text by the CSV path whatever they look like (a category named
+# "2024", dates the JSON path returns as ISO strings)
+TEXT_COLUMNS = {"event_name", "location", "meat", "participant", "category_name",
+                "start_date", "end_date", "table_name", "op"}
+
+
+class _Entry:
+    __slots__ = ("frame", "token", "nbytes", "loaded_at")
+
+    def __init__(self, frame, token, nbytes, loaded_at):
+        self.frame = frame
+        self.token = token
+        self.nbytes = nbytes
+        self.loaded_at = loaded_at
+
+
+class _Flight:
+    # one in-progress load that concurrent callers wait on
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def _table_of(key):
+    # entries are keyed by table name, or (table, query string) for slices
+    return key if isinstance(key, str) else key[0]
+
+
+class TableCache:
+    # LRU of table -> DataFrame under a byte budget. Concurrent misses for
+    # the same table share one load (single-flight). Every stored snapshot
+    # gets a new token, so (table, token) identifies its content. Generations
+    # are per table, so a write to a table also voids its slices' loads.
+
+    def __init__(self, budget_bytes=512 * 2**20, ttl_s=600, max_entries=64, max_slices=32):
+        self.budget_bytes = budget_bytes
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        # slices are evicted among themselves first, so browsing many
+        # competition years never pushes out the whole-table snapshots
+        self.max_slices = max_slices
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._generation = {}
+        self._tokens = count(1)
+        self.bytes = 0
+        self.hits = self.misses = self.coalesced = 0
+        self.evictions = self.invalidations = self.patches = 0
+
+    def _fresh(self, entry):
+        return not self.ttl_s or time.monotonic() - entry.loaded_at < self.ttl_s
+
+    def get(self, table, loader):
+        # (frame, token) for `table` (or a (table, query) slice key);
+        # loader(table) returns a DataFrame, or None for a failed fetch,
+        # which is passed through but not cached. The frame is a view of the
+        # cached one, taken under the lock (see patch)
+        with self._lock:
+            entry = self._entries.get(table)
+            if entry is not None and self._fresh(entry):
+                self._entries.move_to_end(table)
+                self.hits += 1
+                return entry.frame.copy(deep=False), entry.token
+            flight = self._inflight.get(table)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[table] = _Flight()
+                generation = self._generation.get(_table_of(table), 0)
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            frame = loader(table)
+            token = None
+            with self._lock:
+                # a write that landed while we were loading wins: hand the
+                # frame to this round of callers but don't keep it
+                if frame is not None and self._generation.get(_table_of(table), 0) == generation:
+                    token = next(self._tokens)
+                    self._store(table, _Entry(frame, token, int(frame.memory_usage(deep=True).sum()),
+                                              time.monotonic()))
+                flight.result = (frame.copy(deep=False) if frame is not None else None, token)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(table, None)
+            flight.done.set()
+
+    def _store(self, table, entry):
+        old = self._entries.pop(table, None)
+        if old is not None:
+            self.bytes -= old.nbytes
+        self._entries[table] = entry
+        self.bytes += entry.nbytes
+        if not isinstance(table, str):
+            slices = [k for k in self._entries if not isinstance(k, str)]
+            for key in slices[:max(0, len(slices) - self.max_slices)]:
+                self.bytes -= self._entries.pop(key).nbytes
+                self.evictions += 1
+        while len(self._entries) > 1 and (
+            self.bytes > self.budget_bytes or len(self._entries) > self.max_entries
+        ):
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def cached_tables(self):
+        # tables with a whole-table snapshot
+        with self._lock:
+            return [key for key in self._entries if isinstance(key, str)]
+
+    def _drop_slices(self, table):
+        for key in [k for k in self._entries if not isinstance(k, str) and k[0] == table]:
+            self.bytes -= self._entries.pop(key).nbytes
+            self.invalidations += 1
+
+    def patch(self, table, fn):
+        # replace the cached frame of `table` with fn(frame) under a new
+        # token, or drop it when fn returns None. fn runs under the lock and
+        # may modify the frame in place: get() only hands out views taken
+        # under the lock, which copy-on-write keeps apart from such writes.
+        # Returns True when the patch was stored.
+        with self._lock:
+            entry = self._entries.get(table)
+            if entry is None:
+                return False
+            frame = fn(entry.frame)
+            if frame is None:
+                self._generation[table] = self._generation.get(table, 0) + 1
+                self._entries.pop(table)
+                self.bytes -= entry.nbytes
+                self.invalidations += 1
+                self._drop_slices(table)
+                return False
+            # a frame patched in place keeps its size
+            nbytes = entry.nbytes if frame is entry.frame else int(frame.memory_usage(deep=True).sum())
+            self._store(table, _Entry(frame, next(self._tokens), nbytes, entry.loaded_at))
+            # loads that started before the patch may predate the change
+            self._generation[table] = self._generation.get(table, 0) + 1
+            self._drop_slices(table)
+            self.patches += 1
+        return True
+
+    def invalidate(self, *tables):
+        with self._lock:
+            for table in tables:
+                self._generation[table] = self._generation.get(table, 0) + 1
+                entry = self._entries.pop(table, None)
+                if entry is not None:
+                    self.bytes -= entry.nbytes
+                    self.invalidations += 1
+                self._drop_slices(table)
+
+    def clear(self):
+        with self._lock:
+            for table in {_table_of(k) for k in list(self._entries) + list(self._inflight)}:
+                self._generation[table] = self._generation.get(table, 0) + 1
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "patches": self.patches,
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "budget_bytes": self.budget_bytes,
+            }
+
+
+CACHE = TableCache(
+    budget_bytes=int(float(os.environ.get(BUDGET_ENV, 512)) * 2**20),
+    ttl_s=float(os.environ.get(TTL_ENV, 600)),
+)
+
+
+def _fetch(table):
+    from supabase_client import Query
+
+    # ordered by id so the pages past the server's max-rows cap line up
+    return _fetch_query(Query(table).order("id"))
+
+
+def index_by_id(frame):
+    # the frame with its id column (kept) as the index: how whole-table
+    # snapshots are cached, so change_feed can patch rows by label
+    if frame is None or frame.empty or "id" not in frame.columns:
+        return frame
+    return frame.set_axis(pd.Index(frame["id"].to_numpy()), axis=0)
+
+
+def _fetch_snapshot(table):
+    return index_by_id(_fetch(table))
+
+
+def _read_format():
+    fmt = os.environ.get(READ_FORMAT_ENV, "csv").lower()
+    if fmt == "csv":
+        try:
+            import pyarrow.csv  # noqa: F401
+        except ImportError:
+            return "json"
+    return fmt
+
+
+def _frame_json(pages):
+    # orjson when installed, and one list per column filled a page at a
+    # time (only one page of row dicts alive): cheaper than resp.json()
+    # plus DataFrame(records)
+    from supabase_client import loads
+
+    columns, n = {}, 0
+    for resp in pages:
+        data = loads(resp.content)
+        rows = [data] if isinstance(data, dict) else data
+        if not rows:
+            continue
+        keys = rows[0].keys()
+        if any(len(r) != len(keys) for r in rows):
+            keys = dict.fromkeys(k for r in rows for k in r)
+        for c in keys:
+            columns.setdefault(c, [None] * n).extend([r.get(c) for r in rows])
+        n += len(rows)
+        for values in columns.values():
+            values.extend([None] * (n - len(values)))
+        del data, rows
+    if not n:
+        return pd.DataFrame()
+    # each list is dropped as soon as its column is built
+    return pd.DataFrame({c: pd.Series(columns.pop(c)) for c in list(columns)})
+
+
+def _frame_csv(pages):
+    # Accept: text/csv parsed by pyarrow's multithreaded reader into typed
+    # columns. PostgREST writes each row's composite text: NULL is an empty
+    # field, an empty string is "", booleans are t/f and quotes and
+    # backslashes inside quoted fields are doubled.
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+
+    parts = []
+    for i, resp in enumerate(pages):
+        body = resp.content
+        if i:
+            body = body.partition(b"\n")[2]     # later pages repeat the header
+        if body.strip():
+            parts.append(body)
+    if not parts:
+        return pd.DataFrame()
+    data = parts[0] if len(parts) == 1 else b"\n".join(parts)
+    del parts
+    names = data.partition(b"\n")[0].decode().split(",")
+    table = pacsv.read_csv(
+        pa.py_buffer(data),
+        parse_options=pacsv.ParseOptions(escape_char="\\", newlines_in_values=True),
+        convert_options=pacsv.ConvertOptions(
+            column_types={c: pa.string() for c in names if c in TEXT_COLUMNS},
+            null_values=[""], strings_can_be_null=True, quoted_strings_can_be_null=False,
+            true_values=["t", "true"], false_values=["f", "false"], timestamp_parsers=[],
+        ),
+    )
+    del data
+    # dates of columns outside TEXT_COLUMNS: ISO strings, like the JSON path
+    for i, field in enumerate(table.schema):
+        if pa.types.is_temporal(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.string()))
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def _fetch_query(query):
+    import requests
+
+    try:
+        if _read_format() == "csv":
+            try:
+                return _frame_csv(query.pages({"Accept": "text/csv"}))
+            except ValueError:
+                # pyarrow.ArrowInvalid: a response the CSV reader can't take
+                pass
+        return _frame_json(query.pages())
+    except requests.RequestException:
+        return None
+
+
+def snapshot(table):
+    # (frame, token) of a whole table; token is None when the fetch failed
+    # and the frame is empty. The frame shares the cached columns;
+    # copy-on-write (always on from pandas 3, pinned in requirements.txt)
+    # keeps callers' in-place edits out of the shared snapshot.
+    frame, token = CACHE.get(table, _fetch_snapshot)
+    if frame is None:
+        return pd.DataFrame(), None
+    return frame.reset_index(drop=True), token
+
+
+def query_snapshot(query):
+    # (frame, token) of the rows a supabase_client.Query selects, shared
+    # like a whole-table snapshot; empty frame and None token on failure
+    frame, token = CACHE.get((query.table, query.params()), lambda key: _fetch_query(query))
+    if frame is None:
+        return pd.DataFrame(), None
+    return frame, token
+
+
+def load_table(table):
+    return snapshot(table)[0]